@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
 
-import requests
 from argparse import ArgumentParser, Namespace
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING
 from shared.ascii_format import (
     RED, RESET, ERROR, FOUND, GREEN, INFO,
     color_search_string_in_context
     )
 from shared.config import SCRAPTYPE_STR, HEADER
-from shared.scrape import Scraper
+from shared.crawl_state import CrawlState
+from shared.bandwidth import BandwidthThrottle
 from shared.open_files import open_file_and_get_entries
 
+# requests and BeautifulSoup are only loaded once the arguments are
+# parsed, not for the help or the usage errors
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 
 class Harvestmen:
     """
@@ -29,7 +34,12 @@ class Harvestmen:
         recurse_depth: int = 5,
         ko_limit: int = 20,
         sleep: bool = False,
-        max_sleep: int = 3
+        max_sleep: int = 3,
+        state_file: str = "",  # Incremental recrawl state file
+        record_dir: str = "",  # Folder where the WARC files are written
+        replay_dir: str = "",  # Folder of the WARC files to replay
+        rate_limit: int = 0,  # In KB/s, for all the hosts (0: no limit)
+        host_rate_limit: int = 0  # In KB/s, per host (0: no limit)
             ):
 
         self.verbose: bool = verbose
@@ -63,6 +73,19 @@ class Harvestmen:
         # Value: texts surrounding the search strings found inside the link
         self.results: list[dict[str, list]] = []
 
+        # Bandwidth limits of the received bytes, converted to bytes/s
+        self.throttle = BandwidthThrottle(
+            int(rate_limit * 1000), int(host_rate_limit * 1000)
+            )
+
+        # HTTP session, it records or replays the exchanges if asked
+        from shared.transport import create_session
+        self.session = create_session(record_dir, replay_dir, self.throttle)
+
+        # Incremental recrawl mode
+        self.crawl_state: CrawlState | None = \
+            CrawlState(state_file) if state_file else None
+
     def save_found_strings_with_contexts(self, url: str, text: str) -> int:
         """
         Loop through the text looking for the search string.
@@ -98,16 +121,26 @@ class Harvestmen:
 
         return count
 
-    def find_string(self, url: str) -> None:
-        """Find the search string in the content of the given URL."""
+    def find_string(
+            self, url: str, soup: "BeautifulSoup | None" = None
+            ) -> list[str]:
+        """
+        Find the search string in the content of the given URL.
+
+        Return
+        ------
+         - the texts surrounding the search strings found on the page
+        """
         try:
-            # Send a GET request to the URL
-            response = requests.get(url, headers=HEADER)
-            # Raise an error for bad responses
-            response.raise_for_status()
+            if soup is None:
+                # Send a GET request to the URL
+                response = self.session.get(url, headers=HEADER)
+                # Raise an error for bad responses
+                response.raise_for_status()
 
-            # Parse the HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
+                # Parse the HTML content
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(response.text, 'html.parser')
 
             # Get the text from the soup object
             text = soup.get_text()
@@ -127,6 +160,13 @@ class Harvestmen:
                             )
         except Exception as e:
             print(f"{ERROR} {e}")
+        return self.results[self.loop_index].get(url, [])
+
+    def reuse_hits(self, url: str, hits: list[str]) -> None:
+        """Add the texts found on an unchanged page during the previous run."""
+        if hits and url not in self.results[self.loop_index]:
+            self.results[self.loop_index][url] = list(hits)
+            self.found_count[self.loop_index] += len(hits)
 
     def get_text_surrounding_search_string(
             self, text: str, begin: int, interval: int = 30) -> str:
@@ -173,6 +213,8 @@ class Harvestmen:
         print(self.found_count[loop_index])
 
     def run(self) -> None:
+        from shared.scrape import Scraper
+
         end = 1
         words = []
         ko_limit = self.ko_limit
@@ -199,11 +241,11 @@ class Harvestmen:
                             "\n============= Searching "
                             f"'{RED}{self.search_string}{RESET}'...\n"
                             )
+                scraper = Scraper(SCRAPTYPE_STR, self, self.base_url)
                 if self.recurse_depth == 1:
-                    self.find_string(self.base_url)
+                    scraper.visit(self.base_url)
                 # Recursively loop only if the depth is > 1
                 elif self.recurse_depth > 1:
-                    scraper = Scraper(SCRAPTYPE_STR, self, self.base_url)
                     scraper.scrape()
             except KeyboardInterrupt:
                 print("\nExiting...")
@@ -214,6 +256,11 @@ class Harvestmen:
                 """
                 if not words:
                     self.print_single_result(self.loop_index)
+                # Report the changes since the previous run
+                if self.crawl_state:
+                    self.crawl_state.print_diff(
+                        self.search_string, self.verbose
+                        )
                 count += self.found_count[self.loop_index]
                 self.loop_index += 1
         if words:
@@ -222,6 +269,12 @@ class Harvestmen:
             if self.verbose:
                 print(f"\n{INFO} Total occurences:")
             print(count)
+        if self.crawl_state:
+            self.crawl_state.save()
+
+        # Actual throughput of the run
+        if self.verbose or self.throttle.rate or self.throttle.host_rate:
+            self.throttle.print_metrics(self.verbose)
 
 
 def parse_args() -> Namespace:
@@ -277,6 +330,33 @@ def parse_args() -> Namespace:
         help='Give the program a word list that will be used as search \
             strings.'
         )
+    parser.add_argument(
+        '--limit-rate', metavar='KBPS', type=int,
+        help='Limit the bandwidth used by all the HTTP responses to KBPS \
+            KB/s. The bytes are paced as they are received, so the \
+            concurrent requests keep running.'
+        )
+    parser.add_argument(
+        '--host-limit-rate', metavar='KBPS', type=int,
+        help='Limit the bandwidth used by the HTTP responses of each host \
+            to KBPS KB/s.'
+        )
+    parser.add_argument(
+        '--incremental', metavar='STATE_FILE', type=str,
+        help='Enable the incremental recrawl mode: the pages that did not \
+            change since the previous run with the same state file are not \
+            searched again, and the new/changed/removed hits are reported.'
+        )
+    parser.add_argument(
+        '--record', metavar='DIR', type=str,
+        help='Record every HTTP request and response into WARC files \
+            written in the given folder.'
+        )
+    parser.add_argument(
+        '--replay', metavar='DIR', type=str,
+        help='Serve the HTTP responses from the WARC files of the given \
+            folder instead of the network.'
+        )
 
     args = parser.parse_args()
 
@@ -304,6 +384,11 @@ def parse_args() -> Namespace:
             "with -w/--word-list."
             )
 
+    if args.record and args.replay:
+        parser.error(
+            "The --record option cannot be used with --replay."
+            )
+
     return args
 
 
@@ -327,7 +412,10 @@ def main():
         args.search_string, args.word_list,
         args.recursive, args.case_insensitive,
         args.recurse_depth, args.ko_limit,
-        args.sleep, args.max_sleep
+        args.sleep, args.max_sleep,
+        args.incremental,
+        args.record, args.replay,
+        args.limit_rate or 0, args.host_limit_rate or 0
         )
 
     # Run the scraper
@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
 
+import io
 import sys
 from shutil import get_terminal_size
-from PIL import Image
-from PIL.ExifTags import GPSTAGS
-from PIL import ExifTags
+from contextlib import redirect_stdout, redirect_stderr
 import os
-from typing import Any
+from typing import Any, BinaryIO, Iterable, TYPE_CHECKING
+from itertools import islice
 import time
 from argparse import ArgumentParser
 from shared.ascii_format import (
-    RESET, ERROR, YELLOW, GREEN, INFO, FOUND,
+    RESET, ERROR, YELLOW, GREEN, INFO, FOUND, DONE,
     color_search_string_in_context
     )
-from shared.exif_labels import exif_labels_dict
-from shared.config import IMAGE_EXTENSIONS, BASIC, EXIF
+from shared.exif_labels import get_ifd_tags, get_ifd0_tag, IFD_GPS
+from shared.config import BASIC, EXIF
+from shared.image_probe import (
+    detect_file_format, TAG_EXIF_IFD, TAG_GPS_IFD, TAG_DATE_TIME_ORIGINAL
+    )
+from shared.exif_reader import ExifData, read_image_header
+from shared.sidecar_store import find_sidecar_store
+from shared.metadata_cache import get_metadata_cache
+from shared.metadata_search import MetadataSearch, SearchHit
+from shared.metadata_export import (
+    get_export_record, open_export_writer, get_export_format,
+    get_export_columns, EXPORT_FORMATS
+    )
+from shared.metadata_index import (
+    MetadataIndex, QueryError, get_index_row, BATCH_SIZE
+    )
+from shared.shard_store import split_shard_path, image_exists, open_image_file
+from shared.file_walker import walk_files, SYMLINKS_FILES
+from shared.spatial_index import write_geojson
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Number of files sent at once to a process in parallel mode
+CHUNK_SIZE = 16
 
 
 class Scorpion:
@@ -27,7 +50,16 @@ class Scorpion:
         files: list = [],
         directory: list = [],
         search_string: str = "",
-        case_insensitive: bool = False
+        case_insensitive: bool = False,
+        jobs: int = 1,  # Number of processes treating the files
+        ordered: bool = True,  # Print the files in order in parallel mode
+        walk_options: dict[str, Any] | None = None,  # See walk_files()
+        use_cache: bool = True,  # Use the metadata cache
+        index_file: str = "",  # Index the files instead of displaying them
+        tags: list[str] | None = None,  # Tags to search, all if None
+        export_file: str = "",  # Export the files instead of displaying them
+        export_format: str = "",  # See metadata_export.py
+        export_columns: list[str] | None = None
             ):
 
         self.verbose: bool = verbose
@@ -35,17 +67,47 @@ class Scorpion:
         self.directory: list[str] = directory
         self.search_string: str = search_string
         self.case_insensitive: bool = case_insensitive
-
-        self.found_count: int = 0
-        self.founds: dict = {}
+        self.tags: list[str] | None = tags
+
+        self.searcher: MetadataSearch | None = MetadataSearch(
+            search_string, case_insensitive, tags
+            ) if search_string else None
+        self.founds: list[SearchHit] = []
+
+        # Parallel mode: the files are treated by a pool of processes
+        self.jobs: int = jobs
+        self.ordered: bool = ordered
+        self.pool: Any = None
+
+        # How the directories are walked (recursion, globs, symlinks...)
+        self.walk_options: dict[str, Any] = walk_options or {}
+
+        self.use_cache: bool = use_cache
+
+        # Index mode: the metadata are stored in the index
+        self.index_file: str = index_file
+        self.index: MetadataIndex | None = None
+        self.index_rows: list[tuple] = []  # Rows waiting to be stored
+        self.indexed_count: int = 0
+
+        # Export mode: a record per file is written to the export file
+        self.export_file: str = export_file
+        self.export_format: str = export_format
+        self.export_columns: list[str] = \
+            get_export_columns(export_format, export_columns)
+        self.export_writer: Any = None
+        self.export_records: list = []  # Records waiting to be written
+        self.exported_count: int = 0
 
     def get_human_readable_gps_data(self, gps_info: dict[int, Any]) -> dict:
         """
         Generate human-readable GPS data from EXIF metadata.
         """
         # Convert GPS tag numbers to human-readable names
+        gps_tags = get_ifd_tags(IFD_GPS)
         gps_data = {
-            GPSTAGS.get(tag, tag): value for tag, value in gps_info.items()
+            gps_tags[tag][0] if tag in gps_tags else tag: value
+            for tag, value in gps_info.items()
         }
         # Parse GPS latitude and longitude
         latitude = gps_data.get("GPSLatitude")
@@ -73,9 +135,31 @@ class Scorpion:
             decimal = -decimal
         return decimal
 
+    def set_date_time_original(
+                self,
+                exif_data: "Image.Exif | ExifData",
+                metadata_exif: dict[int, Any]
+            ) -> dict[int, Any]:
+        """
+        Add the date of capture, which cameras store in the Exif IFD
+        instead of the first IFD.
+        """
+        try:
+            exif_ifd = exif_data.get_ifd(TAG_EXIF_IFD)
+            if TAG_DATE_TIME_ORIGINAL in exif_ifd:
+                metadata_exif[TAG_DATE_TIME_ORIGINAL] = (
+                    "DateTimeOriginal",
+                    exif_ifd[TAG_DATE_TIME_ORIGINAL]
+                    )
+        except Exception as e:
+            print(f"{ERROR} {e}")
+
+        return metadata_exif
+
     def set_GPS_info(
                 self,
-                exif_data: Image.Exif, metadata_exif: dict[int, Any]
+                exif_data: "Image.Exif | ExifData",
+                metadata_exif: dict[int, Any]
             ) -> dict[int, Any]:
         """
         Extract and add GPS info
@@ -84,24 +168,30 @@ class Scorpion:
         as keys in the metadata_exif dictionary.
         """
         try:
-            gps_ifd = exif_data.get_ifd(ExifTags.IFD.GPSInfo)
+            gps_ifd = exif_data.get_ifd(TAG_GPS_IFD)
             if gps_ifd:
                 GPSInfo = self.get_human_readable_gps_data(gps_ifd)
-                metadata_exif[2] = ("GPSLatitude", GPSInfo['Latitude'])
-                metadata_exif[4] = ("GPSLongitude", GPSInfo['Longitude'])
+                # Some GPS IFDs have no position (e.g. only the version)
+                if 'Latitude' in GPSInfo:
+                    metadata_exif[2] = ("GPSLatitude", GPSInfo['Latitude'])
+                    metadata_exif[4] = (
+                        "GPSLongitude", GPSInfo['Longitude']
+                        )
         except Exception as e:
             print(f"{ERROR} {e}")
 
         return metadata_exif
 
-    def get_exif_data(self, exif_data: Image.Exif) -> dict[int, Any] | None:
+    def get_exif_data(
+            self, exif_data: "Image.Exif | ExifData"
+            ) -> dict[int, Any] | None:
         """
         Extract EXIF data.
 
         Each entry in the Exif data has a tag ID that corresponds to
         a label name. However, the ID is not a human-readable value.
-        This is why we are using a custom dictionary that maps each ID into a
-        human-readable label.
+        This is why we are using a custom table that maps each ID of the
+        first IFD into a human-readable label (see exif_labels.py).
 
         Return:
             A dictionary with the tag ID as a key and a tuple:
@@ -116,20 +206,17 @@ class Scorpion:
 
         # Extract and add GPS info
         metadata_exif = self.set_GPS_info(exif_data, metadata_exif)
+        metadata_exif = self.set_date_time_original(exif_data, metadata_exif)
 
         # Loop through every EXIF entry
         for payld_tag_id, value in exif_data.items():
             # print(f"{payld_tag_id}: {value}")
 
-            # Check if payld_tag_id has an entry in the dict
-            if payld_tag_id in exif_labels_dict:
-                # Get the value (label name) for the payld_tag_id
-                tag = str(exif_labels_dict.get(payld_tag_id, {}).get("tag"))
-                # Get the last part of the label
-                # (e.g., "Model" from "Exif.Image.Model")
-                tag_name = tag.split('.')[-1]
-
-                metadata_exif[payld_tag_id] = (tag_name, value)
+            # Check if payld_tag_id has an entry in the table
+            tag = get_ifd0_tag(payld_tag_id)
+            if tag:
+                # The short label name (e.g., "Model" for "Exif.Image.Model")
+                metadata_exif[payld_tag_id] = (tag[0], value)
             else:  # Handle the case where tag is not found
                 metadata_exif[payld_tag_id] = (
                     str(payld_tag_id) + " (no tag name found)",
@@ -137,38 +224,26 @@ class Scorpion:
                 )
         return metadata_exif
 
-    def search_string_in_metadata(self, metadata: dict[int, Any]) -> None:
+    def search_string_in_metadata(
+            self, file_path: str, metadata: dict[int, Any]
+            ) -> None:
         """
-        Searches for a string in the values of a nested dictionary.
-
-        Parameters:
-            metadata: The dictionary to search through.
+        Search the string in the basic and EXIF values of the file (see
+        metadata_search.py), and add the matching values to the founds.
         """
-        # Iterate through the outer dictionary
-        for int_key, inner_dict in metadata.items():
-            # Ensure the inner value is a dictionary
-            if isinstance(inner_dict, dict):
-
-                def contains_search_string(str_value: str) -> bool:
-                    if self.case_insensitive:
-                        return self.search_string.lower() in str_value.lower()
-                    return self.search_string in str_value
-
-                # Iterate through the inner dictionary
-                for str_key, str_value in inner_dict.items():
-                    if contains_search_string(str_value):
-                        filename = inner_dict["Name"]
-                        if filename not in self.founds:
-                            self.founds[f"{filename}"] = {}
-                        self.founds[f"{filename}"][f"{str_key}"] \
-                            = f"{str_value}"
-                        self.found_count += 1
+        if self.searcher:
+            self.founds += self.searcher.search(file_path, metadata)
 
     def get_metadata(
-                self, file_path: str, verbose: bool = False
+                self, file_path: str, verbose: bool = False,
+                cached: bool = True
             ) -> dict[int, Any] | None:
         """
         Display all the metadata from the file.
+
+        If cached is True and the folder has been post-processed by Spider,
+        the metadata are read from its sidecar store instead of the image.
+        Otherwise, the metadata cache is used (see metadata_cache.py).
         """
         metadata_all: dict[int, Any] = {}
         metadata_basic: dict[str, str] = {}
@@ -186,13 +261,31 @@ class Scorpion:
                 print(f"{ERROR} Found no file path to open.")
                 return None
 
-            img = Image.open(file_path)
-
-            # Get creation date from the file system
-            creation_time = os.path.getctime(file_path)
+            # Results of the post-download pipeline of Spider
+            store = find_sidecar_store(file_path) if cached else None
+            metadata_stored = store.get_metadata(file_path) if store else None
+            if metadata_stored:
+                self.search_string_in_metadata(file_path, metadata_stored)
+                return metadata_stored
+
+            # Images in shards are read at their offset
+            shard = split_shard_path(file_path)
+            if shard and not os.path.isfile(file_path):
+                metadata_all = self.get_metadata_from_bytes(
+                    open_image_file(file_path), shard[1], file_path
+                    )
+                self.search_string_in_metadata(file_path, metadata_all)
+                return metadata_all
 
             # Get file statistics
             file_stats = os.stat(file_path)
+
+            header = self.get_cached_image_header(
+                file_path, file_stats, cached
+                )
+
+            # Get creation date from the file system
+            creation_time = file_stats.st_ctime
             # Access time
             access_time = time.strftime(
                 "%Y-%m-%d %H:%M:%S",
@@ -207,13 +300,12 @@ class Scorpion:
             # Extract basic attributes
             metadata_basic["Name"] = os.path.basename(file_path)
             metadata_basic["Path"] = file_path
-            if img.format:
-                metadata_basic["Format"] = str(img.format)
-            if img.mode:
-                metadata_basic["Mode"] = str(img.mode)
-            if img.size and len(img.size) == 2:
-                metadata_basic["Width"] = str(img.size[0])
-                metadata_basic["Height"] = str(img.size[1])
+            if header["format"]:
+                metadata_basic["Format"] = str(header["format"])
+            if header["mode"]:
+                metadata_basic["Mode"] = str(header["mode"])
+            metadata_basic["Width"] = str(header["width"])
+            metadata_basic["Height"] = str(header["height"])
             if creation_time:
                 metadata_basic["Creation time"] = time.strftime(
                     "%Y-%m-%d %H:%M:%S", time.localtime(creation_time))
@@ -221,20 +313,14 @@ class Scorpion:
                 metadata_basic["Access time"] = access_time
             if modification_time:
                 metadata_basic["Modification time"] = modification_time
-            if "comment" in img.info:
-                metadata_basic["Comment"] = str(img.info["comment"])
-
-            # print(f"{INFO} img.info: {img.info}")
-
-            # Extract EXIF metadata
-            metadata_exif = self.get_exif_data(img.getexif())
+            if "comment" in header:
+                metadata_basic["Comment"] = str(header["comment"])
 
             # Combine all metadata
             metadata_all[BASIC] = metadata_basic
-            metadata_all[EXIF] = metadata_exif
+            metadata_all[EXIF] = header["exif"]
             # print(metadata_all)
-            if self.search_string:
-                self.search_string_in_metadata(metadata_all)
+            self.search_string_in_metadata(file_path, metadata_all)
         except Exception as e:
             print(
                     f"{ERROR} Error processing {file_path}: {e}",
@@ -243,6 +329,78 @@ class Scorpion:
 
         return metadata_all
 
+    def get_metadata_from_bytes(
+                self, data: BinaryIO, name: str, path: str = ""
+            ) -> dict[int, Any]:
+        """
+        Extract the metadata of an image that is not on the disk (e.g. an
+        image being downloaded by Spider), from a file-like object.
+        The file system attributes (times) are not available.
+        """
+        metadata_basic: dict[str, str] = {"Name": name, "Path": path or name}
+
+        header = self.get_image_header(data)
+        if header["format"]:
+            metadata_basic["Format"] = str(header["format"])
+        if header["mode"]:
+            metadata_basic["Mode"] = str(header["mode"])
+        metadata_basic["Width"] = str(header["width"])
+        metadata_basic["Height"] = str(header["height"])
+        if "comment" in header:
+            metadata_basic["Comment"] = str(header["comment"])
+
+        return {BASIC: metadata_basic, EXIF: header["exif"]}
+
+    def get_cached_image_header(
+            self, file_path: str, file_stats: os.stat_result, cached: bool
+            ) -> dict[str, Any]:
+        """
+        Return
+        ------
+         - the header of the file (see get_image_header), from the metadata
+         cache if the file didn't change since it was cached
+        """
+        cache = get_metadata_cache() if cached and self.use_cache else None
+        header = cache.get(file_stats) if cache else None
+        if header is None:
+            header = self.get_image_header(file_path)
+            if cache:
+                cache.put(file_path, file_stats, header)
+        return header
+
+    def get_image_header(self, source: str | BinaryIO) -> dict[str, Any]:
+        """
+        Read the attributes and the EXIF metadata of an image.
+
+        The JPEG and PNG headers are parsed directly (see exif_reader.py),
+        the other images are opened with Pillow.
+
+        Return
+        ------
+         - a dict with the keys 'format', 'mode', 'width', 'height',
+         'comment' (if the image has one) and 'exif' (as returned by
+         get_exif_data)
+        """
+        header = read_image_header(source)
+        if header:
+            header["exif"] = self.get_exif_data(header["exif"])
+            return header
+
+        # Pillow is only loaded for the images that need it
+        from PIL import Image
+
+        with Image.open(source) as img:
+            header = {
+                "format": img.format,
+                "mode": img.mode,
+                "width": img.size[0],
+                "height": img.size[1],
+                "exif": self.get_exif_data(img.getexif())
+            }
+            if "comment" in img.info:
+                header["comment"] = img.info["comment"]
+        return header
+
     def display_metadata(
             self, file_path: str, metadata: dict[int, Any]) -> None:
         """
@@ -267,66 +425,199 @@ class Scorpion:
             for tag, value in exif.items():
                 print(f"  {value[0]}: {value[1]}")
 
-    def loop_through_files(self, file_paths: list[str]) -> None:
+    def treat_file(
+            self, file_path: str, terminal_width: int, walked: bool = False
+            ) -> None:
         """
-        Treat all the files given as arguments.
+        Display the metadata of the file, search them, or index them.
+
+        walked is True if the file has been found by walking a directory,
+        so that its existence is not checked again.
+        """
+        if walked or image_exists(file_path):
+            # Check if the file extension is handled
+            if not check_extension(file_path, True):
+                print("" + "-" * terminal_width)
+                return
+            if self.verbose or not (self.search_string or self.index_file
+                                    or self.export_format):
+                print(f"{INFO} Opening file: {YELLOW}{file_path}{RESET}")
+            metadata = self.get_metadata(file_path, True)
+            if self.index_file:
+                if metadata:
+                    self.index_rows.append(get_index_row(file_path, metadata))
+                return
+            if self.export_format:
+                if metadata:
+                    self.export_records.append(get_export_record(
+                        self.export_format, file_path, metadata,
+                        self.export_columns
+                        ))
+                return
+            # Display metadata only if search string mode is off
+            if not self.search_string:
+                if metadata:
+                    self.display_metadata(file_path, metadata)
+                print("-" * terminal_width)
+        else:
+            print(f"{ERROR} {file_path} is not a valid file.")
+
+    def loop_through_files(
+            self, file_paths: Iterable[str], walked: bool = False
+            ) -> None:
+        """
+        Treat all the files given as arguments. The files are consumed as
+        they come, so file_paths can be a generator.
         """
         # Get terminal size
         terminal_size = get_terminal_size()
         # Get terminal width
         terminal_width = terminal_size.columns
 
+        if self.pool:
+            self.loop_through_files_in_parallel(
+                file_paths, terminal_width, walked
+                )
+            return
+
         for file_path in file_paths:
-            if os.path.isfile(file_path):
-                # Check if the file extension is handled
-                if not check_extension(file_path, True):
-                    print("" + "-" * terminal_width)
-                    continue
-                if self.verbose or not self.search_string:
-                    print(f"{INFO} Opening file: {YELLOW}{file_path}{RESET}")
-                metadata = self.get_metadata(file_path, True)
-                # Display metadata only if search string mode is off
-                if not self.search_string:
-                    if metadata:
-                        self.display_metadata(file_path, metadata)
-                    print("-" * terminal_width)
+            self.treat_file(file_path, terminal_width, walked)
+            self.store_index_rows()
+            self.write_export_records()
+
+    def loop_through_files_in_parallel(
+            self, file_paths: Iterable[str], terminal_width: int,
+            walked: bool = False
+            ) -> None:
+        """
+        Treat the files in the process pool, by chunks. The output of each
+        file is printed as soon as it is ready: in the order of the files,
+        or in the order of completion in unordered mode.
+
+        The files are sent to the pool by batches of several chunks per
+        process, so that they all keep busy while the paths of a walked
+        directory are not all held in memory.
+        """
+        tasks = (
+            (
+                file_path, terminal_width, self.verbose,
+                self.search_string, self.case_insensitive, self.tags,
+                walked, self.use_cache, self.index_file, self.export_format,
+                self.export_columns
+            )
+            for file_path in file_paths
+        )
+        batch_size = CHUNK_SIZE * self.jobs * 4
+
+        while batch := list(islice(tasks, batch_size)):
+            # Smaller chunks for the small batches (e.g. a few files)
+            chunk_size = max(1, min(CHUNK_SIZE, len(batch) // self.jobs))
+            if self.ordered:
+                results = self.pool.imap(
+                    treat_file_in_worker, batch, chunk_size
+                    )
             else:
-                print(f"{ERROR} {file_path} is not a valid file.")
+                results = self.pool.imap_unordered(
+                    treat_file_in_worker, batch, chunk_size
+                    )
+            self.merge_results(results)
+
+    def merge_results(self, results: Iterable[tuple]) -> None:
+        """Print the outputs of the workers and merge their founds."""
+        for output, errors, founds, index_rows, export_records in results:
+            print(output, end="")
+            print(errors, end="", file=sys.stderr)
+            # Merge the search results of the worker
+            self.founds += founds
+            self.index_rows += index_rows
+            self.store_index_rows()
+            self.export_records += export_records
+            self.write_export_records()
+
+    def store_index_rows(self, force: bool = False) -> None:
+        """
+        Store the rows waiting to be indexed, by batches (all the rows
+        if force is True).
+        """
+        if self.index and (len(self.index_rows) >= BATCH_SIZE
+                           or (force and self.index_rows)):
+            self.index.add_rows(self.index_rows)
+            self.indexed_count += len(self.index_rows)
+            self.index_rows = []
 
-    def print_search_results(self) -> None:
-        found_count = 0  # Count of values containing the search string
+    def write_export_records(self) -> None:
+        """
+        Write the records waiting to be exported (the writer has its own
+        buffer).
+        """
+        if self.export_writer and self.export_records:
+            self.export_writer.write(self.export_records)
+            self.exported_count += len(self.export_records)
+            self.export_records = []
 
+    def print_search_results(self) -> None:
         if len(self.founds) > 0:
-            for filename, values in self.founds.items():
-                try:
-                    for entry in values.items():
-                        tagname, value = entry
-                        # Color the search string inside `value`
-                        colored_value = color_search_string_in_context(
-                                self.search_string,
-                                value,
-                                self.case_insensitive
-                            )
-                        if self.verbose:
-                            print(f"{FOUND} File: {GREEN}{filename}{RESET} | "
-                                f"Tag: {tagname} - Value: {colored_value}"
-                                )
-                        else:
-                            print(f"{filename} - {tagname} - {colored_value}")
-                        found_count += 1
-                except Exception:
-                    continue
-
+            for file_path, tagname, value in self.founds:
+                # Color the search string inside `value`
+                colored_value = color_search_string_in_context(
+                        self.search_string,
+                        value,
+                        self.case_insensitive
+                    )
+                if self.verbose:
+                    print(f"{FOUND} File: {GREEN}{file_path}{RESET} | "
+                          f"Tag: {tagname} - Value: {colored_value}"
+                          )
+                else:
+                    print(f"{file_path} - {tagname} - {colored_value}")
+
+            # Count of values containing the search string
             if self.verbose:
-                print(f"{INFO} Found string in {found_count} entries.")
+                print(f"{INFO} Found string in {len(self.founds)} entries.")
             else:
-                print(found_count)
+                print(len(self.founds))
 
     def run(self) -> None:
         """
         Run Scorpion on the given files, and
         loop through all the given directories.
         """
+        if self.index_file:
+            self.index = MetadataIndex(self.index_file)
+        if self.export_file:
+            self.export_writer = open_export_writer(
+                self.export_format, self.export_file, self.export_columns
+                )
+        if self.jobs > 1:
+            from multiprocessing import Pool
+            self.pool = Pool(self.jobs)
+        try:
+            self.loop_through_inputs()
+        finally:
+            if self.pool:
+                self.pool.close()
+                self.pool.join()
+                self.pool = None
+            if self.index:
+                self.store_index_rows(True)
+                self.index.close()
+                self.index = None
+                print(
+                    f"{INFO} Indexed {self.indexed_count} files in "
+                    f"'{self.index_file}'."
+                    )
+            if self.export_writer:
+                self.write_export_records()
+                self.export_writer.close()
+                self.export_writer = None
+                print(
+                    f"{INFO} Exported {self.exported_count} files to "
+                    f"'{self.export_file}'."
+                    )
+        self.print_search_results()
+
+    def loop_through_inputs(self) -> None:
+        """Treat the given files, then the files of the given directories."""
         if self.files:
             self.loop_through_files(self.files)
 
@@ -342,32 +633,122 @@ class Scorpion:
                         print(f"{ERROR} {dir_path} is not a valid directory.")
                         continue
 
-                    # Create a list of full file paths
-                    file_paths = [
-                        os.path.join(dir_path, filename)
-                        for filename in os.listdir(dir_path)
-                    ]
-                    self.loop_through_files(file_paths)
+                    # The files are treated while the folder is walked
+                    self.loop_through_files(
+                        walk_files(dir_path, **self.walk_options), True
+                        )
                 except Exception as e:
                     print(f"{ERROR} {e}")
-        self.print_search_results()
+
+
+def treat_file_in_worker(task: tuple) -> tuple[str, str, list, list, list]:
+    """
+    Treat a file in a worker process of the parallel mode.
+
+    Return
+    ------
+     - the standard output and error output of the treatment, the search
+     results to merge, the rows to index and the records to export
+    """
+    (
+        file_path, terminal_width, verbose, search_string, case_insensitive,
+        tags, walked, use_cache, index_file, export_format, export_columns
+    ) = task
+    scorpion = Scorpion(
+        verbose, search_string=search_string,
+        case_insensitive=case_insensitive, use_cache=use_cache,
+        index_file=index_file, tags=tags, export_format=export_format,
+        export_columns=export_columns
+        )
+    output, errors = io.StringIO(), io.StringIO()
+    with redirect_stdout(output), redirect_stderr(errors):
+        scorpion.treat_file(file_path, terminal_width, walked)
+    return (
+        output.getvalue(), errors.getvalue(),
+        scorpion.founds, scorpion.index_rows, scorpion.export_records
+        )
 
 
 def check_extension(file_path: str, verbose: bool = False) -> bool:
     """
-    Check if the file type is handled.
+    Check if the file type is handled. The type is detected from the
+    first bytes of the file, so that images with a wrong or no extension
+    are handled too.
     """
-    img_name = os.path.basename(file_path)
-    _, img_extension = os.path.splitext(img_name)
-    if img_extension.lower() not in IMAGE_EXTENSIONS:
+    if not detect_file_format(file_path):
         if verbose:
             print(
-                f"{ERROR} {file_path}: '{img_extension}' is not a "
-                f"handled extension.")
+                f"{ERROR} {file_path}: not a handled image format.")
         return False
     return True
 
 
+def compact_metadata_cache() -> None:
+    cache = get_metadata_cache()
+    if not cache:
+        print(f"{ERROR} The metadata cache could not be opened.")
+        return
+    removed, kept = cache.compact()
+    print(
+        f"{INFO} Metadata cache compacted: {removed} entries removed, "
+        f"{kept} kept."
+        )
+
+
+def query_index(
+        index_file: str, predicate: str, verbose: bool,
+        near: list[float] | None = None,
+        bbox: list[float] | None = None,
+        nearest: list[float] | None = None,
+        geojson_file: str = ""
+        ) -> None:
+    """
+    Print the files of the index matching the predicate and/or the spatial
+    query (near: latitude, longitude, radius in meters; bbox: south, west,
+    north, east; nearest: latitude, longitude, number of files).
+    """
+    if not os.path.isfile(index_file):
+        print(f"{ERROR} {index_file} is not a valid index file.")
+        return
+    index = MetadataIndex(index_file)
+    try:
+        if near:
+            results = index.query_radius(*near, predicate)
+        elif bbox:
+            results = index.query_bbox(*bbox, predicate)
+        elif nearest:
+            results = index.query_nearest(
+                nearest[0], nearest[1], int(nearest[2]), predicate
+                )
+        else:
+            results = [(row, None) for row in index.query(predicate)]
+
+        for row, distance in results:
+            if verbose:
+                print(
+                    f"{FOUND} {GREEN}{row['path']}{RESET} | "
+                    f"{row['format']} {row['width']}x{row['height']} | "
+                    f"{row['make']} {row['model']} | "
+                    f"{row['datetime_original']} | "
+                    f"{row['latitude']}, {row['longitude']}"
+                    + (f" | {distance:.1f} m" if distance is not None else "")
+                    )
+            elif distance is not None:
+                print(f"{row['path']}\t{distance:.1f}")
+            else:
+                print(row["path"])
+        if verbose:
+            print(f"{INFO} Found {len(results)} files.")
+
+        if geojson_file:
+            write_geojson(results, geojson_file)
+            print(f"{DONE} Results written to '{geojson_file}'.")
+    except QueryError as e:
+        print(f"{ERROR} Invalid query: {e}")
+    finally:
+        index.close()
+
+
 def parse_args():
     """Set up argparse and return the given arguments."""
     parser = ArgumentParser(
@@ -389,8 +770,176 @@ def parse_args():
         '-i', '--case-insensitive', action='store_true',
         help='Enable case-insensitive mode'
         )
+    parser.add_argument(
+        '-t', '--tag', metavar='TAG', type=str, nargs='*',
+        help='only search the values of the tags (e.g. Model, GPSLatitude, \
+            Width), case-insensitive (-s/--search-string has to be \
+            activated)'
+        )
+    parser.add_argument(
+        '-j', '--jobs', type=int,
+        help='Number of processes treating the files in parallel. \
+            If not indicated, it will be 1.'
+        )
+    parser.add_argument(
+        '-u', '--unordered', action='store_true',
+        help='Print the files as soon as they are treated instead of in \
+            order (-j/--jobs has to be activated).'
+        )
 
-    return parser.parse_args()
+    parser.add_argument(
+        '-r', '--recursive', action='store_true',
+        help='Walk the subfolders of the given folders.'
+        )
+    parser.add_argument(
+        '-l', '--max-depth', type=int,
+        help='Maximum depth of the subfolders to walk (-r/--recursive has \
+            to be activated). If not indicated, there is no limit.'
+        )
+    parser.add_argument(
+        '--include', metavar='GLOB', type=str, nargs='*',
+        help='only treat the files whose name matches one of the patterns \
+            (e.g. "*.jpg")'
+        )
+    parser.add_argument(
+        '--exclude', metavar='GLOB', type=str, nargs='*',
+        help='skip the files and folders whose name matches one of the \
+            patterns'
+        )
+    parser.add_argument(
+        '--symlinks', choices=['skip', 'files', 'follow'],
+        help='Skip all the symbolic links, follow only those to files, or \
+            follow all of them. If not indicated, it will be "files".'
+        )
+    parser.add_argument(
+        '-a', '--hidden', action='store_true',
+        help='Also treat the hidden files and folders (starting with ".").'
+        )
+    parser.add_argument(
+        '-n', '--no-cache', action='store_true',
+        help='Read the metadata from the files instead of the metadata \
+            cache, and don\'t cache them.'
+        )
+    parser.add_argument(
+        '--compact-cache', action='store_true',
+        help='Remove the entries of the deleted and changed files from the \
+            metadata cache before treating the files.'
+        )
+
+    parser.add_argument(
+        '-x', '--index', metavar='INDEX_FILE', type=str,
+        help='Store the metadata of the files in the index file (SQLite) \
+            instead of displaying them.'
+        )
+    parser.add_argument(
+        '-q', '--query', metavar='PREDICATE', type=str,
+        help='Print the files of the index (-x/--index has to be \
+            activated) matching the predicate, e.g. \
+            \'Model = "EOS 5D" AND Width > 2000\'.'
+        )
+    parser.add_argument(
+        '-o', '--output', metavar='EXPORT_FILE', type=str,
+        help='Export the metadata of the files to the file, one record per \
+            file, instead of displaying them. The format is given by \
+            --format or by the extension of the file.'
+        )
+    parser.add_argument(
+        '--format', choices=EXPORT_FORMATS,
+        help='JSON object per line, CSV row per file, or NumPy arrays of \
+            the numeric columns (-o/--output has to be activated).'
+        )
+    parser.add_argument(
+        '--columns', metavar='COLUMN', type=str, nargs='*',
+        help='Columns of the CSV and npz exports, e.g. Path Model \
+            GPSLatitude (-o/--output has to be activated).'
+        )
+    parser.add_argument(
+        '--near', metavar=('LAT', 'LON', 'METERS'), type=float, nargs=3,
+        help='Print the files of the index taken at most at the distance \
+            from the position, from the nearest (-x/--index has to be \
+            activated).'
+        )
+    parser.add_argument(
+        '--bbox', metavar=('SOUTH', 'WEST', 'NORTH', 'EAST'), type=float,
+        nargs=4,
+        help='Print the files of the index taken in the bounding box \
+            (-x/--index has to be activated).'
+        )
+    parser.add_argument(
+        '--nearest', metavar=('LAT', 'LON', 'K'), type=float, nargs=3,
+        help='Print the K files of the index taken nearest to the position \
+            (-x/--index has to be activated).'
+        )
+    parser.add_argument(
+        '--geojson', metavar='GEOJSON_FILE', type=str,
+        help='Also write the files found by the query to a GeoJSON file.'
+        )
+
+    args = parser.parse_args()
+
+    # Validate that -t is not used without -s
+    if args.tag and not args.search_string:
+        parser.error(
+            "The -t/--tag option can only be used with -s/--search-string."
+            )
+
+    # Validate the export options
+    if (args.format or args.columns) and not args.output:
+        parser.error(
+            "The --format and --columns options can only be used with "
+            "-o/--output."
+            )
+    if args.output and not get_export_format(args.output, args.format):
+        parser.error(
+            "The export format can't be deduced from the extension of the "
+            "file, use --format."
+            )
+    if args.output and args.index:
+        parser.error(
+            "The -o/--output option can't be used with -x/--index."
+            )
+
+    # Validate that -q is not used without -x
+    if args.query and not args.index:
+        parser.error("The -q/--query option can only be used with -x/--index.")
+
+    # Validate the spatial queries
+    spatial_queries = [
+        option for option, value in (
+            ("--near", args.near), ("--bbox", args.bbox),
+            ("--nearest", args.nearest)
+        ) if value
+    ]
+    if spatial_queries and not args.index:
+        parser.error(
+            f"The {spatial_queries[0]} option can only be used with "
+            "-x/--index."
+            )
+    if len(spatial_queries) > 1:
+        parser.error(
+            "The --near, --bbox and --nearest options can't be used together."
+            )
+    if args.nearest and (
+            args.nearest[2] < 1 or not args.nearest[2].is_integer()):
+        parser.error("K has to be a positive integer.")
+    if args.geojson and not (args.query or spatial_queries):
+        parser.error(
+            "The --geojson option can only be used with a query."
+            )
+
+    # Validate that -l is not used without -r
+    if args.max_depth is not None and not args.recursive:
+        parser.error(
+            "The -l/--max-depth option can only be used with -r/--recursive."
+            )
+
+    # Validate that -u is not used without -j
+    if args.unordered and not args.jobs:
+        parser.error(
+            "The -u/--unordered option can only be used with -j/--jobs."
+            )
+
+    return args
 
 
 if __name__ == "__main__":
@@ -399,6 +948,14 @@ if __name__ == "__main__":
 
     if not args.verbose:
         args.verbose = False
+    if not args.jobs:
+        args.jobs = 1
+    if not args.recursive:
+        args.max_depth = 0
+    elif args.max_depth is None:
+        args.max_depth = -1  # No limit
+    if not args.symlinks:
+        args.symlinks = SYMLINKS_FILES
 
     # Create an instance of Harvestmen
     scraper = Scorpion(
@@ -406,8 +963,34 @@ if __name__ == "__main__":
         args.files,
         args.directory,
         args.search_string,
-        args.case_insensitive
+        args.case_insensitive,
+        args.jobs, not args.unordered,
+        {
+            "include": args.include,
+            "exclude": args.exclude,
+            "max_depth": args.max_depth,
+            "symlinks": args.symlinks,
+            "hidden": args.hidden
+        },
+        not args.no_cache,
+        args.index,
+        args.tag,
+        args.output,
+        get_export_format(args.output, args.format) if args.output else "",
+        args.columns
         )
 
-    # Run the scraper
-    scraper.run()
+    if args.compact_cache:
+        compact_metadata_cache()
+
+    has_query = args.query or args.near or args.bbox or args.nearest
+
+    # Run the scraper (a query alone only reads the index)
+    if args.files or args.directory or not has_query:
+        scraper.run()
+
+    if has_query:
+        query_index(
+            args.index, args.query or "", args.verbose,
+            args.near, args.bbox, args.nearest, args.geojson
+            )
@@ -2,13 +2,16 @@
 
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from PIL import Image, ImageTk
 import os
 from datetime import datetime
 import time
-from shared.exif_labels import exif_labels_dict
+from shared.exif_labels import get_ifd0_tag
 from scorpion import Scorpion, check_extension
-from typing import Any
+from shared.sidecar_store import find_sidecar_store
+from shared.shard_store import image_exists, open_image_file
+from shared.file_walker import walk_files
+from io import BytesIO
+from typing import Any, TYPE_CHECKING
 from fractions import Fraction
 import struct
 from shared.config import (
@@ -24,6 +27,9 @@ from shared.config import (
     PAYLD_TAG_ID,
 )
 
+if TYPE_CHECKING:
+    from PIL import Image
+
 
 class ScorpionMetadataEditor(ttk.Frame):
     def __init__(self, root, width, height, parent=None):
@@ -54,8 +60,17 @@ class ScorpionMetadataEditor(ttk.Frame):
         Create a thumbnail for the image and add it to the Treeview.
         """
         try:
+            # Use the thumbnail made by Spider's post-download pipeline
+            store = find_sidecar_store(file_path)
+            thumbnail = store.get_thumbnail(file_path) if store else None
+            # Pillow is only loaded when the first image is shown
+            from PIL import Image, ImageTk
+
             # Convert to a format compatible with Tkinter
-            img = Image.open(file_path)
+            img = Image.open(
+                BytesIO(thumbnail) if thumbnail
+                else open_image_file(file_path)
+                )
             # Resize to better fit the row height
             img.thumbnail((THUMB_SIZE, THUMB_SIZE))
             self._img = ImageTk.PhotoImage(img)
@@ -78,7 +93,9 @@ class ScorpionMetadataEditor(ttk.Frame):
         Open the image in a custom Tkinter window.
         """
         try:
-            img = Image.open(file_path)
+            from PIL import Image
+
+            img = Image.open(open_image_file(file_path))
             img.show()  # For quick cross-platform viewing
         except Exception as e:
             raise Exception(f"Failed to open image: {e}")
@@ -96,7 +113,7 @@ class ScorpionMetadataEditor(ttk.Frame):
         item = self.tree.item(selected_item[0])
         file_path = item['tags'][TAG_FILEPATH]
 
-        if file_path and os.path.isfile(file_path):
+        if file_path and image_exists(file_path):
             # Open the image using the default system viewer
             self.open_image(file_path)
         else:
@@ -190,7 +207,7 @@ class ScorpionMetadataEditor(ttk.Frame):
         """
         for path in files:
             # If file extension isn't handled or path isn't a valid file
-            if not check_extension(path) or not os.path.isfile(path):
+            if not check_extension(path) or not image_exists(path):
                 continue
             try:
                 scorpion = Scorpion(path)
@@ -202,10 +219,8 @@ class ScorpionMetadataEditor(ttk.Frame):
     def open_dirs(self):
         dir_path = filedialog.askdirectory(title="Select folders")
         if dir_path:
-            files = [
-                os.path.join(dir_path, filename)
-                for filename in os.listdir(dir_path)
-            ]
+            # With the images stored in shards by Spider
+            files = list(walk_files(dir_path))
             # Read the metadata of each file in the folder
             if files:
                 self.read_metadata_from_files(files)
@@ -470,7 +485,7 @@ class ScorpionMetadataEditor(ttk.Frame):
 
     def modify_basic_metadata(
                 self,
-                file_path: str, tag_name: str, value: Any, img: Image.Image
+                file_path: str, tag_name: str, value: Any, img: "Image.Image"
             ) -> tuple:
         """
         Modify the basic informations of the image file.
@@ -515,7 +530,8 @@ class ScorpionMetadataEditor(ttk.Frame):
         return img, file_path
 
     def handle_exif(
-                self, img: Image.Image, file_path: str, tag_id: int, value: Any
+                self, img: "Image.Image", file_path: str, tag_id: int,
+                value: Any
             ) -> None:
         """tag_id: int tag ID (and not human-readable tag name)"""
         exif_data = img.getexif()
@@ -524,11 +540,8 @@ class ScorpionMetadataEditor(ttk.Frame):
         # If Exif data is present, we are updating it
         if exif_data and tag_id in exif_data:
             # Detect type
-            tag_type_value = exif_labels_dict.get(tag_id, {}).get("type")
-
-            # Check if the value is a string or int (= convertible to int)
-            if isinstance(tag_type_value, (str, int)):
-                tag_type = int(tag_type_value)
+            tag = get_ifd0_tag(tag_id)
+            tag_type = tag[1] if tag else 0
         value = self.convert_value_to_metadata_type(value, tag_type)
 
         # If a value is provided, it is a modification
@@ -543,7 +556,7 @@ class ScorpionMetadataEditor(ttk.Frame):
 
     def handle_img(
                 self,
-                img: Image.Image, file_path: str, value: Any, tag_name: str
+                img: "Image.Image", file_path: str, value: Any, tag_name: str
             ) -> None:
         # Add all key-value pairs from img.info to the PngInfo object
         for key, val in img.info.items():
@@ -580,6 +593,8 @@ class ScorpionMetadataEditor(ttk.Frame):
         """
 
         try:
+            from PIL import Image
+
             meta_datatype = tags[PAYLD_DATATYPE]  # BASIC or EXIF
             img = Image.open(file_path)  # Load the image and extract EXIF data
 
@@ -0,0 +1,133 @@
+import time
+import threading
+from typing import Any
+from shared.ascii_format import INFO
+
+"""
+This module limits the bandwidth used by the scrapers.
+
+The received bytes are paced by token buckets: one for all the hosts and
+one per host. A bucket is refilled at the allowed rate, every received
+chunk takes its size from the buckets, and the thread that received it
+waits until the buckets are no longer in debt. The concurrent downloads
+keep running, but their total rate respects the limits.
+
+It also measures the actual throughput of the run.
+"""
+
+
+# Part of a second of traffic that can be received at once after an idle
+# period: a small burst keeps the rate smooth
+BURST_DURATION = 0.25
+
+
+class TokenBucket:
+    def __init__(self, rate: int, burst: int = 0):
+        self.rate: int = rate  # In bytes per second
+        # Bytes that can be received at once after an idle period
+        self.capacity: int = burst or max(int(rate * BURST_DURATION), 1)
+        self.tokens: float = self.capacity
+        self.last_refill: float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, amount: int) -> float:
+        """
+        Take amount tokens, the bucket can go into debt.
+
+        Return
+        ------
+         - the number of seconds to wait until the debt is paid back
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.last_refill) * self.rate
+                )
+            self.last_refill = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+
+class BandwidthThrottle:
+    """
+    A rate of 0 means no limit, the bytes are only counted.
+
+    All the methods can be called from several threads.
+    """
+    def __init__(self, rate: int = 0, host_rate: int = 0):
+        self.rate: int = rate  # In bytes per second
+        self.host_rate: int = host_rate  # In bytes per second, per host
+        self.bucket: TokenBucket | None = TokenBucket(rate) if rate else None
+        self.host_buckets: dict[str, TokenBucket] = {}
+
+        self.lock = threading.Lock()
+        self.start_time: float = time.monotonic()
+        self.total_bytes: int = 0
+        self.host_bytes: dict[str, int] = {}
+
+    def consume(self, host: str, amount: int) -> None:
+        """Count the received bytes and wait if a limit is exceeded."""
+        with self.lock:
+            self.total_bytes += amount
+            self.host_bytes[host] = self.host_bytes.get(host, 0) + amount
+            host_bucket = None
+            if self.host_rate:
+                host_bucket = self.host_buckets.get(host)
+                if not host_bucket:
+                    host_bucket = TokenBucket(self.host_rate)
+                    self.host_buckets[host] = host_bucket
+
+        wait = 0.0
+        if host_bucket:
+            wait = host_bucket.take(amount)
+        if self.bucket:
+            wait = max(wait, self.bucket.take(amount))
+        if wait > 0:
+            time.sleep(wait)
+
+    def print_metrics(self, verbose: bool = False) -> None:
+        """Print the number of received bytes and the actual throughput."""
+        elapsed = max(time.monotonic() - self.start_time, 1e-6)
+        print(
+            f"{INFO} Received {self.total_bytes:,} bytes in {elapsed:.1f}s "
+            f"({self.total_bytes / elapsed / 1000:,.1f} KB/s)"
+            )
+        if verbose:
+            for host, host_bytes in self.host_bytes.items():
+                print(
+                    f"  {host}: {host_bytes:,} bytes "
+                    f"({host_bytes / elapsed / 1000:,.1f} KB/s)"
+                    )
+
+
+class ThrottledReader:
+    """
+    Wrap the raw urllib3 response of requests, so that the bytes are
+    counted and paced as they are read from the network.
+    """
+    def __init__(self, raw: Any, throttle: BandwidthThrottle, host: str):
+        self.raw: Any = raw
+        self.throttle: BandwidthThrottle = throttle
+        self.host: str = host
+        self.received: int = 0
+
+    def consume(self) -> None:
+        # Count the bytes received from the network, before decompression
+        received = self.raw.tell()
+        if received > self.received:
+            self.throttle.consume(self.host, received - self.received)
+            self.received = received
+
+    def stream(self, amt: int = 2**16, decode_content: Any = None) -> Any:
+        for chunk in self.raw.stream(amt, decode_content=decode_content):
+            self.consume()
+            yield chunk
+
+    def read(self, *args: Any, **kwargs: Any) -> bytes:
+        data = self.raw.read(*args, **kwargs)
+        self.consume()
+        return data
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
@@ -0,0 +1,87 @@
+import threading
+
+"""
+This module implements the byte budget of the downloads.
+
+The bytes are reserved before they are written and refunded if they end
+up unused (failed download, shorter body, duplicate content). Besides the
+global limit, optional sub-budgets limit the bytes downloaded from each
+domain and from the images of each page.
+
+When the global limit is reached, the budget raises a stop signal: no new
+download should start, but the downloads in progress are allowed to
+finish and the results to be flushed.
+"""
+
+
+class BudgetExceeded(Exception):
+    """Raised when a download does not fit in its budget."""
+
+
+class ByteBudget:
+    """
+    All the methods can be called from several threads.
+
+    A limit of 0 means no limit.
+    """
+    def __init__(
+            self,
+            limit: int,
+            domain_limit: int = 0,
+            page_limit: int = 0,
+            used: int = 0  # Bytes already used (e.g. by a previous run)
+            ):
+        self.limit: int = limit
+        self.domain_limit: int = domain_limit
+        self.page_limit: int = page_limit
+
+        self.lock = threading.Lock()
+        self.used: int = used
+        self.domain_used: dict[str, int] = {}
+        self.page_used: dict[str, int] = {}
+        self.stop_event = threading.Event()
+
+    @property
+    def stopping(self) -> bool:
+        """True once the global limit has been reached."""
+        return self.stop_event.is_set()
+
+    def request_stop(self) -> None:
+        self.stop_event.set()
+
+    def reserve(self, size: int, domain: str = "", page: str = "") -> None:
+        """
+        Atomically reserve size bytes in the global budget and in the
+        budgets of the domain and of the page.
+
+        Raises:
+            BudgetExceeded: if one of the budgets would be exceeded. If it
+            is the global one, the stop signal is raised too.
+        """
+        with self.lock:
+            if self.limit and self.used + size >= self.limit:
+                self.stop_event.set()
+                raise BudgetExceeded("Memory limit has been reached.")
+            domain_used = self.domain_used.get(domain, 0) + size
+            if self.domain_limit and domain_used > self.domain_limit:
+                raise BudgetExceeded(
+                    f"Memory limit of the domain '{domain}' has been reached."
+                    )
+            page_used = self.page_used.get(page, 0) + size
+            if self.page_limit and page_used > self.page_limit:
+                raise BudgetExceeded(
+                    f"Memory limit of the page '{page}' has been reached."
+                    )
+
+            self.used += size
+            self.domain_used[domain] = domain_used
+            self.page_used[page] = page_used
+
+    def refund(self, size: int, domain: str = "", page: str = "") -> None:
+        """Give back reserved bytes that have not been used."""
+        with self.lock:
+            self.used -= size
+            if domain in self.domain_used:
+                self.domain_used[domain] -= size
+            if page in self.page_used:
+                self.page_used[page] -= size
@@ -1,3 +1,5 @@
+import os
+
 # Type of the scraper
 SCRAPTYPE_STR = 0
 SCRAPTYPE_IMG = 1
@@ -10,8 +12,19 @@ HEADER = {
     )
 }
 
+# Size of the chunks read from the streamed downloads (in bytes)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Seconds without any data from the server before a download is retried
+DOWNLOAD_TIMEOUT = 30
+
 IMAGE_EXTENSIONS = [
-    ".jpeg", ".jpg", ".png", ".gif", ".bmp"
+    ".jpeg", ".jpg", ".png", ".gif", ".bmp", ".webp", ".tiff", ".tif"
+]
+
+# Spider detects the image format from the content, but doesn't download
+# the <img> sources of these types
+SKIPPED_EXTENSIONS = [
+    ".svg", ".svgz", ".ico", ".avif", ".heic"
 ]
 
 UNMODIFIABLE_TAGS = [
@@ -25,6 +38,12 @@ UNDELETABLE_TAGS = [
 
 EXIF_COMPATIBLE_FORMATS = ["JPEG", "JPG"]
 
+# Metadata cache of Scorpion and the viewer
+METADATA_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "arachnida", "metadata.db"
+    )
+
 # Size of the thumbnails
 THUMB_SIZE = 32
 
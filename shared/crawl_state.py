@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+from typing import Any
+from shared.ascii_format import GREEN, RED, YELLOW, RESET, INFO
+
+"""
+This module implements the incremental recrawl mode.
+
+After each run, the content hash, the validators sent by the server
+(ETag/Last-Modified) and the outlinks of every visited page are stored
+in a JSON state file, along with the hits found on the page for each
+search string.
+
+On the next run, a page whose content did not change is neither parsed
+nor searched again: its stored outlinks are reused to expand the crawl
+frontier and its stored hits are carried over.
+"""
+
+
+class CrawlState:
+    """
+    Usage:
+        state = CrawlState(path)
+        ...crawl...
+        state.print_diff(search_key)
+        state.save()
+    """
+    def __init__(self, path: str):
+        self.path: str = path
+
+        # Snapshot of the previous run, never modified during the crawl.
+        # Key: the page URL
+        # Value: dict with the keys 'hash', 'etag', 'last_modified',
+        #   'links' and 'hits' (search string -> list of hits)
+        self.previous: dict[str, dict[str, Any]] = {}
+        # State of the current run
+        self.current: dict[str, dict[str, Any]] = {}
+
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    self.previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ValueError(f"Could not load crawl state '{path}': {e}")
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def get_conditional_headers(self, url: str) -> dict[str, str]:
+        """
+        Return the headers that let the server answer '304 Not Modified'
+        if the page did not change since the previous run.
+        """
+        headers = {}
+        entry = self.previous.get(url)
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, content_hash: str | None) -> bool:
+        """
+        Check if the page is identical to the one of the previous run.
+        A None hash means that the server answered '304 Not Modified'.
+        """
+        entry = self.previous.get(url)
+        if not entry:
+            return False
+        return content_hash is None or entry.get('hash') == content_hash
+
+    def has_hits_for(self, url: str, search_key: str) -> bool:
+        """Check if the previous run searched the page for search_key."""
+        entry = self.previous.get(url)
+        return bool(entry) and search_key in entry.get('hits', {})
+
+    def reuse(self, url: str, search_key: str) -> tuple[list[str], list]:
+        """
+        Carry the entry of an unchanged page over to the current run.
+
+        Return
+        ------
+         - the stored outlinks and the stored hits for search_key
+        """
+        entry = self.previous[url]
+        # The previous hits of the other search keys are still valid
+        current = self.current.setdefault(url, {
+            'hash': entry.get('hash'),
+            'etag': entry.get('etag'),
+            'last_modified': entry.get('last_modified'),
+            'links': entry.get('links', []),
+            'hits': dict(entry.get('hits', {})),
+        })
+        hits = entry.get('hits', {}).get(search_key, [])
+        current['hits'][search_key] = hits
+        return current['links'], hits
+
+    def update(
+            self,
+            url: str,
+            search_key: str,
+            content_hash: str,
+            headers: Any,
+            links: list[str],
+            hits: list
+            ) -> None:
+        """Record the page as it has been seen during the current run."""
+        current = self.current.get(url)
+        # A different hash means that the page changed during the run
+        # (e.g. between two words of a word list): start over.
+        if not current or current.get('hash') != content_hash:
+            current = self.current[url] = {'hits': {}}
+        current['hash'] = content_hash
+        current['etag'] = headers.get('ETag')
+        current['last_modified'] = headers.get('Last-Modified')
+        current['links'] = links
+        current['hits'][search_key] = hits
+
+    def diff(self, search_key: str) -> dict[str, dict[str, list]]:
+        """
+        Compare the hits of the previous run with the current ones.
+
+        Return
+        ------
+         - a dict with the keys 'new', 'changed' and 'removed', each
+         containing a dict (URL -> list of hits)
+        """
+        result: dict[str, dict[str, list]] = {
+            'new': {}, 'changed': {}, 'removed': {}
+        }
+
+        def get_hits(state: dict, url: str) -> list:
+            return state.get(url, {}).get('hits', {}).get(search_key, [])
+
+        for url in self.current:
+            old_hits, new_hits = \
+                get_hits(self.previous, url), get_hits(self.current, url)
+            if new_hits and not old_hits:
+                result['new'][url] = new_hits
+            elif old_hits and not new_hits:
+                result['removed'][url] = old_hits
+            elif sorted(map(str, old_hits)) != sorted(map(str, new_hits)):
+                result['changed'][url] = new_hits
+
+        # Pages that could not be reached anymore
+        for url in self.previous:
+            if url not in self.current and get_hits(self.previous, url):
+                result['removed'][url] = get_hits(self.previous, url)
+
+        return result
+
+    def print_diff(self, search_key: str, verbose: bool = False) -> None:
+        """Print the new/changed/removed hits since the previous run."""
+        diff = self.diff(search_key)
+        labels = {
+            'new': f"{GREEN}+{RESET}",
+            'changed': f"{YELLOW}~{RESET}",
+            'removed': f"{RED}-{RESET}",
+        }
+
+        if verbose:
+            print(f"\n{INFO} Changes since the previous run:")
+        for kind, entries in diff.items():
+            for url, hits in entries.items():
+                print(f"{labels[kind]} {url}")
+                if verbose:
+                    for hit in hits:
+                        print(f"    {hit}")
+        if verbose:
+            print(
+                f"{INFO} {len(diff['new'])} new, "
+                f"{len(diff['changed'])} changed, "
+                f"{len(diff['removed'])} removed."
+                )
+
+    def save(self) -> None:
+        """Write the state of the current run to the state file."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.current, f)
+        os.replace(tmp_path, self.path)
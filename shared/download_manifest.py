@@ -0,0 +1,149 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any
+from shared.shard_store import get_file_path
+
+"""
+This module implements the persistent download manifest of Spider.
+
+The manifest is a SQLite database stored in the image folder. It records,
+for every downloaded image URL, the validators sent by the server
+(ETag/Last-Modified), the size and the hash of the content, and the path
+where it has been saved.
+
+It lets Spider skip (or conditionally revalidate) the images that have
+already been downloaded during a previous run, and restore the memory
+count of the folder.
+"""
+
+MANIFEST_FILE = ".manifest.db"
+
+
+class DownloadManifest:
+    """
+    The manifest can be used by several download threads.
+    """
+    def __init__(self, image_folder: str):
+        self.path: str = os.path.join(image_folder, MANIFEST_FILE)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+                )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS images_hash ON images (hash)"
+                )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS images_path ON images (path)"
+                )
+
+    def get(self, url: str) -> dict[str, Any] | None:
+        """
+        Return
+        ------
+         - the entry of the URL if its image is still on the disk,
+         otherwise None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM images WHERE url = ?", (url,)
+                ).fetchone()
+        if not row or not os.path.isfile(get_file_path(row["path"])):
+            return None
+        return dict(row)
+
+    def get_urls(self, path: str) -> list[str]:
+        """
+        Return
+        ------
+         - the URLs whose image has been saved to the path
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url FROM images WHERE path = ?", (path,)
+                ).fetchall()
+        return [row["url"] for row in rows]
+
+    def get_conditional_headers(self, entry: dict[str, Any]) -> dict:
+        """
+        Return the headers that let the server answer '304 Not Modified'
+        if the image did not change.
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(
+            self,
+            url: str,
+            headers: Any,
+            size: int,
+            digest: str,
+            path: str
+            ) -> None:
+        """Add or replace the entry of a downloaded image."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url, headers.get("ETag"), headers.get("Last-Modified"),
+                    size, digest, path, time.time()
+                )
+                )
+
+    def replace_path(
+            self, old_path: str, path: str, size: int, digest: str
+            ) -> None:
+        """Point the entries of a deleted image to the image replacing it."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE images SET path = ?, size = ?, hash = ? "
+                "WHERE path = ?",
+                (path, size, digest, old_path)
+                )
+
+    def touch(self, url: str) -> None:
+        """Mark the entry as checked, after a '304 Not Modified'."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE images SET fetched_at = ? WHERE url = ?",
+                (time.time(), url)
+                )
+
+    def get_used_memory(self) -> int:
+        """
+        Return
+        ------
+         - the size of the distinct contents that are still on the disk
+        """
+        sizes: dict[str, int] = {}
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT hash, size, path FROM images"
+                ).fetchall()
+        for row in rows:
+            if (row["hash"] not in sizes
+                    and os.path.isfile(get_file_path(row["path"]))):
+                sizes[row["hash"]] = row["size"]
+        return sum(sizes.values())
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,73 @@
+import queue
+import threading
+from typing import Any, Callable
+from shared.ascii_format import ERROR
+
+"""
+This module implements a bounded pool of worker threads.
+
+The crawling thread submits jobs to a queue of limited size, and the
+workers consume them concurrently. When the queue is full, submit()
+blocks until a worker is free: this backpressure keeps the crawl from
+running far ahead of the downloads.
+"""
+
+
+class DownloadPool:
+    """
+    Usage:
+        pool = DownloadPool(download_image, workers=4)
+        pool.submit(img_url, img_path, img_name)
+        ...
+        pool.close()
+    """
+    def __init__(
+            self,
+            worker: Callable[..., Any],
+            workers: int = 4,
+            queue_size: int = 0  # Default: 4 jobs per worker
+            ):
+        self.worker: Callable[..., Any] = worker
+        self.queue: queue.Queue = queue.Queue(
+            maxsize=queue_size if queue_size > 0 else workers * 4
+            )
+        self.threads: list[threading.Thread] = [
+            threading.Thread(target=self.run, daemon=True)
+            for _ in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def run(self) -> None:
+        """Loop of a worker thread."""
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:  # Sentinel sent by close()
+                    return
+                self.worker(*job)
+            except Exception as e:
+                print(f"{ERROR} {e}")
+            finally:
+                self.queue.task_done()
+
+    def submit(self, *args: Any) -> None:
+        """Add a job to the queue, block while the queue is full."""
+        self.queue.put(args)
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Stop the workers once the queued jobs are done.
+        If wait is False, the jobs that have not started are dropped.
+        """
+        if not wait:
+            try:
+                while True:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+            except queue.Empty:
+                pass
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -1,380 +1,315 @@
-exif_labels_dict = {
-    254: {"tag": "Image.NewSubfileType", "type": 4},
-    255: {"tag": "Image.SubfileType", "type": 3},
-    256: {"tag": "Image.ImageWidth", "type": 4},
-    257: {"tag": "Image.ImageLength", "type": 4},
-    258: {"tag": "Image.BitsPerSample", "type": 3},
-    259: {"tag": "Image.Compression", "type": 3},
-    262: {"tag": "Image.PhotometricInterpretation", "type": 3},
-    263: {"tag": "Image.Thresholding", "type": 3},
-    264: {"tag": "Image.CellWidth", "type": 3},
-    265: {"tag": "Image.CellLength", "type": 3},
-    266: {"tag": "Image.FillOrder", "type": 3},
-    269: {"tag": "Image.DocumentName", "type": 2},
-    270: {"tag": "Image.ImageDescription", "type": 2},
-    271: {"tag": "Image.Make", "type": 2},
-    272: {"tag": "Image.Model", "type": 2},
-    273: {"tag": "Image.StripOffsets", "type": 4},
-    274: {"tag": "Image.Orientation", "type": 3},
-    277: {"tag": "Image.SamplesPerPixel", "type": 3},
-    278: {"tag": "Image.RowsPerStrip", "type": 4},
-    279: {"tag": "Image.StripByteCounts", "type": 4},
-    282: {"tag": "Image.XResolution", "type": 5},
-    283: {"tag": "Image.YResolution", "type": 5},
-    284: {"tag": "Image.PlanarConfiguration", "type": 3},
-    285: {"tag": "Image.PageName", "type": 2},
-    286: {"tag": "Image.XPosition", "type": 5},
-    287: {"tag": "Image.YPosition", "type": 5},
-    290: {"tag": "Image.GrayResponseUnit", "type": 3},
-    291: {"tag": "Image.GrayResponseCurve", "type": 3},
-    292: {"tag": "Image.T4Options", "type": 4},
-    293: {"tag": "Image.T6Options", "type": 4},
-    296: {"tag": "Image.ResolutionUnit", "type": 3},
-    297: {"tag": "Image.PageNumber", "type": 3},
-    301: {"tag": "Image.TransferFunction", "type": 3},
-    305: {"tag": "Image.Software", "type": 2},
-    306: {"tag": "Image.DateTime", "type": 2},
-    315: {"tag": "Image.Artist", "type": 2},
-    316: {"tag": "Image.HostComputer", "type": 2},
-    317: {"tag": "Image.Predictor", "type": 3},
-    318: {"tag": "Image.WhitePoint", "type": 5},
-    319: {"tag": "Image.PrimaryChromaticities", "type": 5},
-    320: {"tag": "Image.ColorMap", "type": 3},
-    321: {"tag": "Image.HalftoneHints", "type": 3},
-    322: {"tag": "Image.TileWidth", "type": 4},
-    323: {"tag": "Image.TileLength", "type": 4},
-    324: {"tag": "Image.TileOffsets", "type": 3},
-    325: {"tag": "Image.TileByteCounts", "type": 4},
-    330: {"tag": "Image.SubIFDs", "type": 4},
-    332: {"tag": "Image.InkSet", "type": 3},
-    333: {"tag": "Image.InkNames", "type": 2},
-    334: {"tag": "Image.NumberOfInks", "type": 3},
-    336: {"tag": "Image.DotRange", "type": 1},
-    337: {"tag": "Image.TargetPrinter", "type": 2},
-    338: {"tag": "Image.ExtraSamples", "type": 3},
-    339: {"tag": "Image.SampleFormat", "type": 3},
-    340: {"tag": "Image.SMinSampleValue", "type": 3},
-    341: {"tag": "Image.SMaxSampleValue", "type": 3},
-    342: {"tag": "Image.TransferRange", "type": 3},
-    343: {"tag": "Image.ClipPath", "type": 1},
-    344: {"tag": "Image.XClipPathUnits", "type": 8},
-    345: {"tag": "Image.YClipPathUnits", "type": 8},
-    346: {"tag": "Image.Indexed", "type": 3},
-    347: {"tag": "Image.JPEGTables", "type": 7},
-    351: {"tag": "Image.OPIProxy", "type": 3},
-    512: {"tag": "Image.JPEGProc", "type": 4},
-    513: {"tag": "Image.JPEGInterchangeFormat", "type": 4},
-    514: {"tag": "Image.JPEGInterchangeFormatLength", "type": 4},
-    515: {"tag": "Image.JPEGRestartInterval", "type": 3},
-    517: {"tag": "Image.JPEGLosslessPredictors", "type": 3},
-    518: {"tag": "Image.JPEGPointTransforms", "type": 3},
-    519: {"tag": "Image.JPEGQTables", "type": 4},
-    520: {"tag": "Image.JPEGDCTables", "type": 4},
-    521: {"tag": "Image.JPEGACTables", "type": 4},
-    529: {"tag": "Image.YCbCrCoefficients", "type": 5},
-    530: {"tag": "Image.YCbCrSubSampling", "type": 3},
-    531: {"tag": "Image.YCbCrPositioning", "type": 3},
-    532: {"tag": "Image.ReferenceBlackWhite", "type": 5},
-    700: {"tag": "Image.XMLPacket", "type": 1},
-    18246: {"tag": "Image.Rating", "type": 3},
-    18249: {"tag": "Image.RatingPercent", "type": 3},
-    28722: {"tag": "Image.VignettingCorrParams", "type": 8},
-    28725: {"tag": "Image.ChromaticAberrationCorrParams", "type": 8},
-    28727: {"tag": "Image.DistortionCorrParams", "type": 8},
-    32781: {"tag": "Image.ImageID", "type": 2},
-    33421: {"tag": "Image.CFARepeatPatternDim", "type": 3},
-    33422: {"tag": "Image.CFAPattern", "type": 1},
-    33423: {"tag": "Image.BatteryLevel", "type": 5},
-    33432: {"tag": "Image.Copyright", "type": 2},
-    33434: {"tag": "Image.ExposureTime", "type": 5},
-    33437: {"tag": "Image.FNumber", "type": 5},
-    33723: {"tag": "Image.IPTCNAA", "type": 4},
-    34377: {"tag": "Image.ImageResources", "type": 1},
-    34665: {"tag": "Image.ExifTag", "type": 4},
-    34675: {"tag": "Image.InterColorProfile", "type": 7},
-    34850: {"tag": "Image.ExposureProgram", "type": 3},
-    34852: {"tag": "Image.SpectralSensitivity", "type": 2},
-    34853: {"tag": "Image.GPSTag", "type": 4},
-    34855: {"tag": "Image.ISOSpeedRatings", "type": 3},
-    34856: {"tag": "Image.OECF", "type": 7},
-    34857: {"tag": "Image.Interlace", "type": 3},
-    34858: {"tag": "Image.TimeZoneOffset", "type": 8},
-    34859: {"tag": "Image.SelfTimerMode", "type": 3},
-    36867: {"tag": "Image.DateTimeOriginal", "type": 2},
-    37122: {"tag": "Image.CompressedBitsPerPixel", "type": 5},
-    37377: {"tag": "Image.ShutterSpeedValue", "type": 10},
-    37378: {"tag": "Image.ApertureValue", "type": 5},
-    37379: {"tag": "Image.BrightnessValue", "type": 10},
-    37380: {"tag": "Image.ExposureBiasValue", "type": 10},
-    37381: {"tag": "Image.MaxApertureValue", "type": 5},
-    37382: {"tag": "Image.SubjectDistance", "type": 10},
-    37383: {"tag": "Image.MeteringMode", "type": 3},
-    37384: {"tag": "Image.LightSource", "type": 3},
-    37385: {"tag": "Image.Flash", "type": 3},
-    37386: {"tag": "Image.FocalLength", "type": 5},
-    37387: {"tag": "Image.FlashEnergy", "type": 5},
-    37388: {"tag": "Image.SpatialFrequencyResponse", "type": 7},
-    37389: {"tag": "Image.Noise", "type": 7},
-    37390: {"tag": "Image.FocalPlaneXResolution", "type": 5},
-    37391: {"tag": "Image.FocalPlaneYResolution", "type": 5},
-    37392: {"tag": "Image.FocalPlaneResolutionUnit", "type": 3},
-    37393: {"tag": "Image.ImageNumber", "type": 4},
-    37394: {"tag": "Image.SecurityClassification", "type": 2},
-    37395: {"tag": "Image.ImageHistory", "type": 2},
-    37396: {"tag": "Image.SubjectLocation", "type": 3},
-    37397: {"tag": "Image.ExposureIndex", "type": 5},
-    37398: {"tag": "Image.TIFFEPStandardID", "type": 1},
-    37399: {"tag": "Image.SensingMethod", "type": 3},
-    40091: {"tag": "Image.XPTitle", "type": 1},
-    40092: {"tag": "Image.XPComment", "type": 1},
-    40093: {"tag": "Image.XPAuthor", "type": 1},
-    40094: {"tag": "Image.XPKeywords", "type": 1},
-    40095: {"tag": "Image.XPSubject", "type": 1},
-    50341: {"tag": "Image.PrintImageMatching", "type": 7},
-    50706: {"tag": "Image.DNGVersion", "type": 1},
-    50707: {"tag": "Image.DNGBackwardVersion", "type": 1},
-    50708: {"tag": "Image.UniqueCameraModel", "type": 2},
-    50709: {"tag": "Image.LocalizedCameraModel", "type": 1},
-    50710: {"tag": "Image.CFAPlaneColor", "type": 1},
-    50711: {"tag": "Image.CFALayout", "type": 3},
-    50712: {"tag": "Image.LinearizationTable", "type": 3},
-    50713: {"tag": "Image.BlackLevelRepeatDim", "type": 3},
-    50714: {"tag": "Image.BlackLevel", "type": 5},
-    50715: {"tag": "Image.BlackLevelDeltaH", "type": 10},
-    50716: {"tag": "Image.BlackLevelDeltaV", "type": 10},
-    50717: {"tag": "Image.WhiteLevel", "type": 4},
-    50718: {"tag": "Image.DefaultScale", "type": 5},
-    50719: {"tag": "Image.DefaultCropOrigin", "type": 4},
-    50720: {"tag": "Image.DefaultCropSize", "type": 4},
-    50721: {"tag": "Image.ColorMatrix1", "type": 10},
-    50722: {"tag": "Image.ColorMatrix2", "type": 10},
-    50723: {"tag": "Image.CameraCalibration1", "type": 10},
-    50724: {"tag": "Image.CameraCalibration2", "type": 10},
-    50725: {"tag": "Image.ReductionMatrix1", "type": 10},
-    50726: {"tag": "Image.ReductionMatrix2", "type": 10},
-    50727: {"tag": "Image.AnalogBalance", "type": 5},
-    50728: {"tag": "Image.AsShotNeutral", "type": 3},
-    50729: {"tag": "Image.AsShotWhiteXY", "type": 5},
-    50730: {"tag": "Image.BaselineExposure", "type": 10},
-    50731: {"tag": "Image.BaselineNoise", "type": 5},
-    50732: {"tag": "Image.BaselineSharpness", "type": 5},
-    50733: {"tag": "Image.BayerGreenSplit", "type": 4},
-    50734: {"tag": "Image.LinearResponseLimit", "type": 5},
-    50735: {"tag": "Image.CameraSerialNumber", "type": 2},
-    50736: {"tag": "Image.LensInfo", "type": 5},
-    50737: {"tag": "Image.ChromaBlurRadius", "type": 5},
-    50738: {"tag": "Image.AntiAliasStrength", "type": 5},
-    50739: {"tag": "Image.ShadowScale", "type": 10},
-    50740: {"tag": "Image.DNGPrivateData", "type": 1},
-    50741: {"tag": "Image.MakerNoteSafety", "type": 3},
-    50778: {"tag": "Image.CalibrationIlluminant1", "type": 3},
-    50779: {"tag": "Image.CalibrationIlluminant2", "type": 3},
-    50780: {"tag": "Image.BestQualityScale", "type": 5},
-    50781: {"tag": "Image.RawDataUniqueID", "type": 1},
-    50827: {"tag": "Image.OriginalRawFileName", "type": 1},
-    50828: {"tag": "Image.OriginalRawFileData", "type": 7},
-    50829: {"tag": "Image.ActiveArea", "type": 4},
-    50830: {"tag": "Image.MaskedAreas", "type": 4},
-    50831: {"tag": "Image.AsShotICCProfile", "type": 7},
-    50832: {"tag": "Image.AsShotPreProfileMatrix", "type": 10},
-    50833: {"tag": "Image.CurrentICCProfile", "type": 7},
-    50834: {"tag": "Image.CurrentPreProfileMatrix", "type": 10},
-    50879: {"tag": "Image.ColorimetricReference", "type": 3},
-    50931: {"tag": "Image.CameraCalibrationSignature", "type": 1},
-    50932: {"tag": "Image.ProfileCalibrationSignature", "type": 1},
-    50933: {"tag": "Image.ExtraCameraProfiles", "type": 4},
-    50934: {"tag": "Image.AsShotProfileName", "type": 1},
-    50935: {"tag": "Image.NoiseReductionApplied", "type": 5},
-    50936: {"tag": "Image.ProfileName", "type": 1},
-    50937: {"tag": "Image.ProfileHueSatMapDims", "type": 4},
-    50938: {"tag": "Image.ProfileHueSatMapData1", "type": 11},
-    50939: {"tag": "Image.ProfileHueSatMapData2", "type": 11},
-    50940: {"tag": "Image.ProfileToneCurve", "type": 11},
-    50941: {"tag": "Image.ProfileEmbedPolicy", "type": 4},
-    50942: {"tag": "Image.ProfileCopyright", "type": 1},
-    50964: {"tag": "Image.ForwardMatrix1", "type": 10},
-    50965: {"tag": "Image.ForwardMatrix2", "type": 10},
-    50966: {"tag": "Image.PreviewApplicationName", "type": 1},
-    50967: {"tag": "Image.PreviewApplicationVersion", "type": 1},
-    50968: {"tag": "Image.PreviewSettingsName", "type": 1},
-    50969: {"tag": "Image.PreviewSettingsDigest", "type": 1},
-    50970: {"tag": "Image.PreviewColorSpace", "type": 4},
-    50971: {"tag": "Image.PreviewDateTime", "type": 2},
-    50972: {"tag": "Image.RawImageDigest", "type": 7},
-    50973: {"tag": "Image.OriginalRawFileDigest", "type": 7},
-    50974: {"tag": "Image.SubTileBlockSize", "type": 4},
-    50975: {"tag": "Image.RowInterleaveFactor", "type": 4},
-    50981: {"tag": "Image.ProfileLookTableDims", "type": 4},
-    50982: {"tag": "Image.ProfileLookTableData", "type": 11},
-    51008: {"tag": "Image.OpcodeList1", "type": 7},
-    51009: {"tag": "Image.OpcodeList2", "type": 7},
-    51022: {"tag": "Image.OpcodeList3", "type": 7},
-    51041: {"tag": "Image.NoiseProfile", "type": 13},
-    51043: {"tag": "Image.TimeCodes", "type": 1},
-    51044: {"tag": "Image.FrameRate", "type": 10},
-    51058: {"tag": "Image.TStop", "type": 10},
-    51081: {"tag": "Image.ReelName", "type": 2},
-    51105: {"tag": "Image.CameraLabel", "type": 2},
-    51089: {"tag": "Image.OriginalDefaultFinalSize", "type": 4},
-    51090: {"tag": "Image.OriginalBestQualityFinalSize", "type": 4},
-    51091: {"tag": "Image.OriginalDefaultCropSize", "type": 4},
-    51107: {"tag": "Image.ProfileHueSatMapEncoding", "type": 4},
-    51108: {"tag": "Image.ProfileLookTableEncoding", "type": 4},
-    51109: {"tag": "Image.BaselineExposureOffset", "type": 10},
-    51110: {"tag": "Image.DefaultBlackRender", "type": 4},
-    51111: {"tag": "Image.NewRawImageDigest", "type": 1},
-    51112: {"tag": "Image.RawToPreviewGain", "type": 13},
-    51125: {"tag": "Image.DefaultUserCrop", "type": 5},
-    51177: {"tag": "Image.DepthFormat", "type": 3},
-    51178: {"tag": "Image.DepthNear", "type": 5},
-    51179: {"tag": "Image.DepthFar", "type": 5},
-    51180: {"tag": "Image.DepthUnits", "type": 3},
-    51181: {"tag": "Image.DepthMeasureType", "type": 3},
-    51182: {"tag": "Image.EnhanceParams", "type": 2},
-    52525: {"tag": "Image.ProfileGainTableMap", "type": 7},
-    52526: {"tag": "Image.SemanticName", "type": 2},
-    52528: {"tag": "Image.SemanticInstanceID", "type": 2},
-    52529: {"tag": "Image.CalibrationIlluminant3", "type": 3},
-    52530: {"tag": "Image.CameraCalibration3", "type": 10},
-    52531: {"tag": "Image.ColorMatrix3", "type": 10},
-    52532: {"tag": "Image.ForwardMatrix3", "type": 10},
-    52533: {"tag": "Image.IlluminantData1", "type": 7},
-    52534: {"tag": "Image.IlluminantData2", "type": 7},
-    52535: {"tag": "Image.IlluminantData3", "type": 7},
-    52536: {"tag": "Image.MaskSubArea", "type": 4},
-    52537: {"tag": "Image.ProfileHueSatMapData3", "type": 11},
-    52538: {"tag": "Image.ReductionMatrix3", "type": 10},
-    52543: {"tag": "Image.RGBTables", "type": 7},
-    52544: {"tag": "Image.ProfileGainTableMap2", "type": 7},
-    52547: {"tag": "Image.ColumnInterleaveFactor", "type": 4},
-    52548: {"tag": "Image.ImageSequenceInfo", "type": 7},
-    52550: {"tag": "Image.ImageStats", "type": 7},
-    52551: {"tag": "Image.ProfileDynamicRange", "type": 7},
-    52552: {"tag": "Image.ProfileGroupName", "type": 2},
-    52553: {"tag": "Image.JXLDistance", "type": 11},
-    52554: {"tag": "Image.JXLEffort", "type": 4},
-    52555: {"tag": "Image.JXLDecodeSpeed", "type": 4},
-    34864: {"tag": "Photo.SensitivityType", "type": 3},
-    34865: {"tag": "Photo.StandardOutputSensitivity", "type": 4},
-    34866: {"tag": "Photo.RecommendedExposureIndex", "type": 4},
-    34868: {"tag": "Photo.ISOSpeedLatitudeyyy", "type": 4},
-    34869: {"tag": "Photo.ISOSpeedLatitudezzz", "type": 4},
-    36864: {"tag": "Photo.ExifVersion", "type": 7},
-    36868: {"tag": "Photo.DateTimeDigitized", "type": 2},
-    36880: {"tag": "Photo.OffsetTime", "type": 2},
-    36881: {"tag": "Photo.OffsetTimeOriginal", "type": 2},
-    36882: {"tag": "Photo.OffsetTimeDigitized", "type": 2},
-    37121: {"tag": "Photo.ComponentsConfiguration", "type": 7},
-    37500: {"tag": "Photo.MakerNote", "type": 7},
-    37510: {"tag": "Photo.UserComment", "type": 13},
-    37520: {"tag": "Photo.SubSecTime", "type": 2},
-    37521: {"tag": "Photo.SubSecTimeOriginal", "type": 2},
-    37522: {"tag": "Photo.SubSecTimeDigitized", "type": 2},
-    37888: {"tag": "Photo.Temperature", "type": 10},
-    37889: {"tag": "Photo.Humidity", "type": 5},
-    37890: {"tag": "Photo.Pressure", "type": 5},
-    37891: {"tag": "Photo.WaterDepth", "type": 10},
-    37892: {"tag": "Photo.Acceleration", "type": 5},
-    37893: {"tag": "Photo.CameraElevationAngle", "type": 10},
-    40960: {"tag": "Photo.FlashpixVersion", "type": 7},
-    40961: {"tag": "Photo.ColorSpace", "type": 3},
-    40962: {"tag": "Photo.PixelXDimension", "type": 4},
-    40963: {"tag": "Photo.PixelYDimension", "type": 4},
-    40964: {"tag": "Photo.RelatedSoundFile", "type": 2},
-    40965: {"tag": "Photo.InteroperabilityTag", "type": 4},
-    41483: {"tag": "Photo.FlashEnergy", "type": 5},
-    41484: {"tag": "Photo.SpatialFrequencyResponse", "type": 7},
-    41486: {"tag": "Photo.FocalPlaneXResolution", "type": 5},
-    41487: {"tag": "Photo.FocalPlaneYResolution", "type": 5},
-    41488: {"tag": "Photo.FocalPlaneResolutionUnit", "type": 3},
-    41492: {"tag": "Photo.SubjectLocation", "type": 3},
-    41493: {"tag": "Photo.ExposureIndex", "type": 5},
-    41495: {"tag": "Photo.SensingMethod", "type": 3},
-    41728: {"tag": "Photo.FileSource", "type": 7},
-    41729: {"tag": "Photo.SceneType", "type": 7},
-    41730: {"tag": "Photo.CFAPattern", "type": 7},
-    41985: {"tag": "Photo.CustomRendered", "type": 3},
-    41986: {"tag": "Photo.ExposureMode", "type": 3},
-    41987: {"tag": "Photo.WhiteBalance", "type": 3},
-    41988: {"tag": "Photo.DigitalZoomRatio", "type": 5},
-    41989: {"tag": "Photo.FocalLengthIn35mmFilm", "type": 3},
-    41990: {"tag": "Photo.SceneCaptureType", "type": 3},
-    41991: {"tag": "Photo.GainControl", "type": 3},
-    41992: {"tag": "Photo.Contrast", "type": 3},
-    41993: {"tag": "Photo.Saturation", "type": 3},
-    41994: {"tag": "Photo.Sharpness", "type": 3},
-    41995: {"tag": "Photo.DeviceSettingDescription", "type": 7},
-    41996: {"tag": "Photo.SubjectDistanceRange", "type": 3},
-    42016: {"tag": "Photo.ImageUniqueID", "type": 2},
-    42032: {"tag": "Photo.CameraOwnerName", "type": 2},
-    42033: {"tag": "Photo.BodySerialNumber", "type": 2},
-    42034: {"tag": "Photo.LensSpecification", "type": 5},
-    42035: {"tag": "Photo.LensMake", "type": 2},
-    42036: {"tag": "Photo.LensModel", "type": 2},
-    42037: {"tag": "Photo.LensSerialNumber", "type": 2},
-    42038: {"tag": "Photo.ImageTitle", "type": 2},
-    42039: {"tag": "Photo.Photographer", "type": 2},
-    42040: {"tag": "Photo.ImageEditor", "type": 2},
-    42041: {"tag": "Photo.CameraFirmware", "type": 2},
-    42042: {"tag": "Photo.RAWDevelopingSoftware", "type": 2},
-    42043: {"tag": "Photo.ImageEditingSoftware", "type": 2},
-    42044: {"tag": "Photo.MetadataEditingSoftware", "type": 2},
-    42080: {"tag": "Photo.CompositeImage", "type": 3},
-    42081: {"tag": "Photo.SourceImageNumberOfCompositeImage", "type": 3},
-    42082: {"tag": "Photo.SourceExposureTimesOfCompositeImage", "type": 7},
-    42240: {"tag": "Photo.Gamma", "type": 5},
-    4096: {"tag": "Iop.RelatedImageFileFormat", "type": 2},
-    4097: {"tag": "Iop.RelatedImageWidth", "type": 4},
-    4098: {"tag": "Iop.RelatedImageLength", "type": 4},
-    0: {"tag": "GPSInfo.GPSVersionID", "type": 1},
-    1: {"tag": "GPSInfo.GPSLatitudeRef", "type": 2},
-    2: {"tag": "GPSInfo.GPSLatitude", "type": 5},
-    3: {"tag": "GPSInfo.GPSLongitudeRef", "type": 2},
-    4: {"tag": "GPSInfo.GPSLongitude", "type": 5},
-    5: {"tag": "GPSInfo.GPSAltitudeRef", "type": 1},
-    6: {"tag": "GPSInfo.GPSAltitude", "type": 5},
-    7: {"tag": "GPSInfo.GPSTimeStamp", "type": 5},
-    8: {"tag": "GPSInfo.GPSSatellites", "type": 2},
-    9: {"tag": "GPSInfo.GPSStatus", "type": 2},
-    10: {"tag": "GPSInfo.GPSMeasureMode", "type": 2},
-    11: {"tag": "GPSInfo.GPSDOP", "type": 5},
-    12: {"tag": "GPSInfo.GPSSpeedRef", "type": 2},
-    13: {"tag": "GPSInfo.GPSSpeed", "type": 5},
-    14: {"tag": "GPSInfo.GPSTrackRef", "type": 2},
-    15: {"tag": "GPSInfo.GPSTrack", "type": 5},
-    16: {"tag": "GPSInfo.GPSImgDirectionRef", "type": 2},
-    17: {"tag": "GPSInfo.GPSImgDirection", "type": 5},
-    18: {"tag": "GPSInfo.GPSMapDatum", "type": 2},
-    19: {"tag": "GPSInfo.GPSDestLatitudeRef", "type": 2},
-    20: {"tag": "GPSInfo.GPSDestLatitude", "type": 5},
-    21: {"tag": "GPSInfo.GPSDestLongitudeRef", "type": 2},
-    22: {"tag": "GPSInfo.GPSDestLongitude", "type": 5},
-    23: {"tag": "GPSInfo.GPSDestBearingRef", "type": 2},
-    24: {"tag": "GPSInfo.GPSDestBearing", "type": 5},
-    25: {"tag": "GPSInfo.GPSDestDistanceRef", "type": 2},
-    26: {"tag": "GPSInfo.GPSDestDistance", "type": 5},
-    27: {"tag": "GPSInfo.GPSProcessingMethod", "type": 13},
-    28: {"tag": "GPSInfo.GPSAreaInformation", "type": 13},
-    29: {"tag": "GPSInfo.GPSDateStamp", "type": 2},
-    30: {"tag": "GPSInfo.GPSDifferential", "type": 3},
-    31: {"tag": "GPSInfo.GPSHPositioningError", "type": 5},
-    45056: {"tag": "MpfInfo.MPFVersion", "type": 2},
-    45057: {"tag": "MpfInfo.MPFNumberOfImages", "type": 7},
-    45058: {"tag": "MpfInfo.MPFImageList", "type": 2},
-    45059: {"tag": "MpfInfo.MPFImageUIDList", "type": 4},
-    45060: {"tag": "MpfInfo.MPFTotalFrames", "type": 4},
-    45313: {"tag": "MpfInfo.MPFIndividualNum", "type": 4},
-    45569: {"tag": "MpfInfo.MPFPanOrientation", "type": 4},
-    45570: {"tag": "MpfInfo.MPFPanOverlapH", "type": 4},
-    45571: {"tag": "MpfInfo.MPFPanOverlapV", "type": 4},
-    45572: {"tag": "MpfInfo.MPFBaseViewpointNum", "type": 4},
-    45573: {"tag": "MpfInfo.MPFConvergenceAngle", "type": 4},
-    45574: {"tag": "MpfInfo.MPFBaselineLength", "type": 4},
-    45575: {"tag": "MpfInfo.MPFVerticalDivergence", "type": 4},
-    45576: {"tag": "MpfInfo.MPFAxisDistanceX", "type": 4},
-    45577: {"tag": "MpfInfo.MPFAxisDistanceY", "type": 4},
-    45578: {"tag": "MpfInfo.MPFAxisDistanceZ", "type": 4},
-    45579: {"tag": "MpfInfo.MPFYawAngle", "type": 4},
-    45580: {"tag": "MpfInfo.MPFPitchAngle", "type": 4},
-    45581: {"tag": "MpfInfo.MPFRollAngle", "type": 4},
+# Generated by generate_exif_labels_dict.sh from standard_exif_tags.txt,
+# do not edit.
+from array import array
+from typing import Any
+
+"""
+The standard EXIF tags, by IFD: Image (IFD0), Photo (Exif IFD), GPSInfo,
+Iop (interoperability IFD) and MpfInfo, whose tag IDs overlap.
+
+Each IFD has a compact table: an array of tag IDs, a string of short tag
+names and the bytes of the type numbers (see exif_reader.FIELD_TYPES).
+The lookup dictionary of an IFD is only built when the IFD is first used,
+then a tag is resolved by a single lookup:
+
+    name, tag_type = get_ifd_tags(IFD_GPS)[2]  # ("GPSLatitude", 5)
+
+The former table, exif_labels_dict ({tag ID: {"tag": "Image.Make",
+"type": 2}}, with the tags of all the IFDs mixed), is built on demand.
+"""
+
+IFD_IMAGE = "Image"
+IFD_PHOTO = "Photo"
+IFD_GPS = "GPSInfo"
+IFD_IOP = "Iop"
+IFD_MPF = "MpfInfo"
+
+# IFD -> (tag IDs, short tag names separated by spaces, type numbers)
+_TABLES: dict[str, tuple[array, str, bytes]] = {
+    "Image": (
+        array("H", [
+            11, 254, 255, 256, 257, 258, 259, 262,
+            263, 264, 265, 266, 269, 270, 271, 272,
+            273, 274, 277, 278, 279, 282, 283, 284,
+            285, 286, 287, 290, 291, 292, 293, 296,
+            297, 301, 305, 306, 315, 316, 317, 318,
+            319, 320, 321, 322, 323, 324, 325, 330,
+            332, 333, 334, 336, 337, 338, 339, 340,
+            341, 342, 343, 344, 345, 346, 347, 351,
+            512, 513, 514, 515, 517, 518, 519, 520,
+            521, 529, 530, 531, 532, 700, 18246, 18249,
+            28722, 28725, 28727, 32781, 33421, 33422, 33423, 33432,
+            33434, 33437, 33723, 34377, 34665, 34675, 34850, 34852,
+            34853, 34855, 34856, 34857, 34858, 34859, 36867, 37122,
+            37377, 37378, 37379, 37380, 37381, 37382, 37383, 37384,
+            37385, 37386, 37387, 37388, 37389, 37390, 37391, 37392,
+            37393, 37394, 37395, 37396, 37397, 37398, 37399, 40091,
+            40092, 40093, 40094, 40095, 50341, 50706, 50707, 50708,
+            50709, 50710, 50711, 50712, 50713, 50714, 50715, 50716,
+            50717, 50718, 50719, 50720, 50721, 50722, 50723, 50724,
+            50725, 50726, 50727, 50728, 50729, 50730, 50731, 50732,
+            50733, 50734, 50735, 50736, 50737, 50738, 50739, 50740,
+            50741, 50778, 50779, 50780, 50781, 50827, 50828, 50829,
+            50830, 50831, 50832, 50833, 50834, 50879, 50931, 50932,
+            50933, 50934, 50935, 50936, 50937, 50938, 50939, 50940,
+            50941, 50942, 50964, 50965, 50966, 50967, 50968, 50969,
+            50970, 50971, 50972, 50973, 50974, 50975, 50981, 50982,
+            51008, 51009, 51022, 51041, 51043, 51044, 51058, 51081,
+            51105, 51089, 51090, 51091, 51107, 51108, 51109, 51110,
+            51111, 51112, 51125, 51177, 51178, 51179, 51180, 51181,
+            51182, 52525, 52526, 52528, 52529, 52530, 52531, 52532,
+            52533, 52534, 52535, 52536, 52537, 52538, 52543, 52544,
+            52547, 52548, 52550, 52551, 52552, 52553, 52554, 52555,
+        ]),
+        "ProcessingSoftware NewSubfileType SubfileType ImageWidth "
+        "ImageLength BitsPerSample Compression PhotometricInterpretation "
+        "Thresholding CellWidth CellLength FillOrder DocumentName "
+        "ImageDescription Make Model StripOffsets Orientation "
+        "SamplesPerPixel RowsPerStrip StripByteCounts XResolution "
+        "YResolution PlanarConfiguration PageName XPosition YPosition "
+        "GrayResponseUnit GrayResponseCurve T4Options T6Options "
+        "ResolutionUnit PageNumber TransferFunction Software DateTime "
+        "Artist HostComputer Predictor WhitePoint PrimaryChromaticities "
+        "ColorMap HalftoneHints TileWidth TileLength TileOffsets "
+        "TileByteCounts SubIFDs InkSet InkNames NumberOfInks DotRange "
+        "TargetPrinter ExtraSamples SampleFormat SMinSampleValue "
+        "SMaxSampleValue TransferRange ClipPath XClipPathUnits "
+        "YClipPathUnits Indexed JPEGTables OPIProxy JPEGProc "
+        "JPEGInterchangeFormat JPEGInterchangeFormatLength "
+        "JPEGRestartInterval JPEGLosslessPredictors JPEGPointTransforms "
+        "JPEGQTables JPEGDCTables JPEGACTables YCbCrCoefficients "
+        "YCbCrSubSampling YCbCrPositioning ReferenceBlackWhite XMLPacket "
+        "Rating RatingPercent VignettingCorrParams "
+        "ChromaticAberrationCorrParams DistortionCorrParams ImageID "
+        "CFARepeatPatternDim CFAPattern BatteryLevel Copyright "
+        "ExposureTime FNumber IPTCNAA ImageResources ExifTag "
+        "InterColorProfile ExposureProgram SpectralSensitivity GPSTag "
+        "ISOSpeedRatings OECF Interlace TimeZoneOffset SelfTimerMode "
+        "DateTimeOriginal CompressedBitsPerPixel ShutterSpeedValue "
+        "ApertureValue BrightnessValue ExposureBiasValue "
+        "MaxApertureValue SubjectDistance MeteringMode LightSource Flash "
+        "FocalLength FlashEnergy SpatialFrequencyResponse Noise "
+        "FocalPlaneXResolution FocalPlaneYResolution "
+        "FocalPlaneResolutionUnit ImageNumber SecurityClassification "
+        "ImageHistory SubjectLocation ExposureIndex TIFFEPStandardID "
+        "SensingMethod XPTitle XPComment XPAuthor XPKeywords XPSubject "
+        "PrintImageMatching DNGVersion DNGBackwardVersion "
+        "UniqueCameraModel LocalizedCameraModel CFAPlaneColor CFALayout "
+        "LinearizationTable BlackLevelRepeatDim BlackLevel "
+        "BlackLevelDeltaH BlackLevelDeltaV WhiteLevel DefaultScale "
+        "DefaultCropOrigin DefaultCropSize ColorMatrix1 ColorMatrix2 "
+        "CameraCalibration1 CameraCalibration2 ReductionMatrix1 "
+        "ReductionMatrix2 AnalogBalance AsShotNeutral AsShotWhiteXY "
+        "BaselineExposure BaselineNoise BaselineSharpness "
+        "BayerGreenSplit LinearResponseLimit CameraSerialNumber LensInfo "
+        "ChromaBlurRadius AntiAliasStrength ShadowScale DNGPrivateData "
+        "MakerNoteSafety CalibrationIlluminant1 CalibrationIlluminant2 "
+        "BestQualityScale RawDataUniqueID OriginalRawFileName "
+        "OriginalRawFileData ActiveArea MaskedAreas AsShotICCProfile "
+        "AsShotPreProfileMatrix CurrentICCProfile "
+        "CurrentPreProfileMatrix ColorimetricReference "
+        "CameraCalibrationSignature ProfileCalibrationSignature "
+        "ExtraCameraProfiles AsShotProfileName NoiseReductionApplied "
+        "ProfileName ProfileHueSatMapDims ProfileHueSatMapData1 "
+        "ProfileHueSatMapData2 ProfileToneCurve ProfileEmbedPolicy "
+        "ProfileCopyright ForwardMatrix1 ForwardMatrix2 "
+        "PreviewApplicationName PreviewApplicationVersion "
+        "PreviewSettingsName PreviewSettingsDigest PreviewColorSpace "
+        "PreviewDateTime RawImageDigest OriginalRawFileDigest "
+        "SubTileBlockSize RowInterleaveFactor ProfileLookTableDims "
+        "ProfileLookTableData OpcodeList1 OpcodeList2 OpcodeList3 "
+        "NoiseProfile TimeCodes FrameRate TStop ReelName CameraLabel "
+        "OriginalDefaultFinalSize OriginalBestQualityFinalSize "
+        "OriginalDefaultCropSize ProfileHueSatMapEncoding "
+        "ProfileLookTableEncoding BaselineExposureOffset "
+        "DefaultBlackRender NewRawImageDigest RawToPreviewGain "
+        "DefaultUserCrop DepthFormat DepthNear DepthFar DepthUnits "
+        "DepthMeasureType EnhanceParams ProfileGainTableMap SemanticName "
+        "SemanticInstanceID CalibrationIlluminant3 CameraCalibration3 "
+        "ColorMatrix3 ForwardMatrix3 IlluminantData1 IlluminantData2 "
+        "IlluminantData3 MaskSubArea ProfileHueSatMapData3 "
+        "ReductionMatrix3 RGBTables ProfileGainTableMap2 "
+        "ColumnInterleaveFactor ImageSequenceInfo ImageStats "
+        "ProfileDynamicRange ProfileGroupName JXLDistance JXLEffort "
+        "JXLDecodeSpeed ",
+        bytes.fromhex(
+            "020403040403030303030303020202020403030404050503"
+            "020505030304040303030202020203050503030404030404"
+            "030203010203030303030108080307030404040303030404"
+            "040503030501030308080802030105020505040104070302"
+            "04030703080302050a050a0a050a03030305050707050503"
+            "040202030501030101010101070101020101030303050a0a"
+            "040504040a0a0a0a0a0a0503050a05050405020505050a01"
+            "030303050101070404070a070a03010104010501040b0b0b"
+            "04010a0a01010101040207070404040b0707070c010a0a02"
+            "0204040404040a04010c05030505030302070202030a0a0a"
+            "070707040b0a070704070707020b0404"
+        )
+    ),
+    "Photo": (
+        array("H", [
+            33434, 33437, 34850, 34852, 34855, 34856, 34864, 34865,
+            34866, 34867, 34868, 34869, 36864, 36867, 36868, 36880,
+            36881, 36882, 37121, 37122, 37377, 37378, 37379, 37380,
+            37381, 37382, 37383, 37384, 37385, 37386, 37396, 37500,
+            37510, 37520, 37521, 37522, 37888, 37889, 37890, 37891,
+            37892, 37893, 40960, 40961, 40962, 40963, 40964, 40965,
+            41483, 41484, 41486, 41487, 41488, 41492, 41493, 41495,
+            41728, 41729, 41730, 41985, 41986, 41987, 41988, 41989,
+            41990, 41991, 41992, 41993, 41994, 41995, 41996, 42016,
+            42032, 42033, 42034, 42035, 42036, 42037, 42038, 42039,
+            42040, 42041, 42042, 42043, 42044, 42080, 42081, 42082,
+            42240,
+        ]),
+        "ExposureTime FNumber ExposureProgram SpectralSensitivity "
+        "ISOSpeedRatings OECF SensitivityType StandardOutputSensitivity "
+        "RecommendedExposureIndex ISOSpeed ISOSpeedLatitudeyyy "
+        "ISOSpeedLatitudezzz ExifVersion DateTimeOriginal "
+        "DateTimeDigitized OffsetTime OffsetTimeOriginal "
+        "OffsetTimeDigitized ComponentsConfiguration "
+        "CompressedBitsPerPixel ShutterSpeedValue ApertureValue "
+        "BrightnessValue ExposureBiasValue MaxApertureValue "
+        "SubjectDistance MeteringMode LightSource Flash FocalLength "
+        "SubjectArea MakerNote UserComment SubSecTime SubSecTimeOriginal "
+        "SubSecTimeDigitized Temperature Humidity Pressure WaterDepth "
+        "Acceleration CameraElevationAngle FlashpixVersion ColorSpace "
+        "PixelXDimension PixelYDimension RelatedSoundFile "
+        "InteroperabilityTag FlashEnergy SpatialFrequencyResponse "
+        "FocalPlaneXResolution FocalPlaneYResolution "
+        "FocalPlaneResolutionUnit SubjectLocation ExposureIndex "
+        "SensingMethod FileSource SceneType CFAPattern CustomRendered "
+        "ExposureMode WhiteBalance DigitalZoomRatio "
+        "FocalLengthIn35mmFilm SceneCaptureType GainControl Contrast "
+        "Saturation Sharpness DeviceSettingDescription "
+        "SubjectDistanceRange ImageUniqueID CameraOwnerName "
+        "BodySerialNumber LensSpecification LensMake LensModel "
+        "LensSerialNumber ImageTitle Photographer ImageEditor "
+        "CameraFirmware RAWDevelopingSoftware ImageEditingSoftware "
+        "MetadataEditingSoftware CompositeImage "
+        "SourceImageNumberOfCompositeImage "
+        "SourceExposureTimesOfCompositeImage Gamma ",
+        bytes.fromhex(
+            "05050302030703040404040407020202020207050a050a0a"
+            "0505030303050307070202020a05050a050a070304040204"
+            "050705050303050307070703030305030303030303070302"
+            "0202050202020202020202020203030705"
+        )
+    ),
+    "Iop": (
+        array("H", [
+            1, 2, 4096, 4097, 4098,
+        ]),
+        "InteroperabilityIndex InteroperabilityVersion "
+        "RelatedImageFileFormat RelatedImageWidth RelatedImageLength ",
+        bytes.fromhex(
+            "0207020404"
+        )
+    ),
+    "GPSInfo": (
+        array("H", [
+            0, 1, 2, 3, 4, 5, 6, 7,
+            8, 9, 10, 11, 12, 13, 14, 15,
+            16, 17, 18, 19, 20, 21, 22, 23,
+            24, 25, 26, 27, 28, 29, 30, 31,
+        ]),
+        "GPSVersionID GPSLatitudeRef GPSLatitude GPSLongitudeRef "
+        "GPSLongitude GPSAltitudeRef GPSAltitude GPSTimeStamp "
+        "GPSSatellites GPSStatus GPSMeasureMode GPSDOP GPSSpeedRef "
+        "GPSSpeed GPSTrackRef GPSTrack GPSImgDirectionRef "
+        "GPSImgDirection GPSMapDatum GPSDestLatitudeRef GPSDestLatitude "
+        "GPSDestLongitudeRef GPSDestLongitude GPSDestBearingRef "
+        "GPSDestBearing GPSDestDistanceRef GPSDestDistance "
+        "GPSProcessingMethod GPSAreaInformation GPSDateStamp "
+        "GPSDifferential GPSHPositioningError ",
+        bytes.fromhex(
+            "010205020501050502020205020502050205020205020502"
+            "0502050707020305"
+        )
+    ),
+    "MpfInfo": (
+        array("H", [
+            45056, 45057, 45058, 45059, 45060, 45313, 45569, 45570,
+            45571, 45572, 45573, 45574, 45575, 45576, 45577, 45578,
+            45579, 45580, 45581,
+        ]),
+        "MPFVersion MPFNumberOfImages MPFImageList MPFImageUIDList "
+        "MPFTotalFrames MPFIndividualNum MPFPanOrientation "
+        "MPFPanOverlapH MPFPanOverlapV MPFBaseViewpointNum "
+        "MPFConvergenceAngle MPFBaselineLength MPFVerticalDivergence "
+        "MPFAxisDistanceX MPFAxisDistanceY MPFAxisDistanceZ MPFYawAngle "
+        "MPFPitchAngle MPFRollAngle ",
+        bytes.fromhex(
+            "02070204040404040404040404040404040404"
+        )
+    ),
 }
+
+# Lookup dictionaries of the IFDs already used: tag ID -> (name, type)
+_ifd_tags: dict[str, dict[int, tuple[str, int]]] = {}
+
+
+def get_ifd_tags(ifd: str = IFD_IMAGE) -> dict[int, tuple[str, int]]:
+    """
+    Return
+    ------
+     - the tags of the IFD: tag ID -> (short tag name, type number)
+    """
+    tags = _ifd_tags.get(ifd)
+    if tags is None:
+        tag_ids, names, types = _TABLES.get(ifd, (array("H"), "", b""))
+        tags = dict(zip(tag_ids, zip(names.split(), types)))
+        _ifd_tags[ifd] = tags
+    return tags
+
+
+def get_tag_name(tag_id: int, ifd: str = IFD_IMAGE) -> str | None:
+    """
+    Return
+    ------
+     - the short name of the tag (e.g. 'Model'), or None if it is unknown
+    """
+    tag = get_ifd_tags(ifd).get(tag_id)
+    return tag[0] if tag else None
+
+
+def get_tag_type(tag_id: int, ifd: str = IFD_IMAGE) -> int:
+    """
+    Return
+    ------
+     - the type number of the tag, or 0 if it is unknown
+    """
+    tag = get_ifd_tags(ifd).get(tag_id)
+    return tag[1] if tag else 0
+
+
+def get_ifd0_tag(tag_id: int) -> tuple[str, int] | None:
+    """
+    Some files store the tags of the Exif IFD directly in IFD0 (e.g.
+    UserComment, DateTimeDigitized): the tags of IFD0 are looked up in
+    the Image IFD, then in the Photo IFD.
+
+    Return
+    ------
+     - the (short tag name, type number) of the tag, or None if it is
+     unknown
+    """
+    return get_ifd_tags(IFD_IMAGE).get(tag_id) \
+        or get_ifd_tags(IFD_PHOTO).get(tag_id)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Build exif_labels_dict when it is first used. A tag ID shared by
+    several IFDs gets the tag of the first one.
+    """
+    if name == "exif_labels_dict":
+        labels: dict[int, dict[str, Any]] = {}
+        for ifd, (tag_ids, names, types) in _TABLES.items():
+            for tag_id, tag_name, tag_type in zip(
+                    tag_ids, names.split(), types):
+                labels.setdefault(
+                    tag_id, {"tag": f"{ifd}.{tag_name}", "type": tag_type}
+                    )
+        globals()[name] = labels
+        return labels
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,288 @@
+import os
+import mmap
+import struct
+from typing import Any, BinaryIO
+from shared.image_probe import detect_format, TAG_EXIF_IFD, TAG_GPS_IFD
+
+"""
+This module reads the metadata of JPEG and PNG images from their header,
+without going through the decoding machinery of Pillow.
+
+The file is memory-mapped: the segments (JPEG) or chunks (PNG) are walked
+with their lengths, and only the EXIF segment is copied, whatever the size
+of the image data. The EXIF entries (IFD0, then the Exif and GPS IFDs on
+demand) are decoded directly from their TIFF structure.
+
+The values have the same types as with Pillow, so that Scorpion displays
+and searches the same metadata:
+    Ascii: str
+    Byte and Undefined: bytes
+    Rationals: float (nan when the denominator is 0)
+    Numbers: int or float
+and several values are grouped in a tuple.
+
+The other formats and the unusual files (e.g. multi-picture JPEG, 12-bit
+JPEG, orientation stored in XMP only) are left to Pillow: the functions
+return None for them.
+"""
+
+# Size of a value and struct format of the TIFF field types, numbered as
+# the types of exif_labels.py (the rationals are two longs)
+FIELD_TYPES = {
+    1: (1, ""),  # Byte
+    2: (1, ""),  # Ascii
+    3: (2, "H"),  # Short
+    4: (4, "L"),  # Long
+    5: (8, "L"),  # Rational
+    6: (1, "b"),  # SByte
+    7: (1, ""),  # Undefined
+    8: (2, "h"),  # SShort
+    9: (4, "l"),  # SLong
+    10: (8, "l"),  # SRational
+    11: (4, "f"),  # Float
+    12: (8, "d"),  # DFloat
+    13: (4, "L"),  # IFD
+}
+TYPE_ASCII = 2
+RATIONAL_TYPES = (5, 10)
+
+# Modes of the PNG images, by (bit depth, color type)
+PNG_MODES = {
+    (1, 0): "1", (2, 0): "L", (4, 0): "L", (8, 0): "L", (16, 0): "I;16",
+    (8, 2): "RGB", (16, 2): "RGB",
+    (1, 3): "P", (2, 3): "P", (4, 3): "P", (8, 3): "P",
+    (8, 4): "LA", (16, 4): "RGBA",
+    (8, 6): "RGBA", (16, 6): "RGBA",
+}
+# Modes of the JPEG images, by number of components
+JPEG_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+
+# PNG text chunks that Pillow turns into metadata
+PNG_HANDLED_KEYS = (b"Raw profile type exif", b"XML:com.adobe.xmp", b"comment")
+
+XMP_SIGNATURE = b"http://ns.adobe.com/xap/1.0/\0"
+TAG_ORIENTATION = 0x0112
+
+
+def decode_value(endian: str, field_type: int, data: bytes) -> Any:
+    if field_type == TYPE_ASCII:
+        # Pillow removes a single terminating null character
+        if data.endswith(b"\0"):
+            data = data[:-1]
+        return data.decode("latin-1", "replace")
+
+    value_format = FIELD_TYPES[field_type][1]
+    if not value_format:  # Byte or Undefined
+        return data
+
+    count = len(data) // struct.calcsize(endian + value_format)
+    values: tuple = struct.unpack(f"{endian}{count}{value_format}", data)
+    if field_type in RATIONAL_TYPES:
+        values = tuple(
+            numerator / denominator if denominator else float("nan")
+            for numerator, denominator in zip(values[::2], values[1::2])
+            )
+    return values[0] if len(values) == 1 else values
+
+
+def read_ifd(tiff: bytes, endian: str, offset: int) -> dict[int, Any]:
+    """
+    Decode the entries of an IFD. The entries of an unknown type or whose
+    data is out of the structure are skipped, as by Pillow.
+
+    Return
+    ------
+     - a dict (tag ID -> value)
+    """
+    entries: dict[int, Any] = {}
+    try:
+        count = struct.unpack_from(endian + "H", tiff, offset)[0]
+        for i in range(count):
+            tag, field_type, value_count, data = struct.unpack_from(
+                endian + "HHL4s", tiff, offset + 2 + i * 12
+                )
+            if field_type not in FIELD_TYPES:
+                continue
+            size = value_count * FIELD_TYPES[field_type][0]
+            if size > 4:  # The entry holds the offset of the data
+                data_offset = struct.unpack(endian + "L", data)[0]
+                data = tiff[data_offset:data_offset + size]
+            else:
+                data = data[:size]
+            if not data or len(data) != size:
+                continue
+            entries[tag] = decode_value(endian, field_type, data)
+    except struct.error:
+        pass  # Truncated IFD: the entries read are kept
+    # Pillow returns the tags in the order of a set
+    return {tag: entries[tag] for tag in set(entries)}
+
+
+class ExifData(dict):
+    """
+    The tags of the first IFD of an EXIF structure (tag ID -> value).
+
+    It can be used like the Image.Exif object of Pillow by Scorpion: the
+    Exif and GPS IFDs are decoded by get_ifd(), on demand.
+    """
+    def __init__(self, tiff: bytes, endian: str, tags: dict[int, Any]):
+        super().__init__(tags)
+        self.tiff: bytes = tiff
+        self.endian: str = endian
+
+    def get_ifd(self, tag: int) -> dict[int, Any]:
+        offset = self.get(tag)
+        if tag not in (TAG_EXIF_IFD, TAG_GPS_IFD) \
+                or not isinstance(offset, int):
+            return {}
+        return read_ifd(self.tiff, self.endian, offset)
+
+
+def read_exif(tiff: bytes) -> ExifData | None:
+    """
+    Decode the first IFD of an EXIF structure (with or without its
+    'Exif' prefix).
+
+    Return
+    ------
+     - the EXIF data, or None if the TIFF header is not handled
+    """
+    while tiff.startswith(b"Exif\0\0"):
+        tiff = tiff[6:]
+    if not tiff:
+        return ExifData(b"", "<", {})
+
+    if tiff[:4] == b"II*\0":
+        endian = "<"
+    elif tiff[:4] == b"MM\0*":
+        endian = ">"
+    else:  # e.g. BigTIFF
+        return None
+    ifd_offset = struct.unpack_from(endian + "L", tiff, 4)[0]
+    return ExifData(tiff, endian, read_ifd(tiff, endian, ifd_offset))
+
+
+def read_jpeg_header(data: Any) -> dict[str, Any] | None:
+    header: dict[str, Any] = {"format": "JPEG"}
+    exif = None
+    has_xmp = False
+
+    offset = 2
+    while True:
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:  # Padding
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2  # Markers without a segment
+            continue
+        length = struct.unpack_from(">H", data, offset + 2)[0]
+        start, end = offset + 4, offset + 2 + length
+
+        if marker == 0xE1:  # APP1
+            signature = data[start:start + len(XMP_SIGNATURE)]
+            if signature.startswith(b"Exif\0\0") and exif is None:
+                exif = data[start:end]
+            elif signature == XMP_SIGNATURE:
+                has_xmp = True
+        elif marker == 0xE2 and data[start:start + 4] == b"MPF\0":
+            return None  # Multi-picture file
+        elif marker == 0xFE:  # Comment
+            header["comment"] = data[start:end]
+        # Start Of Frame (except DHT, JPG and DAC markers)
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            bits, height, width, components = \
+                struct.unpack_from(">BHHB", data, start)
+            if bits != 8 or components not in JPEG_MODES:
+                return None
+            header["mode"] = JPEG_MODES[components]
+            header["width"], header["height"] = width, height
+        elif marker == 0xDA:  # Start Of Scan: no more header
+            break
+        offset = end
+
+    header["exif"] = read_exif(exif or b"")
+    if "mode" not in header or header["exif"] is None:
+        return None
+    # Pillow reads the orientation from XMP if it isn't in EXIF
+    if has_xmp and TAG_ORIENTATION not in header["exif"]:
+        return None
+    return header
+
+
+def read_png_header(data: Any) -> dict[str, Any] | None:
+    header: dict[str, Any] = {"format": "PNG"}
+    exif = None
+
+    # The chunks after the image data are reached by their length, without
+    # reading the image data
+    offset = 8
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        start = offset + 8
+        if chunk_type == b"IHDR":
+            width, height, depth, color_type = \
+                struct.unpack_from(">IIBB", data, start)
+            if (depth, color_type) not in PNG_MODES:
+                return None
+            header["mode"] = PNG_MODES[(depth, color_type)]
+            header["width"], header["height"] = width, height
+        elif chunk_type == b"eXIf":
+            exif = data[start:start + length]
+        elif chunk_type in (b"tEXt", b"zTXt", b"iTXt"):
+            key = data[start:start + min(length, 80)].split(b"\0")[0]
+            if key in PNG_HANDLED_KEYS:
+                return None
+        elif chunk_type == b"IEND":
+            break
+        offset = start + length + 4  # With the CRC
+
+    header["exif"] = read_exif(exif or b"")
+    if "mode" not in header or header["exif"] is None:
+        return None
+    return header
+
+
+def read_header(data: Any) -> dict[str, Any] | None:
+    image_format = detect_format(data[:12])
+    try:
+        if image_format == "JPEG":
+            return read_jpeg_header(data)
+        if image_format == "PNG":
+            return read_png_header(data)
+    except (struct.error, IndexError):  # Truncated or corrupt file
+        pass
+    return None
+
+
+def read_image_header(source: str | BinaryIO) -> dict[str, Any] | None:
+    """
+    Read the attributes and the EXIF metadata of an image file (memory
+    mapped), or of a file-like object (e.g. an image in a shard).
+
+    Return
+    ------
+     - None if the image has to be read by Pillow, otherwise a dict with
+     the keys:
+        'format', 'mode': str
+        'width', 'height': int
+        'comment': bytes (missing if the image has no comment)
+        'exif': ExifData
+    """
+    if not isinstance(source, str):
+        position = source.tell()
+        try:
+            return read_header(source.read())
+        finally:
+            source.seek(position)
+
+    try:
+        with open(source, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return read_header(data)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,102 @@
+import os
+from fnmatch import fnmatch
+from typing import Iterator
+from shared.ascii_format import ERROR
+from shared.shard_store import ShardReader, has_shards, is_shard_file
+
+"""
+This module walks through the folders given to Scorpion and the viewer.
+
+The walk is a generator built on os.scandir: the files are yielded as
+soon as they are found, so the treatment of a huge tree starts at once
+and the memory used does not grow with the number of files. The type of
+the entries comes from the directory listing, without an extra stat per
+file on most file systems.
+
+The images stored in tar shards by Spider are yielded as well, with their
+'<shard>#<name>' paths.
+"""
+
+# Symlink policies
+SYMLINKS_SKIP = "skip"  # Ignore all the symlinks
+SYMLINKS_FILES = "files"  # Follow the symlinks to files, not to folders
+SYMLINKS_FOLLOW = "follow"  # Follow all the symlinks (loops are detected)
+
+
+def matches_any(name: str, patterns: list[str] | None) -> bool:
+    return any(fnmatch(name, pattern) for pattern in patterns or [])
+
+
+def walk_files(
+        root: str,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        max_depth: int = 0,
+        symlinks: str = SYMLINKS_FILES,
+        hidden: bool = False
+        ) -> Iterator[str]:
+    """
+    Yield the paths of the files of the folder and of its subfolders.
+
+    Parameters:
+        include: glob patterns, only the file names matching one of them
+        are yielded (all the files if empty)
+        exclude: glob patterns of the file and folder names to skip
+        max_depth: depth of the subfolders to enter (0: only the folder
+        itself, -1: no limit)
+        symlinks: symlink policy
+        hidden: also walk the hidden files and folders (starting with '.')
+    """
+    follow_dirs = symlinks == SYMLINKS_FOLLOW
+    follow_files = symlinks != SYMLINKS_SKIP
+    # Folders already walked, to stop symlink loops
+    visited: set[tuple[int, int]] = set()
+    # Folders to walk, with their depth
+    folders: list[tuple[str, int]] = [(root, 0)]
+
+    while folders:
+        folder, depth = folders.pop()
+        subfolders: list[str] = []
+
+        try:
+            if follow_dirs:
+                stat = os.stat(folder)
+                if (stat.st_dev, stat.st_ino) in visited:
+                    continue
+                visited.add((stat.st_dev, stat.st_ino))
+
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if ((not hidden and name.startswith('.'))
+                            or is_shard_file(name)
+                            or matches_any(name, exclude)):
+                        continue
+                    try:
+                        if entry.is_symlink() and not follow_files:
+                            continue
+                        if entry.is_dir(follow_symlinks=follow_dirs):
+                            if max_depth < 0 or depth < max_depth:
+                                subfolders.append(entry.path)
+                            continue
+                        if not entry.is_file(follow_symlinks=follow_files):
+                            continue
+                    except OSError:  # e.g. broken symlink
+                        continue
+                    if include and not matches_any(name, include):
+                        continue
+                    yield entry.path
+        except OSError as e:
+            print(f"{ERROR} {e}")
+            continue
+
+        # The images stored in shards by Spider
+        if has_shards(folder):
+            for path in ShardReader(folder).get_paths():
+                name = os.path.basename(path.rpartition('#')[2])
+                if ((not include or matches_any(name, include))
+                        and not matches_any(name, exclude)):
+                    yield path
+
+        # Walk the subfolders in the listing order
+        folders.extend((path, depth + 1) for path in reversed(subfolders))
@@ -1,23 +1,170 @@
 #!/usr/bin/env sh
 
-echo "exif_labels_dict = {" > exif_labels.py && \
-cat standard_exif_tags.txt | \
-awk '{
-    split($4, a, ".");
-    type = $5;
-    if (type == "Byte") { type_num = 1; }
-    else if (type == "Ascii") { type_num = 2; }
-    else if (type == "Short") { type_num = 3; }
-    else if (type == "Long") { type_num = 4; }
-    else if (type == "Rational") { type_num = 5; }
-    else if (type == "SByte") { type_num = 6; }
-    else if (type == "Undefined") { type_num = 7; }
-    else if (type == "SShort") { type_num = 8; }
-    else if (type == "SLong") { type_num = 9; }
-    else if (type == "SRational") { type_num = 10; }
-    else if (type == "Float") { type_num = 11; }
-    else if (type == "DFloat") { type_num = 12; }
-    else { type_num = 13; }  # Handle unknown types if necessary
-
-    print "\t" $2 ": {\"tag\": \"" a[2] "." a[3] "\", \"type\": " type_num "},"
-}' >> exif_labels.py && echo "}" >> exif_labels.py
\ No newline at end of file
+# Generate exif_labels.py from standard_exif_tags.txt (tab-separated: hex
+# ID, ID, IFD, Exif.<IFD>.<name>, type, description).
+#
+# The tags are stored by IFD, in compact tables (see the docstring of the
+# generated module).
+
+cd "$(dirname "$0")" || exit 1
+
+cat > exif_labels.py << 'EOF'
+# Generated by generate_exif_labels_dict.sh from standard_exif_tags.txt,
+# do not edit.
+from array import array
+from typing import Any
+
+"""
+The standard EXIF tags, by IFD: Image (IFD0), Photo (Exif IFD), GPSInfo,
+Iop (interoperability IFD) and MpfInfo, whose tag IDs overlap.
+
+Each IFD has a compact table: an array of tag IDs, a string of short tag
+names and the bytes of the type numbers (see exif_reader.FIELD_TYPES).
+The lookup dictionary of an IFD is only built when the IFD is first used,
+then a tag is resolved by a single lookup:
+
+    name, tag_type = get_ifd_tags(IFD_GPS)[2]  # ("GPSLatitude", 5)
+
+The former table, exif_labels_dict ({tag ID: {"tag": "Image.Make",
+"type": 2}}, with the tags of all the IFDs mixed), is built on demand.
+"""
+
+IFD_IMAGE = "Image"
+IFD_PHOTO = "Photo"
+IFD_GPS = "GPSInfo"
+IFD_IOP = "Iop"
+IFD_MPF = "MpfInfo"
+
+# IFD -> (tag IDs, short tag names separated by spaces, type numbers)
+_TABLES: dict[str, tuple[array, str, bytes]] = {
+EOF
+
+awk -F '\t' '
+function flush_names() {
+    if (line != "") { names[ifd] = names[ifd] "        \"" line "\"\n" }
+    line = ""
+}
+{
+    # Remove the spaces around the fields
+    for (i = 1; i <= NF; i++) { gsub(/^ +| +$/, "", $i) }
+    split($4, a, ".")
+    type = $5
+    if (type == "Byte") { type_num = 1 }
+    else if (type == "Ascii") { type_num = 2 }
+    else if (type == "Short") { type_num = 3 }
+    else if (type == "Long") { type_num = 4 }
+    else if (type == "Rational") { type_num = 5 }
+    else if (type == "SByte") { type_num = 6 }
+    else if (type == "Undefined" || type == "Comment") { type_num = 7 }
+    else if (type == "SShort") { type_num = 8 }
+    else if (type == "SLong") { type_num = 9 }
+    else if (type == "SRational") { type_num = 10 }
+    else if (type == "Float") { type_num = 11 }
+    else if (type == "Double" || type == "DFloat") { type_num = 12 }
+    else { type_num = 13 }  # Handle unknown types if necessary
+
+    if ($3 != ifd) {
+        flush_names()
+        ifd = $3
+        order[++ifd_count] = ifd
+        count[ifd] = 0
+    }
+    # 8 IDs and 24 types per line, names on lines of at most 64 characters
+    if (count[ifd] % 8 == 0) { ids[ifd] = ids[ifd] "\n           " }
+    ids[ifd] = ids[ifd] " " $2 ","
+    if (count[ifd] % 24 == 0) { types[ifd] = types[ifd] "\n            \"" }
+    types[ifd] = types[ifd] sprintf("%02x", type_num)
+    if (count[ifd] % 24 == 23) { types[ifd] = types[ifd] "\"" }
+    if (length(line) + length(a[3]) + 1 > 64) { flush_names() }
+    line = line a[3] " "
+    count[ifd]++
+}
+END {
+    flush_names()
+    for (i = 1; i <= ifd_count; i++) {
+        ifd = order[i]
+        if (count[ifd] % 24 != 0) { types[ifd] = types[ifd] "\"" }
+        print "    \"" ifd "\": ("
+        print "        array(\"H\", [" ids[ifd]
+        print "        ]),"
+        sub(/\n$/, ",\n", names[ifd])
+        printf "%s", names[ifd]
+        print "        bytes.fromhex(" types[ifd]
+        print "        )"
+        print "    ),"
+    }
+}' standard_exif_tags.txt >> exif_labels.py
+
+cat >> exif_labels.py << 'EOF'
+}
+
+# Lookup dictionaries of the IFDs already used: tag ID -> (name, type)
+_ifd_tags: dict[str, dict[int, tuple[str, int]]] = {}
+
+
+def get_ifd_tags(ifd: str = IFD_IMAGE) -> dict[int, tuple[str, int]]:
+    """
+    Return
+    ------
+     - the tags of the IFD: tag ID -> (short tag name, type number)
+    """
+    tags = _ifd_tags.get(ifd)
+    if tags is None:
+        tag_ids, names, types = _TABLES.get(ifd, (array("H"), "", b""))
+        tags = dict(zip(tag_ids, zip(names.split(), types)))
+        _ifd_tags[ifd] = tags
+    return tags
+
+
+def get_tag_name(tag_id: int, ifd: str = IFD_IMAGE) -> str | None:
+    """
+    Return
+    ------
+     - the short name of the tag (e.g. 'Model'), or None if it is unknown
+    """
+    tag = get_ifd_tags(ifd).get(tag_id)
+    return tag[0] if tag else None
+
+
+def get_tag_type(tag_id: int, ifd: str = IFD_IMAGE) -> int:
+    """
+    Return
+    ------
+     - the type number of the tag, or 0 if it is unknown
+    """
+    tag = get_ifd_tags(ifd).get(tag_id)
+    return tag[1] if tag else 0
+
+
+def get_ifd0_tag(tag_id: int) -> tuple[str, int] | None:
+    """
+    Some files store the tags of the Exif IFD directly in IFD0 (e.g.
+    UserComment, DateTimeDigitized): the tags of IFD0 are looked up in
+    the Image IFD, then in the Photo IFD.
+
+    Return
+    ------
+     - the (short tag name, type number) of the tag, or None if it is
+     unknown
+    """
+    return get_ifd_tags(IFD_IMAGE).get(tag_id) \
+        or get_ifd_tags(IFD_PHOTO).get(tag_id)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Build exif_labels_dict when it is first used. A tag ID shared by
+    several IFDs gets the tag of the first one.
+    """
+    if name == "exif_labels_dict":
+        labels: dict[int, dict[str, Any]] = {}
+        for ifd, (tag_ids, names, types) in _TABLES.items():
+            for tag_id, tag_name, tag_type in zip(
+                    tag_ids, names.split(), types):
+                labels.setdefault(
+                    tag_id, {"tag": f"{ifd}.{tag_name}", "type": tag_type}
+                    )
+        globals()[name] = labels
+        return labels
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+EOF
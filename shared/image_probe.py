@@ -0,0 +1,366 @@
+import os
+import struct
+from typing import Any
+from shared.shard_store import open_image_file
+
+"""
+This module reads the format, the pixel dimensions and the presence of
+EXIF/GPS metadata from the first bytes of an image file, without decoding
+it. It lets Spider reject an image after its first few KB instead of
+downloading it entirely.
+
+The format is detected from the signature of the content (magic bytes),
+whatever the extension of the file or of the URL.
+
+Handled formats: JPEG, PNG, GIF, BMP, WebP and TIFF.
+"""
+
+# Size of the chunks read while probing (in bytes)
+PROBE_SIZE = 16 * 1024
+# Maximum number of bytes read before deciding (a JPEG can have a large
+# EXIF thumbnail before its dimensions)
+PROBE_MAX = 64 * 1024
+
+# Number of bytes needed to detect the format
+SIGNATURE_SIZE = 12
+
+# Extensions of each format, the first one is used to name the files
+FORMAT_EXTENSIONS = {
+    "JPEG": [".jpg", ".jpeg"],
+    "PNG": [".png"],
+    "GIF": [".gif"],
+    "BMP": [".bmp"],
+    "WEBP": [".webp"],
+    "TIFF": [".tiff", ".tif"],
+}
+
+ALL_EXTENSIONS = [
+    ext for extensions in FORMAT_EXTENSIONS.values() for ext in extensions
+    ]
+
+# Other names of the formats
+FORMAT_ALIASES = {"JPG": "JPEG", "TIF": "TIFF"}
+
+# TIFF tags pointing to the EXIF and GPS sub-IFDs
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATE_TIME_ORIGINAL = 0x9003
+TAG_IMAGE_WIDTH = 0x0100
+TAG_IMAGE_LENGTH = 0x0101
+
+
+def read_tiff_ifd0(tiff: bytes) -> tuple[dict[int, int], bool]:
+    """
+    Read the tags of the first IFD of a TIFF structure (as found in TIFF
+    files and in EXIF segments) whose value fits in the entry.
+
+    Return
+    ------
+     - a dict (tag ID -> value), with only the first tags if the data is
+     truncated
+     - True if the whole IFD has been read (or is not valid), False if
+     the data is truncated
+    """
+    if len(tiff) < 2:
+        return {}, False
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return {}, True
+
+    tags: dict[int, int] = {}
+    try:
+        ifd_offset = struct.unpack_from(endian + "I", tiff, 4)[0]
+        count = struct.unpack_from(endian + "H", tiff, ifd_offset)[0]
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag, field_type = struct.unpack_from(endian + "HH", tiff, entry)
+            if field_type == 3:  # Short
+                value = struct.unpack_from(endian + "H", tiff, entry + 8)[0]
+            else:  # Long or offset
+                value = struct.unpack_from(endian + "I", tiff, entry + 8)[0]
+            tags[tag] = value
+    except struct.error:
+        return tags, False
+    return tags, True
+
+
+def set_exif_flags(info: dict[str, Any], tiff: bytes) -> None:
+    """
+    Set 'has_exif' and 'has_gps' from the TIFF structure of an EXIF.
+    A flag is left unset while the tags read from a truncated IFD don't
+    decide it.
+    """
+    tags, complete = read_tiff_ifd0(tiff)
+    if tags or complete:
+        info["has_exif"] = bool(tags)
+    if TAG_GPS_IFD in tags or complete:
+        info["has_gps"] = TAG_GPS_IFD in tags
+
+
+def probe_jpeg(data: bytes, info: dict[str, Any]) -> None:
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return
+        marker = data[offset + 1]
+        if marker == 0xFF:  # Padding
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2  # Markers without a segment
+            continue
+        length = struct.unpack_from(">H", data, offset + 2)[0]
+        segment = data[offset + 4:offset + 2 + length]
+
+        if marker == 0xE1 and segment.startswith(b"Exif\0\0"):  # APP1
+            set_exif_flags(info, segment[6:])
+        # Start Of Frame (except DHT, JPG and DAC markers)
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if len(segment) >= 5:
+                info["height"], info["width"] = \
+                    struct.unpack_from(">HH", segment, 1)
+            break
+        elif marker == 0xDA:  # Start Of Scan: no more header
+            break
+        offset += 2 + length
+    else:
+        return
+    # The EXIF segment comes before the frame
+    info.setdefault("has_exif", False)
+    info.setdefault("has_gps", False)
+
+
+def probe_png(data: bytes, info: dict[str, Any]) -> None:
+    offset = 8
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        if chunk_type == b"IHDR" and len(chunk) >= 8:
+            info["width"], info["height"] = struct.unpack_from(">II", chunk)
+        elif chunk_type == b"eXIf":
+            set_exif_flags(info, chunk)
+        elif chunk_type in (b"IDAT", b"IEND"):
+            return
+        offset += 12 + length
+
+
+def probe_webp(data: bytes, info: dict[str, Any]) -> None:
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_type, length = struct.unpack_from("<4sI", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        if chunk_type == b"VP8X" and len(chunk) >= 10:
+            info["width"] = int.from_bytes(chunk[4:7], "little") + 1
+            info["height"] = int.from_bytes(chunk[7:10], "little") + 1
+            info["has_exif"] = bool(chunk[0] & 0x08)
+            if not info["has_exif"]:
+                info["has_gps"] = False
+        elif chunk_type == b"VP8 " and len(chunk) >= 10:
+            if "width" not in info:  # Simple format: no metadata
+                width, height = struct.unpack_from("<HH", chunk, 6)
+                info["width"], info["height"] = width & 0x3FFF, height & 0x3FFF
+                info["has_exif"] = info["has_gps"] = False
+        elif chunk_type == b"VP8L" and len(chunk) >= 5:
+            if "width" not in info:  # Simple format: no metadata
+                bits = int.from_bytes(chunk[1:5], "little")
+                info["width"] = (bits & 0x3FFF) + 1
+                info["height"] = ((bits >> 14) & 0x3FFF) + 1
+                info["has_exif"] = info["has_gps"] = False
+        elif chunk_type == b"EXIF":
+            set_exif_flags(info, chunk[6:] if chunk[:4] == b"Exif" else chunk)
+        # Chunks are padded to an even size
+        offset += 8 + length + (length & 1)
+
+
+def detect_format(data: bytes) -> str | None:
+    """
+    Detect the image format from its signature (magic bytes).
+
+    Return
+    ------
+     - the format name, as used by Pillow (e.g. "JPEG"), or None
+    """
+    if data.startswith(b"\xFF\xD8\xFF"):
+        return "JPEG"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "GIF"
+    if data.startswith(b"BM"):
+        return "BMP"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP"
+    if data[:4] in (b"II*\0", b"MM\0*"):
+        return "TIFF"
+    return None
+
+
+def detect_file_format(file_path: str) -> str | None:
+    """
+    Detect the format of an image file (or of an image in a shard) from
+    its first bytes.
+
+    Return
+    ------
+     - the format name, or None if it is not a handled image format or
+     the file cannot be read
+    """
+    try:
+        source = open_image_file(file_path)
+        with open(source, "rb") if isinstance(source, str) else source as f:
+            return detect_format(f.read(SIGNATURE_SIZE))
+    except (OSError, KeyError):  # KeyError: not in the shard index
+        return None
+
+
+def get_image_name(img_name: str, image_format: str) -> str:
+    """
+    Return
+    ------
+     - the file name with the extension of its real format (e.g. an
+     extensionless name or a WebP image served as '.jpg')
+    """
+    stem, extension = os.path.splitext(img_name)
+    extensions = FORMAT_EXTENSIONS.get(image_format)
+    if not extensions or extension.lower() in extensions:
+        return img_name
+    # Keep the part after the dot if it's not an extension (e.g. 'v1.2')
+    if extension.lower() not in ALL_EXTENSIONS:
+        stem = img_name
+    return stem + extensions[0]
+
+
+def probe_image(data: bytes) -> dict[str, Any] | None:
+    """
+    Read the header of an image.
+
+    Return
+    ------
+     - None if the format is not recognized, otherwise a dict with the keys:
+        'format': str
+        'width', 'height': int (missing if not found in the data)
+        'has_exif', 'has_gps': bool (missing if not found in the data)
+    """
+    image_format = detect_format(data)
+    if not image_format:
+        return None
+    info: dict[str, Any] = {"format": image_format}
+
+    try:
+        if image_format == "JPEG":
+            probe_jpeg(data, info)
+        elif image_format == "PNG":
+            probe_png(data, info)
+            # The EXIF chunk comes before the image data
+            if "width" in info and b"IDAT" in data:
+                info.setdefault("has_exif", False)
+                info.setdefault("has_gps", False)
+        elif image_format == "GIF" and len(data) >= 10:
+            info["width"], info["height"] = struct.unpack_from("<HH", data, 6)
+            info["has_exif"] = info["has_gps"] = False
+        elif image_format == "BMP" and len(data) >= 26:
+            width, height = struct.unpack_from("<ii", data, 18)
+            info["width"], info["height"] = width, abs(height)
+            info["has_exif"] = info["has_gps"] = False
+        elif image_format == "WEBP":
+            probe_webp(data, info)
+        elif image_format == "TIFF":
+            tags, complete = read_tiff_ifd0(data)
+            if TAG_IMAGE_WIDTH in tags and TAG_IMAGE_LENGTH in tags:
+                info["width"] = tags[TAG_IMAGE_WIDTH]
+                info["height"] = tags[TAG_IMAGE_LENGTH]
+            if tags and (TAG_EXIF_IFD in tags or complete):
+                info["has_exif"] = TAG_EXIF_IFD in tags
+            if tags and (TAG_GPS_IFD in tags or complete):
+                info["has_gps"] = TAG_GPS_IFD in tags
+    except struct.error:  # Truncated header
+        pass
+    return info
+
+
+class ImageRejected(Exception):
+    """Raised when an image does not pass the header filter."""
+
+
+class ImageFilter:
+    """
+    Filter images on the information read from their header.
+    The content has to be in a handled format, the other criteria set to
+    0/None/False are not checked.
+    """
+    def __init__(
+            self,
+            min_width: int = 0,
+            min_height: int = 0,
+            max_width: int = 0,
+            max_height: int = 0,
+            formats: list[str] | None = None,
+            require_exif: bool = False,
+            require_gps: bool = False
+            ):
+        self.min_width: int = min_width
+        self.min_height: int = min_height
+        self.max_width: int = max_width
+        self.max_height: int = max_height
+        self.formats: list[str] = [
+            FORMAT_ALIASES.get(f.upper(), f.upper()) for f in formats or []
+            ]
+        self.require_exif: bool = require_exif
+        self.require_gps: bool = require_gps
+
+    def is_active(self) -> bool:
+        """Check if a criterion needs more than the format signature."""
+        return bool(
+            self.min_width or self.min_height
+            or self.max_width or self.max_height
+            or self.formats or self.require_exif or self.require_gps
+            )
+
+    def is_complete(self, info: dict[str, Any] | None) -> bool:
+        """Check if the header contains all the checked information."""
+        if info is None:
+            return True
+        if ((self.min_width or self.min_height
+                or self.max_width or self.max_height)
+                and "width" not in info):
+            return False
+        if self.require_exif and "has_exif" not in info:
+            return False
+        if self.require_gps and "has_gps" not in info:
+            return False
+        return True
+
+    def check(self, info: dict[str, Any] | None) -> str | None:
+        """
+        Check the header information. A missing information is not held
+        against the image.
+
+        Return
+        ------
+         - the reason why the image is rejected, or None if it passes
+        """
+        if info is None:
+            return "not a handled image format"
+
+        if self.formats and info["format"] not in self.formats:
+            return f"format {info['format']}"
+
+        width, height = info.get("width"), info.get("height")
+        if width is not None and height is not None:
+            if self.min_width and width < self.min_width:
+                return f"width {width} < {self.min_width}"
+            if self.min_height and height < self.min_height:
+                return f"height {height} < {self.min_height}"
+            if self.max_width and width > self.max_width:
+                return f"width {width} > {self.max_width}"
+            if self.max_height and height > self.max_height:
+                return f"height {height} > {self.max_height}"
+
+        if self.require_exif and info.get("has_exif") is False:
+            return "no EXIF"
+        if self.require_gps and info.get("has_gps") is False:
+            return "no GPS"
+        return None
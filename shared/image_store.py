@@ -0,0 +1,115 @@
+import os
+import shutil
+import threading
+from shared.partial_download import get_part_path
+
+"""
+This module implements a content-addressed image store.
+
+Each image is stored once, under the SHA-256 hash of its content, in a
+sharded layout inside the image folder:
+
+    <image folder>/.objects/<hash[0:2]>/<hash[2:4]>/<hash>
+
+The human-readable names are hardlinks to those blobs. The URL -> hash
+mapping is kept by the download manifest (see download_manifest.py).
+"""
+
+OBJECTS_FOLDER = ".objects"
+
+
+class ContentStore:
+    """
+    Usage:
+        store = ContentStore(image_folder)
+        tmp_path = store.get_temp_path(img_url)
+        ...write the image to tmp_path, hash it...
+        path, duplicate = store.commit(tmp_path, digest, img_name)
+    """
+    def __init__(self, image_folder: str):
+        self.image_folder: str = image_folder
+        self.objects_folder: str = os.path.join(image_folder, OBJECTS_FOLDER)
+        self.tmp_folder: str = os.path.join(self.objects_folder, "tmp")
+        self.lock = threading.Lock()
+
+        os.makedirs(self.tmp_folder, exist_ok=True)
+
+    def get_temp_path(self, url: str) -> str:
+        """
+        Return the path where the image of the URL is downloaded.
+        It is the same across runs, so that the download can be resumed.
+        """
+        return get_part_path(self.tmp_folder, url)
+
+    def get_blob_path(self, digest: str) -> str:
+        return os.path.join(
+            self.objects_folder, digest[0:2], digest[2:4], digest
+            )
+
+    def link(self, blob_path: str, img_name: str, digest: str) -> str:
+        """
+        Give a human-readable name to the blob in the image folder.
+        If the name is taken by another image, the hash is added to it.
+
+        Return
+        ------
+         - the path of the link
+        """
+        link_path = os.path.join(self.image_folder, img_name)
+        if os.path.exists(link_path):
+            if os.path.samefile(link_path, blob_path):
+                return link_path
+            stem, extension = os.path.splitext(img_name)
+            link_path = os.path.join(
+                self.image_folder, f"{stem}-{digest[:8]}{extension}"
+                )
+            if os.path.exists(link_path):
+                return link_path
+        try:
+            os.link(blob_path, link_path)
+        except OSError:  # Hardlinks are not supported by the file system
+            shutil.copyfile(blob_path, link_path)
+        return link_path
+
+    def commit(
+            self, tmp_path: str, digest: str, img_name: str
+            ) -> tuple[str, bool]:
+        """
+        Move the downloaded image into the store, unless an image with the
+        same content is already stored.
+
+        Return
+        ------
+         - the path of the human-readable link, and True if the content
+         was already stored
+        """
+        blob_path = self.get_blob_path(digest)
+
+        with self.lock:
+            duplicate = os.path.exists(blob_path)
+            if duplicate:
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp_path, blob_path)
+            link_path = self.link(blob_path, img_name, digest)
+
+        return link_path, duplicate
+
+    def remove(self, link_path: str, digest: str) -> bool:
+        """
+        Remove a link, and the blob if no other name links to it.
+
+        Return
+        ------
+         - True if the blob has been removed
+        """
+        blob_path = self.get_blob_path(digest)
+        with self.lock:
+            if os.path.exists(link_path):
+                os.remove(link_path)
+            if (os.path.exists(blob_path)
+                    and os.stat(blob_path).st_nlink == 1):
+                os.remove(blob_path)
+                return True
+        return False
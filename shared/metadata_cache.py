@@ -0,0 +1,191 @@
+import os
+import json
+import sqlite3
+from typing import Any
+from shared.config import METADATA_CACHE_FILE
+from shared.metadata_codec import (
+    encode_value, decode_value, encode_exif, decode_exif
+    )
+
+# Version of the cached headers: the entries of the other versions are
+# dropped when the cache is opened
+CACHE_VERSION = 3
+
+"""
+This module implements the metadata cache of Scorpion and the viewer.
+
+The metadata read from the content of an image (format, mode, dimensions,
+comment and EXIF) are stored in a SQLite database shared by all the
+folders. An entry is keyed by the device and the inode of the file, and is
+only used while the size and the modification time of the file are
+unchanged: a changed file is read again and its entry replaced. A renamed
+or moved file is still found, until the next compaction.
+
+The attributes coming from the file system (name, path, times) are not
+cached, they are taken from the stat of the file on every call.
+"""
+
+
+def encode_header(header: dict[str, Any]) -> str:
+    """
+    Serialize the header returned by Scorpion.get_image_header, with the
+    types of the values (see metadata_codec.py).
+    """
+    return json.dumps({
+        "format": header["format"],
+        "mode": header["mode"],
+        "width": header["width"],
+        "height": header["height"],
+        "comment": encode_value(header["comment"])
+        if "comment" in header else None,
+        "exif": encode_exif(header["exif"])
+    })
+
+
+def decode_header(text: str) -> dict[str, Any]:
+    header = json.loads(text)
+    if header["comment"] is None:
+        del header["comment"]
+    else:
+        header["comment"] = decode_value(header["comment"])
+    header["exif"] = decode_exif(header["exif"])
+    return header
+
+
+class MetadataCache:
+    """
+    Usage:
+        cache = MetadataCache()
+        header = cache.get(stat)  # None if missing or stale
+        cache.put(file_path, stat, header)
+        cache.compact()
+
+    Several processes can use the same database.
+    """
+    def __init__(self, path: str = METADATA_CACHE_FILE):
+        self.path: str = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        # Readers don't wait for the writers of the other processes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            version = self.connection.execute(
+                "PRAGMA user_version"
+                ).fetchone()[0]
+            if version != CACHE_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS metadata")
+                self.connection.execute(
+                    f"PRAGMA user_version = {CACHE_VERSION}"
+                    )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS metadata (
+                    device INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    header TEXT NOT NULL,
+                    PRIMARY KEY (device, inode)
+                )
+                """
+                )
+
+    def get(self, stat: os.stat_result) -> dict[str, Any] | None:
+        """
+        Return
+        ------
+         - the header of the file, or None if it is not in the cache or if
+         the file changed since it was cached
+        """
+        try:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, header FROM metadata "
+                "WHERE device = ? AND inode = ?",
+                (stat.st_dev, stat.st_ino)
+                ).fetchone()
+        except sqlite3.Error:  # e.g. locked for too long by a writer
+            return None
+        if (not row or row[0] != stat.st_size
+                or row[1] != stat.st_mtime_ns):
+            return None
+        return decode_header(row[2])
+
+    def put(
+            self, file_path: str, stat: os.stat_result,
+            header: dict[str, Any]
+            ) -> None:
+        """
+        Add or replace the header of a file. The cache is only an
+        optimization: the file is not cached if the database is busy.
+        """
+        try:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO metadata "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        stat.st_dev, stat.st_ino, os.path.abspath(file_path),
+                        stat.st_size, stat.st_mtime_ns, encode_header(header)
+                    )
+                    )
+        except sqlite3.Error:
+            pass
+
+    def compact(self) -> tuple[int, int]:
+        """
+        Remove the entries of the files that were deleted, moved or
+        changed since they were cached, and reclaim the free space.
+
+        Return
+        ------
+         - the number of removed entries and of kept entries
+        """
+        stale = []
+        kept = 0
+        for device, inode, path, size, mtime_ns in self.connection.execute(
+                "SELECT device, inode, path, size, mtime_ns FROM metadata"
+                ).fetchall():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if (stat and (stat.st_dev, stat.st_ino) == (device, inode)
+                    and stat.st_size == size
+                    and stat.st_mtime_ns == mtime_ns):
+                kept += 1
+            else:
+                stale.append((device, inode))
+
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM metadata WHERE device = ? AND inode = ?", stale
+                )
+        self.connection.execute("VACUUM")
+        return len(stale), kept
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+# Cache opened by the current process (a connection can't be shared with
+# the processes forked by the parallel mode of Scorpion)
+_opened_cache: tuple[int, MetadataCache | None] | None = None
+
+
+def get_metadata_cache() -> MetadataCache | None:
+    """
+    Return
+    ------
+     - the metadata cache of the current process, or None if it can't be
+     opened (e.g. read-only home folder)
+    """
+    global _opened_cache
+    if not _opened_cache or _opened_cache[0] != os.getpid():
+        try:
+            cache = MetadataCache()
+        except (OSError, sqlite3.Error):
+            cache = None
+        _opened_cache = (os.getpid(), cache)
+    return _opened_cache[1]
@@ -0,0 +1,84 @@
+import json
+import numbers
+from typing import Any
+from shared.config import BASIC, EXIF
+
+"""
+This module serializes the metadata of Scorpion to JSON, for the sidecar
+store (see sidecar_store.py), the metadata cache (see metadata_cache.py)
+and the metadata index (see metadata_index.py).
+
+The values keep their type, so that the decoded metadata are the same as
+the metadata read from the file (same display, search and export):
+    str, int, float and None: as is (NaN included)
+    tuple: a JSON array
+    bytes: {"bytes": hexadecimal string}
+    rationals of Pillow: {"rational": [numerator, denominator]}
+The values of any other type are stored as their string representation.
+"""
+
+
+def encode_value(value: Any) -> Any:
+    """
+    Return
+    ------
+     - the value as a JSON value (see the module docstring)
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, tuple):
+        return [encode_value(item) for item in value]
+    if isinstance(value, bytes):
+        return {"bytes": value.hex()}
+    if isinstance(value, numbers.Rational):  # IFDRational
+        return {"rational": [value.numerator, value.denominator]}
+    return str(value)
+
+
+def decode_value(value: Any) -> Any:
+    """
+    Return
+    ------
+     - the value encoded by encode_value
+    """
+    if isinstance(value, list):
+        return tuple(decode_value(item) for item in value)
+    if isinstance(value, dict):
+        if "bytes" in value:
+            return bytes.fromhex(value["bytes"])
+        # Pillow is only loaded for the rationals, read by Pillow
+        from PIL.TiffImagePlugin import IFDRational
+        return IFDRational(*value["rational"])
+    return value
+
+
+def encode_exif(exif: dict[int, Any] | None) -> dict[str, Any] | None:
+    """
+    Return
+    ------
+     - the EXIF metadata (tag ID -> (tag name, value)) as a JSON object
+    """
+    return {
+        str(tag_id): [name, encode_value(value)]
+        for tag_id, (name, value) in exif.items()
+    } if exif else None
+
+
+def decode_exif(exif: dict[str, Any] | None) -> dict[int, Any] | None:
+    return {
+        int(tag_id): (name, decode_value(value))
+        for tag_id, (name, value) in exif.items()
+    } if exif is not None else None
+
+
+def encode_metadata(metadata: dict[int, Any]) -> str:
+    """Serialize the metadata returned by Scorpion.get_metadata."""
+    return json.dumps({
+        "basic": metadata.get(BASIC) or {},
+        "exif": encode_exif(metadata.get(EXIF))
+    })
+
+
+def decode_metadata(text: str) -> dict[int, Any]:
+    data = json.loads(text)
+    return {BASIC: data["basic"], EXIF: decode_exif(data["exif"])}
@@ -0,0 +1,196 @@
+import csv
+import json
+import math
+import numbers
+from array import array
+from typing import Any
+from shared.config import BASIC, EXIF
+from shared.metadata_search import stringify_value
+
+"""
+This module implements the structured export of Scorpion: one record per
+file, streamed to the export file as the files are treated.
+
+    jsonl: a JSON object per line, with the path, the basic attributes and
+        the EXIF values (by tag name) of the file
+    csv: a row per file, with a stable set of columns (EXPORT_COLUMNS by
+        default), whatever the tags of the files
+    npz: NumPy arrays of the numeric columns (NUMERIC_COLUMNS by default,
+        NaN for the missing values), and the array of the paths
+
+The records are built from the metadata where the files are treated (in
+the worker processes in parallel mode), and written through a large
+buffer. The npz arrays are kept in compact typed arrays until the end.
+"""
+
+EXPORT_FORMATS = ["jsonl", "csv", "npz"]
+
+# Columns of the CSV export: basic attributes, then EXIF tags
+EXPORT_COLUMNS = [
+    "Path", "Name", "Format", "Mode", "Width", "Height", "Creation time",
+    "Modification time", "Make", "Model", "Software", "Orientation",
+    "XResolution", "YResolution", "DateTime", "DateTimeOriginal",
+    "GPSLatitude", "GPSLongitude"
+]
+
+# Columns of the npz export
+NUMERIC_COLUMNS = [
+    "Width", "Height", "Orientation", "XResolution", "YResolution",
+    "GPSLatitude", "GPSLongitude"
+]
+
+WRITE_BUFFER_SIZE = 1 << 20  # In bytes
+
+
+def get_export_format(export_file: str, export_format: str = "") -> str:
+    """
+    Return
+    ------
+     - the export format, given or from the extension of the file, or an
+     empty string if it is not handled
+    """
+    if not export_format:
+        export_format = export_file.rpartition(".")[2].lower()
+    return export_format if export_format in EXPORT_FORMATS else ""
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Return
+    ------
+     - the value as a JSON value (NaN and infinite numbers as null)
+    """
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, bytes):
+        return stringify_value(value)
+    if isinstance(value, tuple):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, numbers.Real):  # e.g. the rationals of Pillow
+        value = float(value)
+        return value if math.isfinite(value) else None
+    return str(value)
+
+
+def get_number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def get_export_record(
+        export_format: str, file_path: str, metadata: dict[int, Any],
+        columns: list[str]
+        ) -> Any:
+    """
+    Return
+    ------
+     - the record of the file for the export format:
+        jsonl: the line (without its newline)
+        csv: the values of the columns, as text
+        npz: the path and the values of the columns, as numbers
+    """
+    basic = metadata.get(BASIC) or {}
+    exif = metadata.get(EXIF) or {}
+    if export_format == "jsonl":
+        return json.dumps({
+            "path": file_path,
+            "basic": basic,
+            "exif": {name: to_json_value(value) for name, value in
+                     exif.values()}
+        }, ensure_ascii=False)
+
+    # Tag name -> value (the basic attributes first)
+    values = {name: value for name, value in exif.values()}
+    values.update(basic)
+    if export_format == "csv":
+        return [
+            stringify_value(values[column]) if column in values else ""
+            for column in columns
+        ]
+    return file_path, [get_number(values.get(column)) for column in columns]
+
+
+class JsonlWriter:
+    def __init__(self, export_file: str, columns: list[str]):
+        self.file = open(
+            export_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE
+            )
+
+    def write(self, records: list[str]) -> None:
+        for record in records:
+            self.file.write(record)
+            self.file.write("\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, export_file: str, columns: list[str]):
+        self.file = open(
+            export_file, "w", encoding="utf-8", newline="",
+            buffering=WRITE_BUFFER_SIZE
+            )
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, records: list[list[str]]) -> None:
+        self.writer.writerows(records)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class NpzWriter:
+    """
+    The values are appended to an array of doubles per column, and saved
+    as NumPy arrays (named as the columns, plus 'path') when closed.
+    """
+    def __init__(self, export_file: str, columns: list[str]):
+        self.export_file: str = export_file
+        self.columns: list[str] = columns
+        self.paths: list[str] = []
+        self.values: list[array] = [array("d") for _ in columns]
+
+    def write(self, records: list[tuple[str, list[float]]]) -> None:
+        for path, numbers in records:
+            self.paths.append(path)
+            for column_values, number in zip(self.values, numbers):
+                column_values.append(number)
+
+    def close(self) -> None:
+        # NumPy is only loaded by the npz export
+        import numpy as np
+
+        with open(self.export_file, "wb") as f:
+            np.savez(
+                f, path=np.array(self.paths, dtype=str),
+                **{
+                    column: np.frombuffer(column_values, dtype=np.float64)
+                    for column, column_values in zip(self.columns, self.values)
+                }
+                )
+
+
+EXPORT_WRITERS = {"jsonl": JsonlWriter, "csv": CsvWriter, "npz": NpzWriter}
+
+
+def open_export_writer(
+        export_format: str, export_file: str, columns: list[str]
+        ) -> JsonlWriter | CsvWriter | NpzWriter:
+    return EXPORT_WRITERS[export_format](export_file, columns)
+
+
+def get_export_columns(
+        export_format: str, columns: list[str] | None = None
+        ) -> list[str]:
+    """
+    Return
+    ------
+     - the given columns, or the default columns of the format
+    """
+    if columns:
+        return columns
+    return NUMERIC_COLUMNS if export_format == "npz" else EXPORT_COLUMNS
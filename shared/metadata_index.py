@@ -0,0 +1,519 @@
+import os
+import re
+import sqlite3
+from typing import Any
+from shared.config import BASIC, EXIF
+from shared.metadata_codec import encode_metadata
+from shared.spatial_index import (
+    encode_geohash, get_covering_cells, get_circle_boxes, split_box,
+    haversine_distances, MAX_DISTANCE
+    )
+
+"""
+This module implements the metadata index of Scorpion.
+
+The metadata of the treated files are stored in a SQLite database, with
+typed columns for the tags that are commonly queried (dimensions, camera,
+dates, GPS position), and the full metadata as JSON. The index is then
+queried with predicates on those columns, without reading the files:
+
+    Model = "Canon EOS 5D" AND DateTimeOriginal BETWEEN "2020:01:01" AND
+    "2021:01:01" AND Width > 2000
+
+Predicate syntax:
+    comparisons: =, !=, <>, <, <=, >, >=, LIKE (with % and _ wildcards)
+                 BETWEEN a AND b, IN (a, b, ...), IS NULL, IS NOT NULL
+    operators: AND, OR, NOT and parentheses
+    values: numbers, strings between quotes, or words without spaces
+The keywords and the field names are case-insensitive. The EXIF dates
+have the format "YYYY:MM:DD HH:MM:SS", so they are compared as strings.
+
+The predicates are translated to SQL with parameters: the values are
+never inserted in the SQL text.
+
+The photos with a GPS position are also found by their distance to a
+position (radius and k-nearest queries) or in a bounding box, through the
+geohash column (see spatial_index.py). NumPy is only loaded by those
+queries.
+"""
+
+# Queryable fields: name -> (column, type)
+FIELDS = {
+    "path": ("path", "TEXT"),
+    "name": ("name", "TEXT"),
+    "format": ("format", "TEXT"),
+    "width": ("width", "INTEGER"),
+    "height": ("height", "INTEGER"),
+    "make": ("make", "TEXT"),
+    "model": ("model", "TEXT"),
+    "datetime": ("datetime", "TEXT"),
+    "datetimeoriginal": ("datetime_original", "TEXT"),
+    "latitude": ("latitude", "REAL"),
+    "longitude": ("longitude", "REAL"),
+}
+
+# Type of each column
+COLUMN_TYPES = dict(FIELDS.values())
+
+# Columns read from the EXIF metadata: column -> tag ID
+EXIF_COLUMNS = {
+    "make": 271,
+    "model": 272,
+    "datetime": 306,
+    "datetime_original": 36867,
+    "latitude": 2,  # Decimal, see Scorpion.set_GPS_info
+    "longitude": 4,
+}
+
+# Columns with an index (the most queried ones)
+INDEXED_COLUMNS = [
+    "format", "width", "height", "make", "model", "datetime_original"
+]
+
+# Number of rows inserted per transaction
+BATCH_SIZE = 1000
+
+# Columns of the index table, in the order of the rows
+COLUMNS = [
+    "path", "name", "format", "width", "height", "make", "model",
+    "datetime", "datetime_original", "latitude", "longitude", "metadata",
+    "geohash"
+]
+
+# First radius of the k-nearest queries (in meters), multiplied until
+# enough photos are found
+NEAREST_START_RADIUS = 1000
+NEAREST_RADIUS_FACTOR = 8
+
+COMPARISON_OPERATORS = ["=", "!=", "<>", "<=", ">=", "<", ">", "LIKE"]
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<operator><>|!=|<=|>=|=|<|>|\(|\)|,)
+        |(?P<word>[^\s"'()<>=!,]+)
+    )""", re.VERBOSE)
+
+
+class QueryError(ValueError):
+    """Raised when a predicate cannot be parsed."""
+
+
+def tokenize(predicate: str) -> list[tuple[str, str]]:
+    """
+    Return
+    ------
+     - the tokens of the predicate, as (kind, text) tuples, where kind is
+     'string', 'operator' or 'word'
+    """
+    tokens = []
+    position = 0
+    predicate = predicate.rstrip()
+    while position < len(predicate):
+        match = TOKEN_PATTERN.match(predicate, position)
+        if not match:
+            raise QueryError(
+                f"Unexpected character at position {position}: "
+                f"'{predicate[position:].lstrip()[:10]}'"
+                )
+        kind = match.lastgroup or ""
+        text = match.group(kind)
+        if kind == "string":
+            # Remove the quotes and the escaping backslashes
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class PredicateParser:
+    """
+    Recursive descent parser of the predicates:
+        expression := term (OR term)*
+        term := factor (AND factor)*
+        factor := NOT factor | '(' expression ')' | comparison
+        comparison := FIELD operator value
+                    | FIELD [NOT] BETWEEN value AND value
+                    | FIELD [NOT] IN '(' value (',' value)* ')'
+                    | FIELD IS [NOT] NULL
+    """
+    def __init__(self, predicate: str):
+        self.tokens: list[tuple[str, str]] = tokenize(predicate)
+        self.position: int = 0
+        self.parameters: list[Any] = []
+
+    def parse(self) -> tuple[str, list[Any]]:
+        """
+        Return
+        ------
+         - the SQL condition and its parameters
+        """
+        if not self.tokens:
+            raise QueryError("Empty predicate")
+        sql = self.parse_expression()
+        if self.position < len(self.tokens):
+            raise QueryError(
+                f"Unexpected '{self.tokens[self.position][1]}'"
+                )
+        return sql, self.parameters
+
+    def peek(self) -> tuple[str, str] | None:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def accept_keyword(self, keyword: str) -> bool:
+        token = self.peek()
+        if token and token[0] == "word" and token[1].upper() == keyword:
+            self.position += 1
+            return True
+        return False
+
+    def expect(self, text: str) -> None:
+        token = self.peek()
+        if not token or token[0] == "string" or token[1].upper() != text:
+            found = f"'{token[1]}'" if token else "the end"
+            raise QueryError(f"Expected '{text}' but found {found}")
+        self.position += 1
+
+    def parse_expression(self) -> str:
+        terms = [self.parse_term()]
+        while self.accept_keyword("OR"):
+            terms.append(self.parse_term())
+        return " OR ".join(terms)
+
+    def parse_term(self) -> str:
+        factors = [self.parse_factor()]
+        while self.accept_keyword("AND"):
+            factors.append(self.parse_factor())
+        return " AND ".join(factors)
+
+    def parse_factor(self) -> str:
+        if self.accept_keyword("NOT"):
+            return f"NOT {self.parse_factor()}"
+        if self.peek() == ("operator", "("):
+            self.position += 1
+            expression = self.parse_expression()
+            self.expect(")")
+            return f"({expression})"
+        return self.parse_comparison()
+
+    def parse_field(self) -> tuple[str, str]:
+        token = self.peek()
+        if not token or token[0] != "word":
+            found = f"'{token[1]}'" if token else "the end"
+            raise QueryError(f"Expected a field name but found {found}")
+        field = FIELDS.get(token[1].lower())
+        if not field:
+            raise QueryError(
+                f"Unknown field '{token[1]}' (fields: "
+                f"{', '.join(sorted(FIELDS))})"
+                )
+        self.position += 1
+        return field
+
+    def parse_value(self, column_type: str) -> str:
+        """Add the value to the parameters, converted to the column type."""
+        token = self.peek()
+        if not token or token[0] == "operator":
+            found = f"'{token[1]}'" if token else "the end"
+            raise QueryError(f"Expected a value but found {found}")
+        self.position += 1
+        value: Any = token[1]
+        if column_type != "TEXT":
+            try:
+                value = float(value)
+                if column_type == "INTEGER" and value.is_integer():
+                    value = int(value)
+            except ValueError:
+                raise QueryError(f"'{token[1]}' is not a number")
+        self.parameters.append(value)
+        return "?"
+
+    def parse_comparison(self) -> str:
+        column, column_type = self.parse_field()
+
+        if self.accept_keyword("IS"):
+            negation = " NOT" if self.accept_keyword("NOT") else ""
+            self.expect("NULL")
+            return f"{column} IS{negation} NULL"
+
+        negation = "NOT " if self.accept_keyword("NOT") else ""
+        if self.accept_keyword("BETWEEN"):
+            low = self.parse_value(column_type)
+            self.expect("AND")
+            high = self.parse_value(column_type)
+            return f"{column} {negation}BETWEEN {low} AND {high}"
+        if self.accept_keyword("IN"):
+            self.expect("(")
+            values = [self.parse_value(column_type)]
+            while self.peek() == ("operator", ","):
+                self.position += 1
+                values.append(self.parse_value(column_type))
+            self.expect(")")
+            return f"{column} {negation}IN ({', '.join(values)})"
+        if negation:
+            raise QueryError("Expected 'BETWEEN' or 'IN' after 'NOT'")
+
+        token = self.peek()
+        operator = token[1].upper() if token and token[0] != "string" else ""
+        if operator not in COMPARISON_OPERATORS:
+            found = f"'{token[1]}'" if token else "the end"
+            raise QueryError(f"Expected an operator but found {found}")
+        self.position += 1
+        # LIKE compares the text of the numbers
+        value = self.parse_value("TEXT" if operator == "LIKE" else column_type)
+        return f"{column} {operator} {value}"
+
+
+def get_index_row(file_path: str, metadata: dict[int, Any]) -> tuple:
+    """
+    Return
+    ------
+     - the row of the file, with the columns of the index table
+    """
+    basic = metadata.get(BASIC) or {}
+    exif = metadata.get(EXIF) or {}
+
+    def get_number(value: Any, number_type: type) -> Any:
+        try:
+            return number_type(value)
+        except (TypeError, ValueError):
+            return None
+
+    values: dict[str, Any] = {}
+    for column, tag_id in EXIF_COLUMNS.items():
+        value = exif[tag_id][1] if tag_id in exif else None
+        if value is not None and COLUMN_TYPES[column] == "REAL":
+            value = get_number(value, float)
+        elif value is not None:
+            value = str(value).strip("\0 ") or None
+        values[column] = value
+
+    latitude, longitude = values["latitude"], values["longitude"]
+    return (
+        file_path, basic.get("Name", os.path.basename(file_path)),
+        basic.get("Format"),
+        get_number(basic.get("Width"), int),
+        get_number(basic.get("Height"), int),
+        values["make"], values["model"],
+        values["datetime"], values["datetime_original"],
+        latitude, longitude,
+        encode_metadata(metadata),
+        encode_geohash(latitude, longitude)
+        if latitude is not None and longitude is not None else None
+    )
+
+
+class MetadataIndex:
+    """
+    Usage:
+        index = MetadataIndex(index_file)
+        index.add_rows(rows)  # Rows made by get_index_row()
+        for row in index.query('Model = "EOS 5D" AND Width > 2000'):
+            ...
+        for row, distance in index.query_radius(48.85, 2.35, 5000):
+            ...
+        index.close()
+    """
+    def __init__(self, index_file: str):
+        self.connection = sqlite3.connect(index_file)
+        self.connection.row_factory = sqlite3.Row
+        # No sync to the disk on every batch, and enough cache for the
+        # indexes of a large table (in KB)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA cache_size=-65536")
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    path TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    format TEXT,
+                    width INTEGER,
+                    height INTEGER,
+                    make TEXT,
+                    model TEXT,
+                    datetime TEXT,
+                    datetime_original TEXT,
+                    latitude REAL,
+                    longitude REAL,
+                    metadata TEXT NOT NULL,
+                    geohash TEXT
+                )
+                """
+                )
+            self.add_geohash_column()
+            for column in INDEXED_COLUMNS + ["geohash"]:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS images_{column} "
+                    f"ON images ({column})"
+                    )
+
+    def add_geohash_column(self) -> None:
+        """Add the geohashes to an index made without them."""
+        columns = [
+            row["name"] for row in
+            self.connection.execute("PRAGMA table_info(images)")
+        ]
+        if "geohash" in columns:
+            return
+        self.connection.execute("ALTER TABLE images ADD COLUMN geohash TEXT")
+        self.connection.create_function(
+            "geohash", 2, encode_geohash, deterministic=True
+            )
+        self.connection.execute(
+            "UPDATE images SET geohash = geohash(latitude, longitude) "
+            "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            )
+
+    def add_rows(self, rows: list[tuple]) -> None:
+        """Add or replace the rows of the files, by batches."""
+        for start in range(0, len(rows), BATCH_SIZE):
+            with self.connection:
+                self.connection.executemany(
+                    f"INSERT OR REPLACE INTO images ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    rows[start:start + BATCH_SIZE]
+                    )
+
+    def query(self, predicate: str) -> sqlite3.Cursor:
+        """
+        Return
+        ------
+         - the rows of the files matching the predicate, by path
+
+        Raise
+        -----
+         - QueryError if the predicate is invalid
+        """
+        condition, parameters = PredicateParser(predicate).parse()
+        return self.connection.execute(
+            f"SELECT * FROM images WHERE {condition} ORDER BY path",
+            parameters
+            )
+
+    def select_in_boxes(
+            self, boxes: list[tuple[float, float, float, float]],
+            predicate: str = ""
+            ) -> list[sqlite3.Row]:
+        """
+        Return
+        ------
+         - the rows of the files in the cells covering the boxes (a superset
+         of the files in the boxes), matching the predicate if any
+
+        Raise
+        -----
+         - QueryError if the predicate is invalid
+        """
+        cells = get_covering_cells(boxes)
+        # The geohashes of a cell are between the cell and the next one
+        # ('{' follows the last character of the alphabet)
+        condition = " OR ".join(
+            "(geohash >= ? AND geohash < ?)" for _ in cells
+            )
+        parameters: list[Any] = []
+        for cell in cells:
+            parameters += [cell, cell + "{"]
+        if predicate:
+            predicate_condition, predicate_parameters = \
+                PredicateParser(predicate).parse()
+            condition = f"({condition}) AND ({predicate_condition})"
+            parameters += predicate_parameters
+        return self.connection.execute(
+            f"SELECT * FROM images WHERE {condition}", parameters
+            ).fetchall()
+
+    def query_radius(
+            self, latitude: float, longitude: float, radius: float,
+            predicate: str = ""
+            ) -> list[tuple[sqlite3.Row, float]]:
+        """
+        Return
+        ------
+         - the rows of the files at most at the radius (in meters) from the
+         position, with their distance, from the nearest
+
+        Raise
+        -----
+         - QueryError if the predicate is invalid
+        """
+        import numpy as np
+
+        rows = self.select_in_boxes(
+            get_circle_boxes(latitude, longitude, radius), predicate
+            )
+        if not rows:
+            return []
+        distances = haversine_distances(
+            latitude, longitude,
+            np.array([row["latitude"] for row in rows]),
+            np.array([row["longitude"] for row in rows])
+            )
+        order = np.argsort(distances, kind="stable")
+        return [
+            (rows[i], float(distances[i]))
+            for i in order[distances[order] <= radius]
+        ]
+
+    def query_bbox(
+            self, south: float, west: float, north: float, east: float,
+            predicate: str = ""
+            ) -> list[tuple[sqlite3.Row, None]]:
+        """
+        Return
+        ------
+         - the rows of the files in the bounding box (crossing the
+         antimeridian if west > east), by path
+
+        Raise
+        -----
+         - QueryError if the predicate is invalid
+        """
+        import numpy as np
+
+        boxes = split_box(south, west, north, east)
+        rows = self.select_in_boxes(boxes, predicate)
+        if not rows:
+            return []
+        latitudes = np.array([row["latitude"] for row in rows])
+        longitudes = np.array([row["longitude"] for row in rows])
+        inside = np.zeros(len(rows), dtype=bool)
+        for box_south, box_west, box_north, box_east in boxes:
+            inside |= (
+                (latitudes >= box_south) & (latitudes <= box_north)
+                & (longitudes >= box_west) & (longitudes <= box_east)
+            )
+        return sorted(
+            ((rows[i], None) for i in np.flatnonzero(inside)),
+            key=lambda result: result[0]["path"]
+            )
+
+    def query_nearest(
+            self, latitude: float, longitude: float, count: int,
+            predicate: str = ""
+            ) -> list[tuple[sqlite3.Row, float]]:
+        """
+        The radius is increased until enough files are found: the files
+        found in a radius are the nearest ones.
+
+        Return
+        ------
+         - the rows of the count nearest files from the position, with their
+         distance, from the nearest
+
+        Raise
+        -----
+         - QueryError if the predicate is invalid
+        """
+        radius = NEAREST_START_RADIUS
+        while True:
+            results = self.query_radius(latitude, longitude, radius, predicate)
+            if len(results) >= count or radius >= MAX_DISTANCE:
+                return results[:count]
+            radius = min(radius * NEAREST_RADIUS_FACTOR, MAX_DISTANCE)
+
+    def close(self) -> None:
+        self.connection.close()
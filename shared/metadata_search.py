@@ -0,0 +1,113 @@
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Any, NamedTuple
+from shared.config import BASIC, EXIF
+
+"""
+This module implements the metadata search of Scorpion.
+
+Both the basic attributes and the EXIF values are searched, whatever their
+type: the values are turned into text once per file (bytes decoded,
+rationals and GPS positions as decimal numbers, several values joined by
+commas), optionally restricted to some tags.
+
+The texts of a file are joined into a single string, which is searched by
+str.find: there is no string built per comparison, and a file without any
+match costs a single scan. The matches are mapped back to their tag from
+the offsets of the texts.
+"""
+
+# Separator of the texts in the searched string (removed from the texts,
+# so that a match never spans two values)
+SEPARATOR = "\0"
+
+
+class SearchHit(NamedTuple):
+    """A value containing the search string."""
+    path: str
+    tag: str
+    value: str
+
+
+def stringify_value(value: Any) -> str:
+    """
+    Return
+    ------
+     - the searchable text of a metadata value
+    """
+    if isinstance(value, str):
+        text = value
+    elif isinstance(value, bytes):  # Byte and Undefined EXIF values
+        text = value.decode("latin-1")
+    elif isinstance(value, tuple):
+        text = ", ".join(stringify_value(item) for item in value)
+    else:  # Numbers, including the rationals of Pillow
+        text = str(value)
+    return text.replace(SEPARATOR, "")
+
+
+def get_searchable_values(
+        metadata: dict[int, Any], tags: set[str] | None = None
+        ) -> list[tuple[str, str]]:
+    """
+    Return
+    ------
+     - the (tag, text) of the basic and EXIF values of the metadata, only
+     those of the tags if any (lowercase names)
+    """
+    values = []
+    for tag, value in (metadata.get(BASIC) or {}).items():
+        if tags is None or tag.lower() in tags:
+            values.append((tag, stringify_value(value)))
+    for tag, value in (metadata.get(EXIF) or {}).values():
+        if tags is None or tag.lower() in tags:
+            values.append((tag, stringify_value(value)))
+    return values
+
+
+class MetadataSearch:
+    """
+    Usage:
+        search = MetadataSearch("Canon", case_insensitive=True,
+                                tags=["Make", "Model"])
+        hits = search.search(file_path, metadata)
+    """
+    def __init__(
+            self, search_string: str, case_insensitive: bool = False,
+            tags: list[str] | None = None
+            ):
+        self.case_insensitive: bool = case_insensitive
+        self.search_string: str = \
+            search_string.lower() if case_insensitive else search_string
+        # Searched tags (lowercase names), all of them if None
+        self.tags: set[str] | None = \
+            {tag.lower() for tag in tags} if tags else None
+
+    def search(
+            self, file_path: str, metadata: dict[int, Any]
+            ) -> list[SearchHit]:
+        """
+        Return
+        ------
+         - the values of the metadata containing the search string
+        """
+        values = get_searchable_values(metadata, self.tags)
+        texts = [text for _, text in values]
+        if self.case_insensitive:
+            texts = [text.lower() for text in texts]
+        haystack = SEPARATOR.join(texts)
+
+        position = haystack.find(self.search_string)
+        if position < 0:
+            return []
+
+        # Offset of each text in the haystack
+        starts = [0, *accumulate(len(text) + 1 for text in texts)]
+        hits = []
+        while position >= 0:
+            i = bisect_right(starts, position) - 1
+            tag, text = values[i]
+            hits.append(SearchHit(file_path, tag, text))
+            # Next match in the following values
+            position = haystack.find(self.search_string, starts[i + 1])
+        return hits
@@ -0,0 +1,149 @@
+import os
+import json
+import hashlib
+from typing import Any
+
+"""
+This module implements resumable downloads.
+
+An image is downloaded into a '.part' file, next to a '.part.json' file
+that records its URL and the validators (ETag/Last-Modified) of the
+response. The size of the '.part' file is the progress of the download.
+The files are named after a hash of the URL (see get_part_path), so the
+progress of a URL is never mistaken for the one of another URL with the
+same file name.
+
+When the download is retried or resumed, only the remaining bytes are
+requested with a 'Range' header. The 'If-Range' header makes the server
+send the whole image instead if it changed in the meantime, in which
+case the download starts over. If the server refuses the range (e.g. the
+'.part' file is already complete), the progress is discarded and the
+download restarts without it.
+"""
+
+PART_EXTENSION = ".part"
+# Folder of the '.part' files, inside the image folder
+PARTS_FOLDER = ".parts"
+
+
+def get_part_path(folder: str, url: str) -> str:
+    """
+    Return
+    ------
+     - the path of the '.part' file of the URL in the folder. It is the
+     same across runs, so that the download can be resumed.
+    """
+    key = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(folder, key + PART_EXTENSION)
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when the server refuses the requested range (416): the
+    progress has been discarded, the download has to start over.
+    """
+
+
+class PartialDownload:
+    """
+    Usage:
+        part = PartialDownload(part_path, url)
+        headers.update(part.get_range_headers())
+        response = session.get(url, headers=headers, stream=True)
+        resumed = part.start(response)
+        with part.open() as f:
+            ...write the chunks...
+        part.finish(img_path)
+    """
+    def __init__(self, part_path: str, url: str):
+        self.part_path: str = part_path
+        self.meta_path: str = part_path + ".json"
+        self.url: str = url
+        # Number of bytes already downloaded
+        self.offset: int = 0
+        self.validator: str | None = None
+
+        try:
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('url') == url and os.path.isfile(part_path):
+                self.offset = os.path.getsize(part_path)
+                self.validator = self.get_validator(meta)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def get_validator(meta: dict[str, Any]) -> str | None:
+        """
+        Return the value of the 'If-Range' header.
+        Weak ETags cannot be used, the date is used instead.
+        """
+        etag = meta.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return meta.get('last_modified')
+
+    def get_range_headers(self) -> dict[str, str]:
+        """
+        Return the headers requesting the remaining bytes, or no header
+        if the download cannot be resumed.
+        """
+        if not self.offset or not self.validator:
+            return {}
+        return {
+            'Range': f"bytes={self.offset}-",
+            'If-Range': self.validator
+        }
+
+    def start(self, response: Any) -> bool:
+        """
+        Check if the server sent the remaining bytes, and record the
+        validators of the response.
+
+        Return
+        ------
+         - True if the download is resumed, False if it starts over
+        """
+        content_range = response.headers.get('Content-Range', '')
+        resumed = (
+            self.offset > 0 and response.status_code == 206
+            and content_range.startswith(f"bytes {self.offset}-")
+            )
+        if not resumed:
+            self.offset = 0
+
+        os.makedirs(os.path.dirname(self.part_path), exist_ok=True)
+        with open(self.meta_path, 'w') as f:
+            json.dump({
+                'url': self.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }, f)
+        return resumed
+
+    def open(self) -> Any:
+        """Open the '.part' file to append the next bytes."""
+        return open(self.part_path, 'ab' if self.offset else 'wb')
+
+    def read_chunks(self, chunk_size: int) -> Any:
+        """Yield the bytes already downloaded."""
+        with open(self.part_path, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def finish(self, dest_path: str | None = None) -> None:
+        """
+        Atomically move the complete file to its destination, if given,
+        and forget the progress.
+        """
+        if dest_path:
+            os.replace(self.part_path, dest_path)
+        if os.path.exists(self.meta_path):
+            os.remove(self.meta_path)
+
+    def discard(self) -> None:
+        """Delete the downloaded bytes."""
+        self.offset = 0
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
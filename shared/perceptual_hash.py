@@ -0,0 +1,176 @@
+import threading
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+"""
+This module detects near-duplicate images: the same picture served at
+several sizes or compression levels.
+
+Each image gets a difference hash (dHash): the image is reduced to a
+9x8 grayscale thumbnail, and each bit tells if a pixel is brighter than
+its right neighbour. Similar images have hashes that differ by a few
+bits, so the near-duplicates are the images within a small Hamming
+distance. They are looked up in a BK-tree, without comparing every pair.
+"""
+
+# Size of the hash: HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 8
+
+# Keep the first downloaded variant of a duplicate cluster, or the one
+# with the most pixels
+KEEP_FIRST = "first"
+KEEP_LARGEST = "largest"
+
+
+def dhash(img: "Image.Image", hash_size: int = HASH_SIZE) -> int:
+    """
+    Compute the difference hash of an image.
+
+    Return
+    ------
+     - the hash, as an int of hash_size * hash_size bits
+    """
+    # Pillow and NumPy are only loaded when images are hashed
+    import numpy as np
+    from PIL import Image
+
+    # Let the JPEG decoder downscale while decoding, it is much faster
+    # than decoding the full image
+    img.draft('L', (hash_size * 4, hash_size * 4))
+    thumbnail = img.convert('L').resize(
+        (hash_size + 1, hash_size), Image.Resampling.BILINEAR
+        )
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    return (hash1 ^ hash2).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes, with the Hamming distance as metric.
+
+    Every child of a node is stored under its distance to the node, so a
+    search within a radius r only visits the children whose distance d
+    to the node satisfies |d - distance(node, target)| <= r.
+    """
+    def __init__(self):
+        # Node: [hash, item, {distance: child node}]
+        self.root: list | None = None
+
+    def add(self, hash_value: int, item: Any) -> None:
+        if self.root is None:
+            self.root = [hash_value, item, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, item, {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, radius: int) -> list[tuple[int, Any]]:
+        """
+        Return
+        ------
+         - the (distance, item) pairs within the radius, closest first
+        """
+        results: list[tuple[int, Any]] = []
+        if self.root is None:
+            return results
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= radius:
+                results.append((distance, node[1]))
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    nodes.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+class ImageVariant:
+    """A downloaded image file."""
+    def __init__(self, url: str, path: str, size: int, digest: str):
+        self.url: str = url
+        self.path: str = path
+        self.size: int = size  # In bytes
+        self.digest: str = digest  # SHA-256 of the content
+        self.pixels: int = 0
+
+
+class DuplicateCluster:
+    """The kept variant of an image and the URLs of its near-duplicates."""
+    def __init__(self, kept: ImageVariant):
+        self.kept: ImageVariant = kept
+        # URLs of all the variants, the kept one included
+        self.urls: list[str] = [kept.url]
+
+
+class NearDuplicateIndex:
+    """
+    Index of the downloaded images, shared by the download workers.
+
+    Usage:
+        cluster, dropped = index.add(ImageVariant(url, path, size, digest))
+        if dropped: delete dropped.path, cluster.kept is the variant kept
+    """
+    def __init__(self, threshold: int, keep: str = KEEP_FIRST):
+        self.threshold: int = threshold
+        self.keep: str = keep
+        self.tree = BKTree()
+        self.clusters: list[DuplicateCluster] = []
+        self.lock = threading.Lock()
+
+    def add(
+            self, variant: ImageVariant
+            ) -> tuple[DuplicateCluster | None, ImageVariant | None]:
+        """
+        Hash the image file and look for a near-duplicate.
+
+        Return
+        ------
+         - the cluster of the image, None if it cannot be decoded
+         - the variant that is not kept (the new image, or the previously
+         kept one if the new image is larger in 'largest' mode), or None if
+         the image is new
+        """
+        from PIL import Image
+
+        try:
+            with Image.open(variant.path) as img:
+                width, height = img.size
+                hash_value = dhash(img)
+        except (OSError, ValueError):  # Not decodable
+            return None, None
+        variant.pixels = width * height
+
+        with self.lock:
+            matches = self.tree.search(hash_value, self.threshold)
+            if not matches:
+                cluster = DuplicateCluster(variant)
+                self.tree.add(hash_value, cluster)
+                self.clusters.append(cluster)
+                return cluster, None
+
+            cluster = matches[0][1]
+            cluster.urls.append(variant.url)
+            if (self.keep == KEEP_LARGEST
+                    and variant.pixels > cluster.kept.pixels):
+                dropped, cluster.kept = cluster.kept, variant
+                return cluster, dropped
+            return cluster, variant
+
+    def get_duplicate_clusters(self) -> list[DuplicateCluster]:
+        """Return the clusters that have more than one variant."""
+        with self.lock:
+            return [c for c in self.clusters if len(c.urls) > 1]
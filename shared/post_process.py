@@ -0,0 +1,106 @@
+import os
+import io
+import hashlib
+import multiprocessing
+from typing import Any
+from concurrent.futures import ProcessPoolExecutor, Future
+from PIL import Image
+from scorpion import Scorpion
+from shared.ascii_format import ERROR
+from shared.config import THUMB_SIZE
+from shared.perceptual_hash import dhash
+from shared.metadata_codec import encode_metadata
+from shared.sidecar_store import SidecarStore
+
+"""
+This module implements the post-download pipeline of Spider.
+
+Each downloaded image is sent to a pool of processes, which extract its
+metadata (with Scorpion.get_metadata), create its thumbnail and compute
+its hashes. The decoding work uses all the cores without slowing down the
+download threads, and the results are written to the sidecar store of the
+image folder (see sidecar_store.py).
+"""
+
+
+def process_image(file_path: str) -> dict[str, Any]:
+    """
+    Run in a worker process.
+
+    Return
+    ------
+     - the results to store in the sidecar store
+    """
+    stat = os.stat(file_path)
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+
+    metadata = Scorpion().get_metadata(file_path, cached=False)
+
+    with Image.open(file_path) as img:
+        # JPEG images are downscaled while being decoded
+        img.draft('RGB', (THUMB_SIZE, THUMB_SIZE))
+        img.thumbnail((THUMB_SIZE, THUMB_SIZE))
+        if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):  # e.g. CMYK
+            img = img.convert('RGB')
+        thumbnail = io.BytesIO()
+        img.save(thumbnail, 'PNG')
+    with Image.open(file_path) as img:
+        perceptual_hash = f"{dhash(img):016x}"
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        "dhash": perceptual_hash,
+        "metadata": encode_metadata(metadata),
+        "thumbnail": thumbnail.getvalue(),
+    }
+
+
+class PostProcessor:
+    """
+    Usage:
+        processor = PostProcessor(image_folder, workers)
+        processor.submit(img_path)  # As each image lands
+        processor.close()
+    """
+    def __init__(self, image_folder: str, workers: int = 0):
+        self.store = SidecarStore(image_folder)
+        # All the cores by default. The processes are started on the first
+        # submit(), from a download thread: they are spawned instead of
+        # forked, as the other threads may hold locks (pool, budget,
+        # manifest, SQLite) that a forked process would inherit locked.
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers or None,
+            mp_context=multiprocessing.get_context("spawn")
+            )
+
+    def submit(self, file_path: str) -> None:
+        """Process the file in the background."""
+        future = self.executor.submit(process_image, file_path)
+        future.add_done_callback(
+            lambda done: self.store_result(file_path, done)
+            )
+
+    def store_result(self, file_path: str, future: Future) -> None:
+        """Called in the main process when a file has been processed."""
+        if future.cancelled():
+            return
+        try:
+            self.store.put(file_path, future.result())
+        except FileNotFoundError:
+            pass  # Deleted in the meantime (e.g. near-duplicate)
+        except Exception as e:
+            print(f"{ERROR} Post-processing of '{file_path}' failed: {e}")
+
+    def close(self, wait: bool = True) -> None:
+        """
+        Wait for the pending files, or cancel them if wait is False
+        (the files being processed are finished in any case).
+        """
+        self.executor.shutdown(wait=True, cancel_futures=not wait)
+        self.store.close()
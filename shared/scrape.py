@@ -3,11 +3,11 @@ from shared.ascii_format import (
     )
 from shared.config import SCRAPTYPE_STR, SCRAPTYPE_IMG
 from bs4 import BeautifulSoup
-import requests
 from urllib.parse import urljoin, urlparse
 from shared.humanize_scraping import sleep_for_random_secs
 from typing import Any
 from shared.config import HEADER
+from shared.crawl_state import CrawlState
 
 
 class Scraper:
@@ -31,6 +31,9 @@ class Scraper:
         self.max_sleep: int = scraper.max_sleep
         self.recurse_depth: int = scraper.recurse_depth
         self.visited_urls = scraper.visited_urls
+        self.session = scraper.session
+        # Incremental recrawl state, None if the mode is off
+        self.crawl_state: CrawlState | None = scraper.crawl_state
         self.url: str = url
 
     def check_if_link_visited(self, url: str) -> bool:
@@ -41,87 +44,134 @@ class Scraper:
         self.visited_urls.append(url)
         return False
 
-    def search_on_current_page(self, url: str):
-        """Run appropriate method according to scraper type"""
+    def search_on_current_page(
+            self, url: str, soup: BeautifulSoup) -> list:
+        """
+        Run appropriate method according to scraper type
+
+        Return
+        ------
+         - the hits found on the page
+        """
         if self.scraper_type == SCRAPTYPE_STR:
-            self.scraper.find_string(url)
+            return self.scraper.find_string(url, soup)
         elif self.scraper_type == SCRAPTYPE_IMG:
-            self.scraper.find_images(url)
+            return self.scraper.find_images(url, soup)
+        return []
 
-    def scrape(self, url: str = "", depth: int = 1) -> None:
-        if self.verbose:
-            print(
-                f"{INFO} {RED}---------- Enter depth: "
-                f"{depth} ---------{RESET}"
-                )
-        if not url:
-            url = self.base_url
+    def visit(self, url: str) -> list[str]:
+        """
+        Fetch the page, search it and return the links it contains.
 
-        self.search_on_current_page(url)
+        In incremental mode, a page that did not change since the previous
+        run is not searched again: its stored links and hits are reused.
+        """
+        state = self.crawl_state
+        # The hits are stored by search string
+        search_key = self.scraper.search_string or ""
+        headers = dict(HEADER)
 
         try:
+            # Ask the server to only send the page if it changed
+            if state and state.has_hits_for(url, search_key):
+                headers.update(state.get_conditional_headers(url))
+
             # Send a GET request to the website
-            response = requests.get(self.url, headers=HEADER)
+            response = self.session.get(url, headers=headers)
             # Raise an error for bad responses
             response.raise_for_status()
 
-            # Check if the request was successful (status code 200)
-            if response.status_code == 200:
-                # Parse the HTML content of the page
-                soup = BeautifulSoup(response.content, 'html.parser')
-                # Find all links on the page
-                links = soup.find_all('a', href=True)
-
-                # Extract and print file and directory URLs
-                for link in links:
-                    href = link['href']
-                    full_link = urljoin(self.url, href)
-
-                    """
-                    We need to check the link's domain as we only handle links
-                    from the same domain.
-                    We wouldn't want to be redirected to the Instagram profile
-                    linked to the website, for instance.
-                    """
-                    base_domain = urlparse(self.base_url).netloc
-                    link_domain = urlparse(full_link).netloc
-
-                    # We access the current link to search the string and to
-                    # get the included link set
-                    main_link = full_link.split('#')[0]
-
-                    if (not self.check_if_link_visited(main_link)
-                            and link_domain == base_domain):
-
-                        if self.verbose:
-                            print(f"{INFO} Accessing {main_link}...")
-
-                        # Reset KO count as this one is valid
-                        self.ko_count = 0
-
-                        self.search_on_current_page(main_link)
-
-                        # We access links inside the current link if
-                        # depth limit is not reached
-                        if depth + 1 <= self.recurse_depth:
-                            # Mimic human-like behavior
-                            if self.sleep:
-                                sleep_for_random_secs(max_sec=self.max_sleep)
-                            self.scrape(main_link, depth + 1)
-                    else:
-                        if self.verbose:
-                            print(f"{WARNING} Skipped: {main_link}!")
-                        self.ko_count += 1
-
-                        # If single page mode is offlimit:
-                        if self.ko_count == self.ko_limit:
-                            if self.verbose:
-                                print(
-                                    f"{ERROR} Max bad links limit is reached!"
-                                    )
-                            exit()
+            if state and response.status_code == 304:  # Not Modified
+                content_hash = None
+            elif response.status_code == 200:
+                content_hash = \
+                    state.hash_content(response.content) if state else None
             else:  # If status_code != 200
                 if self.verbose:
                     print('Failed to fetch the page:', response.status_code)
+                return []
+
+            if (state and state.has_hits_for(url, search_key)
+                    and state.is_unchanged(url, content_hash)):
+                if self.verbose:
+                    print(f"{INFO} Unchanged since the previous run: {url}")
+                links, hits = state.reuse(url, search_key)
+                self.scraper.reuse_hits(url, hits)
+                return links
+
+            # Parse the HTML content of the page
+            soup = BeautifulSoup(response.text, 'html.parser')
+
+            hits = self.search_on_current_page(url, soup)
+
+            # Find all links on the page
+            links = [
+                urljoin(url, link['href'])
+                for link in soup.find_all('a', href=True)
+                ]
+
+            if state:
+                state.update(
+                    url, search_key, content_hash,
+                    response.headers, links, hits
+                    )
+            return links
         except Exception as e:
             print(f"{ERROR} {e}")
+            return []
+
+    def scrape(self, url: str = "", depth: int = 1) -> None:
+        if self.verbose:
+            print(
+                f"{INFO} {RED}---------- Enter depth: "
+                f"{depth} ---------{RESET}"
+                )
+        if not url:
+            url = self.base_url
+            self.check_if_link_visited(url)
+
+        # Search the page and extract file and directory URLs
+        for full_link in self.visit(url):
+            """
+            We need to check the link's domain as we only handle links
+            from the same domain.
+            We wouldn't want to be redirected to the Instagram profile
+            linked to the website, for instance.
+            """
+            base_domain = urlparse(self.base_url).netloc
+            link_domain = urlparse(full_link).netloc
+
+            # We access the current link to search the string and to
+            # get the included link set
+            main_link = full_link.split('#')[0]
+
+            if (not self.check_if_link_visited(main_link)
+                    and link_domain == base_domain):
+
+                if self.verbose:
+                    print(f"{INFO} Accessing {main_link}...")
+
+                # Reset KO count as this one is valid
+                self.ko_count = 0
+
+                # We access links inside the current link if
+                # depth limit is not reached
+                if depth + 1 <= self.recurse_depth:
+                    # Mimic human-like behavior
+                    if self.sleep:
+                        sleep_for_random_secs(max_sec=self.max_sleep)
+                    self.scrape(main_link, depth + 1)
+                else:
+                    self.visit(main_link)
+            else:
+                if self.verbose:
+                    print(f"{WARNING} Skipped: {main_link}!")
+                self.ko_count += 1
+
+                # If single page mode is offlimit:
+                if self.ko_count == self.ko_limit:
+                    if self.verbose:
+                        print(
+                            f"{ERROR} Max bad links limit is reached!"
+                            )
+                    exit()
@@ -0,0 +1,237 @@
+import io
+import os
+import json
+import time
+import tarfile
+import threading
+from typing import Any, BinaryIO
+
+"""
+This module implements the shard output mode of Spider.
+
+Instead of one file per image, the images are appended to uncompressed
+tar files ("shards") of a limited size, in the image folder:
+
+    <image folder>/shard-00000.tar
+    <image folder>/shard-00001.tar
+    ...
+    <image folder>/shards.index
+
+The index is a JSON Lines file with, for every image, the shard it is in
+and the offset and size of its content. Scorpion and the viewer read the
+images directly at their offset, without extracting the shards.
+
+An image in a shard is designated by a path of the form:
+    <image folder>/shard-00000.tar#<image name>
+"""
+
+SHARD_INDEX_FILE = "shards.index"
+SHARD_PREFIX = "shard-"
+SHARD_EXTENSION = ".tar"
+SHARD_SEPARATOR = "#"
+
+
+def get_shard_name(number: int) -> str:
+    return f"{SHARD_PREFIX}{number:05d}{SHARD_EXTENSION}"
+
+
+def is_shard_file(filename: str) -> bool:
+    """Check if the file is a shard or the index of the shards."""
+    return filename == SHARD_INDEX_FILE or (
+        filename.startswith(SHARD_PREFIX)
+        and filename.endswith(SHARD_EXTENSION)
+        )
+
+
+def read_index(image_folder: str) -> list[dict[str, Any]]:
+    """
+    Return
+    ------
+     - the entries of the index of the folder (empty if there is none).
+     A truncated last line (e.g. after a crash) is ignored.
+    """
+    entries = []
+    try:
+        with open(os.path.join(image_folder, SHARD_INDEX_FILE), 'r') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+class ShardWriter:
+    """
+    Usage:
+        writer = ShardWriter(image_folder, max_size)
+        path = writer.add(file_path, img_name)  # The file is moved
+        writer.close()
+
+    It can be used by several download threads.
+    """
+    def __init__(self, image_folder: str, max_size: int):
+        self.image_folder: str = image_folder
+        self.max_size: int = max_size  # In bytes
+        self.lock = threading.Lock()
+
+        entries = read_index(image_folder)
+        self.names: set[str] = {entry["name"] for entry in entries}
+        # The images are appended to a new shard: the last one may not
+        # have been closed properly
+        self.number: int = max(
+            (int(entry["shard"][len(SHARD_PREFIX):-len(SHARD_EXTENSION)])
+             for entry in entries),
+            default=-1
+            ) + 1
+        self.tar: tarfile.TarFile | None = None
+        self.index = open(
+            os.path.join(image_folder, SHARD_INDEX_FILE), 'a'
+            )
+
+    def get_unique_name(self, img_name: str, digest: str) -> str:
+        """Add the hash to the name if it is taken by another image."""
+        if img_name not in self.names:
+            return img_name
+        stem, extension = os.path.splitext(img_name)
+        return f"{stem}-{digest[:8]}{extension}"
+
+    def add(self, file_path: str, img_name: str, digest: str) -> str:
+        """
+        Append the file to the current shard and delete it. A new shard is
+        started when the current one would exceed the maximum size.
+
+        Return
+        ------
+         - the path of the image in the shard
+        """
+        size = os.path.getsize(file_path)
+
+        with self.lock:
+            if self.tar and self.tar.offset + size > self.max_size:
+                self.tar.close()
+                self.tar = None
+                self.number += 1
+            if not self.tar:
+                self.tar = tarfile.open(
+                    os.path.join(
+                        self.image_folder, get_shard_name(self.number)
+                        ),
+                    'w', format=tarfile.PAX_FORMAT
+                    )
+
+            name = self.get_unique_name(img_name, digest)
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = int(time.time())
+            with open(file_path, 'rb') as f:
+                self.tar.addfile(info, f)
+            self.tar.fileobj.flush()
+            # The content is followed by the padding to 512 bytes
+            offset = self.tar.offset - (size + 511) // 512 * 512
+
+            shard = get_shard_name(self.number)
+            self.index.write(json.dumps({
+                "name": name, "shard": shard, "offset": offset, "size": size
+                }) + "\n")
+            self.index.flush()
+            self.names.add(name)
+
+        os.remove(file_path)
+        return os.path.join(self.image_folder, shard) + SHARD_SEPARATOR + name
+
+    def close(self) -> None:
+        with self.lock:
+            if self.tar:
+                self.tar.close()
+                self.tar = None
+            self.index.close()
+
+
+class ShardReader:
+    """Read the images of the shards of a folder, without extracting them."""
+    def __init__(self, image_folder: str):
+        self.image_folder: str = image_folder
+        # Key: the image name, value: its index entry
+        self.entries: dict[str, dict[str, Any]] = {
+            entry["name"]: entry for entry in read_index(image_folder)
+        }
+
+    def get_paths(self) -> list[str]:
+        """Return the paths of all the images in the shards."""
+        return [
+            os.path.join(self.image_folder, entry["shard"])
+            + SHARD_SEPARATOR + name
+            for name, entry in self.entries.items()
+        ]
+
+    def read(self, name: str) -> bytes:
+        entry = self.entries[name]
+        shard_path = os.path.join(self.image_folder, entry["shard"])
+        with open(shard_path, 'rb') as f:
+            f.seek(entry["offset"])
+            return f.read(entry["size"])
+
+
+# Readers opened by Scorpion and the viewer, by folder
+_opened_readers: dict[str, ShardReader] = {}
+
+
+def has_shards(image_folder: str) -> bool:
+    return os.path.isfile(os.path.join(image_folder, SHARD_INDEX_FILE))
+
+
+def split_shard_path(path: str) -> tuple[str, str] | None:
+    """
+    Return
+    ------
+     - the path of the shard and the image name if the path designates an
+     image in a shard, otherwise None
+    """
+    shard_path, separator, name = path.rpartition(SHARD_SEPARATOR)
+    if not separator or not shard_path.endswith(SHARD_EXTENSION):
+        return None
+    return shard_path, name
+
+
+def get_shard_reader(image_folder: str) -> ShardReader:
+    if image_folder not in _opened_readers:
+        _opened_readers[image_folder] = ShardReader(image_folder)
+    return _opened_readers[image_folder]
+
+
+def get_file_path(path: str) -> str:
+    """
+    Return
+    ------
+     - the path of the file holding the image: the shard if the path
+     designates an image in a shard, otherwise the path itself
+    """
+    shard = split_shard_path(path)
+    return shard[0] if shard and not os.path.isfile(path) else path
+
+
+def image_exists(path: str) -> bool:
+    """Check if the path is a file or an image in a shard."""
+    if os.path.isfile(path):
+        return True
+    shard = split_shard_path(path)
+    return bool(shard) and os.path.isfile(shard[0]) and \
+        shard[1] in get_shard_reader(os.path.dirname(shard[0])).entries
+
+
+def open_image_file(path: str) -> str | BinaryIO:
+    """
+    Return
+    ------
+     - the path itself if it is a file, or a file-like object holding the
+     content of the image if it designates an image in a shard. Both can
+     be passed to Image.open().
+    """
+    shard = split_shard_path(path)
+    if not shard or os.path.isfile(path):
+        return path
+    reader = get_shard_reader(os.path.dirname(shard[0]))
+    return io.BytesIO(reader.read(shard[1]))
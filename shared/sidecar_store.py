@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+from typing import Any
+from shared.config import BASIC
+from shared.metadata_codec import decode_metadata
+
+"""
+This module implements the sidecar store of an image folder.
+
+The post-download pipeline of Spider (see post_process.py) decodes every
+image once, and stores its metadata (see metadata_codec.py), thumbnail
+and hashes in a SQLite database next to the images. Scorpion and the
+viewer read those results instead of opening and decoding the files
+again.
+
+An entry is only used while the size and the modification time of its
+file are unchanged.
+"""
+
+SIDECAR_FILE = ".sidecar.db"
+# Version of the stored metadata: the entries of the other versions are
+# dropped when the store is opened
+SIDECAR_VERSION = 2
+
+
+class SidecarStore:
+    """
+    The entries are keyed by file name, the store describes the images of
+    its own folder. It can be used by several threads.
+    """
+    def __init__(self, image_folder: str):
+        self.image_folder: str = image_folder
+        self.path: str = os.path.join(image_folder, SIDECAR_FILE)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        with self.lock, self.connection:
+            version = self.connection.execute(
+                "PRAGMA user_version"
+                ).fetchone()[0]
+            if version != SIDECAR_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS images")
+                self.connection.execute(
+                    f"PRAGMA user_version = {SIDECAR_VERSION}"
+                    )
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS images (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    dhash TEXT,
+                    metadata TEXT NOT NULL,
+                    thumbnail BLOB
+                )
+                """
+                )
+
+    def put(self, file_path: str, result: dict[str, Any]) -> None:
+        """Add or replace the results of the post-processing of a file."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.basename(file_path),
+                    result["size"], result["mtime_ns"],
+                    result["sha256"], result["dhash"],
+                    result["metadata"], result["thumbnail"]
+                )
+                )
+
+    def get(self, file_path: str) -> dict[str, Any] | None:
+        """
+        Return
+        ------
+         - the entry of the file, or None if there is none or if the file
+         changed since it was processed
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM images WHERE name = ?",
+                (os.path.basename(file_path),)
+                ).fetchone()
+        if (not row or row["size"] != stat.st_size
+                or row["mtime_ns"] != stat.st_mtime_ns):
+            return None
+        return dict(row)
+
+    def get_metadata(self, file_path: str) -> dict[int, Any] | None:
+        """
+        Return
+        ------
+         - the metadata of the file, as returned by Scorpion.get_metadata
+        """
+        entry = self.get(file_path)
+        if not entry:
+            return None
+        metadata = decode_metadata(entry["metadata"])
+        metadata[BASIC]["Path"] = file_path
+        return metadata
+
+    def get_thumbnail(self, file_path: str) -> bytes | None:
+        """Return the PNG thumbnail of the file."""
+        entry = self.get(file_path)
+        return entry["thumbnail"] if entry else None
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+# Stores opened by Scorpion and the viewer, by folder
+_opened_stores: dict[str, SidecarStore | None] = {}
+
+
+def find_sidecar_store(file_path: str) -> SidecarStore | None:
+    """
+    Return
+    ------
+     - the sidecar store of the folder of the file, or None if the folder
+     has not been post-processed
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    if folder not in _opened_stores:
+        _opened_stores[folder] = \
+            SidecarStore(folder) \
+            if os.path.isfile(os.path.join(folder, SIDECAR_FILE)) else None
+    return _opened_stores[folder]
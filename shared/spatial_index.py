@@ -0,0 +1,226 @@
+import json
+import math
+from typing import Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+"""
+This module implements the geographic part of the metadata index of
+Scorpion (see metadata_index.py).
+
+Each indexed photo with a GPS position gets the geohash of its position:
+a string where each character splits the cell of the previous ones into
+32, so that the photos of a cell share the prefix of the cell and are
+found by a range scan on the index of the geohash column.
+
+A radius or bounding box query is covered by a few cells, whose photos are
+the candidates; the candidates are then filtered exactly, the distances
+being computed with NumPy for all of them at once (haversine formula).
+"""
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Precision of the stored geohashes (cells of a few centimeters)
+GEOHASH_PRECISION = 12
+# Maximum number of cells covering a query
+MAX_CELLS = 32
+
+EARTH_RADIUS = 6371008.8  # Mean radius, in meters
+# Distance to the farthest point of the Earth
+MAX_DISTANCE = math.pi * EARTH_RADIUS
+
+# A box is (south, west, north, east), in degrees
+Box = tuple[float, float, float, float]
+
+
+def encode_geohash(
+        latitude: float, longitude: float,
+        precision: int = GEOHASH_PRECISION
+        ) -> str | None:
+    """
+    Return
+    ------
+     - the geohash of the position, or None if it is not a valid position
+    """
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None  # Out of range or NaN
+
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True  # The even bits split the longitude
+    while len(geohash) < precision:
+        value, value_range = (longitude, longitude_range) if even \
+            else (latitude, latitude_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits = bits * 2
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return "".join(geohash)
+
+
+def get_cell_size(precision: int) -> tuple[float, float]:
+    """
+    Return
+    ------
+     - the height and the width of the cells of a precision, in degrees
+    """
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** (bits - bits // 2)
+
+
+def get_cell_ranges(
+        box: Box, precision: int
+        ) -> tuple[range, range]:
+    """
+    Return
+    ------
+     - the row and column numbers of the cells intersecting the box
+    """
+    south, west, north, east = box
+    height, width = get_cell_size(precision)
+    rows, columns = round(180 / height), round(360 / width)
+    return (
+        range(
+            max(0, math.floor((south + 90) / height)),
+            min(rows - 1, math.floor((north + 90) / height)) + 1
+            ),
+        range(
+            max(0, math.floor((west + 180) / width)),
+            min(columns - 1, math.floor((east + 180) / width)) + 1
+            )
+    )
+
+
+def get_covering_cells(boxes: list[Box]) -> list[str]:
+    """
+    Return
+    ------
+     - the geohashes of at most MAX_CELLS cells covering the boxes, as
+     precise as possible
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        count = 0
+        for box in boxes:
+            rows, columns = get_cell_ranges(box, precision)
+            count += len(rows) * len(columns)
+        if count <= MAX_CELLS:
+            break
+
+    height, width = get_cell_size(precision)
+    cells = set()
+    for box in boxes:
+        rows, columns = get_cell_ranges(box, precision)
+        for row in rows:
+            for column in columns:
+                # The geohash of the center of the cell
+                cells.add(encode_geohash(
+                    (row + 0.5) * height - 90, (column + 0.5) * width - 180,
+                    precision
+                    ))
+    return sorted(cell for cell in cells if cell)
+
+
+def split_box(south: float, west: float, north: float, east: float
+              ) -> list[Box]:
+    """
+    Split a box crossing the antimeridian (west > east, e.g. from 170 to
+    -170) into two boxes.
+    """
+    south, north = max(south, -90), min(north, 90)
+    if east - west >= 360:
+        return [(south, -180, north, 180)]
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180), (south, -180, north, east)]
+
+
+def get_circle_boxes(
+        latitude: float, longitude: float, radius: float
+        ) -> list[Box]:
+    """
+    Return
+    ------
+     - the boxes containing the circle (radius in meters)
+    """
+    angle = radius / EARTH_RADIUS  # In radians
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:  # The circle contains a pole
+        return [(max(south, -90), -180, min(north, 90), 180)]
+    # Widest longitude difference of the circle
+    longitude_delta = math.degrees(math.asin(
+        min(1, math.sin(angle) / math.cos(math.radians(latitude)))
+        ))
+    return split_box(
+        south, longitude - longitude_delta, north, longitude + longitude_delta
+        )
+
+
+def haversine_distances(
+        latitude: float, longitude: float,
+        latitudes: "np.ndarray", longitudes: "np.ndarray"
+        ) -> "np.ndarray":
+    """
+    Return
+    ------
+     - the distances (in meters) between the position and the positions
+     of the arrays
+    """
+    # NumPy is only loaded by the spatial queries
+    import numpy as np
+
+    latitude_1, longitude_1 = math.radians(latitude), math.radians(longitude)
+    latitudes_2, longitudes_2 = np.radians(latitudes), np.radians(longitudes)
+    a = (
+        np.sin((latitudes_2 - latitude_1) / 2) ** 2
+        + math.cos(latitude_1) * np.cos(latitudes_2)
+        * np.sin((longitudes_2 - longitude_1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def write_geojson(
+        results: list[tuple[Any, float | None]], geojson_file: str
+        ) -> None:
+    """
+    Write the rows of the index (with their distance to the queried
+    position, if any) as a GeoJSON feature collection of points.
+    """
+    features = []
+    for row, distance in results:
+        properties = {
+            key: row[key] for key in (
+                "path", "name", "format", "width", "height", "make",
+                "model", "datetime_original"
+            )
+        }
+        if distance is not None:
+            properties["distance"] = round(distance, 2)
+        has_position = row["latitude"] is not None \
+            and row["longitude"] is not None
+        features.append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [row["longitude"], row["latitude"]]
+            } if has_position else None,
+            "properties": properties
+        })
+
+    with open(geojson_file, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
@@ -0,0 +1,165 @@
+import io
+import requests
+from typing import Any
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib.parse import urlparse
+from shared.warc import WarcWriter, WarcArchive
+from shared.bandwidth import BandwidthThrottle, ThrottledReader
+
+"""
+This module creates the HTTP sessions used by the scrapers.
+
+ - Recording mode: every exchange is written into a WARC file.
+ - Replay mode: the responses are served from the recorded WARC files
+ instead of the network.
+
+The responses received from the network are read through the bandwidth
+throttle (see bandwidth.py).
+"""
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    Send the requests over the network, and pace the reading of the
+    responses with the bandwidth throttle.
+    """
+    def __init__(self, throttle: BandwidthThrottle):
+        super().__init__()
+        self.throttle: BandwidthThrottle = throttle
+
+    def build_response(self, req: Any, resp: Any) -> requests.Response:
+        response = super().build_response(req, resp)
+        response.raw = ThrottledReader(
+            resp, self.throttle, urlparse(req.url).netloc
+            )
+        return response
+
+
+class RecordingReader:
+    """
+    Wrap the raw response, so that the body is copied to the WARC file as
+    it is read by the scraper: a streamed download can still be aborted
+    after its first bytes.
+
+    The exchange is written once the body has been read, or when the
+    response is closed before its end (the record is then marked as
+    truncated).
+    """
+    def __init__(
+            self, raw: Any, writer: WarcWriter, request: Any,
+            response: requests.Response
+            ):
+        self.raw: Any = raw
+        self.writer: WarcWriter = writer
+        self.request: Any = request
+        self.response: requests.Response = response
+        self.chunks: list[bytes] = []
+        self.recorded: bool = False
+
+    def record(self, truncated: bool = False) -> None:
+        if not self.recorded:
+            self.recorded = True
+            self.writer.write_exchange(
+                self.request, self.response, b"".join(self.chunks),
+                truncated
+                )
+
+    def stream(self, amt: int = 2**16, decode_content: Any = None) -> Any:
+        for chunk in self.raw.stream(amt, decode_content=decode_content):
+            self.chunks.append(chunk)
+            yield chunk
+        self.record()
+
+    def read(
+            self, amt: int | None = None, *args: Any, **kwargs: Any
+            ) -> bytes:
+        data = self.raw.read(amt, *args, **kwargs)
+        self.chunks.append(data)
+        if not data or amt is None:
+            self.record()
+        return data
+
+    def close(self) -> None:
+        # A response without a body (e.g. 304) is complete
+        complete = self.response.status_code in (204, 304) \
+            or getattr(self.raw, "length_remaining", None) == 0
+        self.record(truncated=not complete)
+        self.raw.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+
+class RecordingAdapter(ThrottledAdapter):
+    """Send the requests over the network and record them."""
+    def __init__(self, writer: WarcWriter, throttle: BandwidthThrottle):
+        super().__init__(throttle)
+        self.writer: WarcWriter = writer
+
+    def build_response(self, req: Any, resp: Any) -> requests.Response:
+        response = super().build_response(req, resp)
+        response.raw = RecordingReader(
+            response.raw, self.writer, req, response
+            )
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serve the responses stored in a WARC archive."""
+    def __init__(self, archive: WarcArchive):
+        super().__init__()
+        self.archive: WarcArchive = archive
+
+    def send(self, request: Any, **kwargs: Any) -> requests.Response:
+        record = self.archive.get(
+            request.method, request.url, request.headers
+            )
+        if not record:
+            raise requests.exceptions.ConnectionError(
+                f"{request.url} has not been recorded.", request=request
+                )
+        status_code, reason, headers, body = record
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = reason
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def create_session(
+        record_dir: str = "", replay_dir: str = "",
+        throttle: BandwidthThrottle | None = None
+        ) -> requests.Session:
+    """
+    Create the session used for all the HTTP requests of a scraper.
+
+    Parameters:
+        record_dir: folder where the WARC files are written
+        replay_dir: folder containing the WARC files to replay
+        throttle: bandwidth limits of the network responses (not applied
+        to the replayed ones)
+    """
+    session = requests.Session()
+    throttle = throttle or BandwidthThrottle()
+
+    if replay_dir:
+        adapter: BaseAdapter = ReplayAdapter(WarcArchive(replay_dir))
+    elif record_dir:
+        adapter = RecordingAdapter(WarcWriter(record_dir), throttle)
+    else:
+        adapter = ThrottledAdapter(throttle)
+
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,323 @@
+import os
+import io
+import gzip
+import zlib
+import uuid
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+"""
+This module reads and writes WARC files (ISO 28500, WARC/1.0).
+
+Every HTTP exchange is stored as a 'request' record followed by a
+'response' record. Each record is compressed as its own gzip member, so
+that a record can be decompressed alone from its offset in the file.
+
+The bodies are stored decoded (without their Content-Encoding), as they
+were handed to the scrapers. The body of a response closed before its
+end (e.g. an aborted download) is stored as far as it was read, with a
+'WARC-Truncated' header.
+"""
+
+WARC_VERSION = b"WARC/1.0"
+WARC_EXTENSION = ".warc.gz"
+
+# Headers that describe the transfer and not the stored body
+HOP_BY_HOP_HEADERS = [
+    "content-encoding", "transfer-encoding", "content-length", "connection"
+]
+# Request headers that a partial (206) or 'Not Modified' (304) response
+# depends on
+VARIANT_HEADERS = ["range", "if-range", "if-none-match", "if-modified-since"]
+# Responses that only answer the request with the same variant headers
+VARIANT_STATUS_CODES = [206, 304]
+
+
+def format_http_headers(start_line: str, headers: Any) -> bytes:
+    lines = [start_line]
+    for name, value in headers.items():
+        lines.append(f"{name}: {value}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "replace")
+
+
+def parse_http_headers(data: bytes) -> tuple[str, list[tuple[str, str]]]:
+    """
+    Parse a header block.
+
+    Return
+    ------
+     - the start line and the list of (name, value) pairs
+    """
+    lines = data.decode("latin-1").split("\r\n")
+    headers = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers.append((name.strip(), value.strip()))
+    return lines[0], headers
+
+
+def get_request_variant(headers: Any) -> str:
+    """
+    Return
+    ------
+     - the Range and conditional headers of a request (a list of (name,
+     value) pairs or a dict), as a string: empty if there is none
+    """
+    items = headers.items() if hasattr(headers, "items") else headers
+    return "\n".join(sorted(
+        f"{name.lower()}: {value}" for name, value in items
+        if name.lower() in VARIANT_HEADERS
+        ))
+
+
+class WarcWriter:
+    """
+    Append HTTP exchanges to a WARC file.
+
+    The writer is thread-safe, each exchange is written in one go.
+    """
+    def __init__(self, folder: str):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        self.path: str = os.path.join(
+            folder, f"crawl-{timestamp}-{os.getpid()}{WARC_EXTENSION}"
+            )
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def build_record(
+            record_type: str, url: str, block: bytes,
+            extra_headers: dict[str, str] | None = None
+            ) -> tuple[str, bytes]:
+        """
+        Return
+        ------
+         - the record ID and the gzip-compressed record
+        """
+        record_id = f"<urn:uuid:{uuid.uuid4()}>"
+        msgtype = "request" if record_type == "request" else "response"
+        headers = {
+            "WARC-Type": record_type,
+            "WARC-Record-ID": record_id,
+            "WARC-Date": datetime.now(timezone.utc).strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+                ),
+            "WARC-Target-URI": url,
+            "Content-Type": f"application/http; msgtype={msgtype}",
+        }
+        if extra_headers:
+            headers.update(extra_headers)
+        headers["Content-Length"] = str(len(block))
+
+        record = format_http_headers(WARC_VERSION.decode(), headers) \
+            + block + b"\r\n\r\n"
+        return record_id, gzip.compress(record)
+
+    def write_exchange(
+            self, request: Any, response: Any, body: bytes,
+            truncated: bool = False
+            ) -> None:
+        """
+        Write the request and its response with the given body. A
+        truncated body is the beginning of the body of the response.
+        """
+        path = request.path_url
+        request_block = format_http_headers(
+            f"{request.method} {path} HTTP/1.1", request.headers
+            )
+        if isinstance(request.body, bytes):
+            request_block += request.body
+        elif isinstance(request.body, str):
+            request_block += request.body.encode()
+
+        response_headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        response_headers["Content-Length"] = str(len(body))
+        response_block = format_http_headers(
+            f"HTTP/1.1 {response.status_code} {response.reason or ''}",
+            response_headers
+            ) + body
+
+        request_id, request_record = \
+            self.build_record("request", request.url, request_block)
+        response_warc_headers = {"WARC-Concurrent-To": request_id}
+        if truncated:
+            response_warc_headers["WARC-Truncated"] = "unspecified"
+        _, response_record = self.build_record(
+            "response", request.url, response_block, response_warc_headers
+            )
+
+        with self.lock:
+            with open(self.path, "ab") as f:
+                f.write(request_record)
+                f.write(response_record)
+
+
+def iter_gzip_members(
+        f: io.BufferedReader) -> Iterator[tuple[int, int, bytes]]:
+    """
+    Decompress the gzip members of a file one by one.
+
+    Yield
+    -----
+     - the offset and the compressed length of the member, and its data
+    """
+    offset = 0
+    buffer = b""
+    while True:
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        start = offset
+        chunks = []
+        while not decompressor.eof:
+            if not buffer:
+                buffer = f.read(65536)
+                if not buffer:  # End of file (or truncated member)
+                    return
+            chunks.append(decompressor.decompress(buffer))
+            if decompressor.eof:
+                offset += len(buffer) - len(decompressor.unused_data)
+                buffer = decompressor.unused_data
+            else:
+                offset += len(buffer)
+                buffer = b""
+        yield start, offset - start, b"".join(chunks)
+
+
+def parse_record(data: bytes) -> tuple[dict[str, str], bytes]:
+    """
+    Return
+    ------
+     - the WARC headers and the block of a record
+    """
+    header_end = data.index(b"\r\n\r\n")
+    _, headers = parse_http_headers(data[:header_end + 4])
+    warc_headers = {name: value for name, value in headers}
+    length = int(warc_headers.get("Content-Length", 0))
+    block = data[header_end + 4:header_end + 4 + length]
+    return warc_headers, block
+
+
+def parse_http_response(
+        block: bytes) -> tuple[int, str, list[tuple[str, str]], bytes]:
+    """
+    Return
+    ------
+     - the status code, the reason, the headers and the body of
+     an 'application/http; msgtype=response' block
+    """
+    header_end = block.index(b"\r\n\r\n")
+    status_line, headers = parse_http_headers(block[:header_end + 4])
+    parts = status_line.split(" ", 2)
+    status_code = int(parts[1])
+    reason = parts[2] if len(parts) > 2 else ""
+    return status_code, reason, headers, block[header_end + 4:]
+
+
+class WarcArchive:
+    """
+    Index the response records of all the WARC files of a folder.
+
+    The index is built once, then each record is read and decompressed
+    from its offset only when it is requested.
+
+    The partial (206) and 'Not Modified' (304) responses are only served
+    to the requests with the same Range and conditional headers. The last
+    complete response of a URL answers the other requests: a truncated
+    response (aborted download) is only used if there is none.
+    """
+    def __init__(self, folder: str):
+        self.folder: str = folder
+        # Key: (HTTP method, URL, variant headers of the request, empty
+        # except for the 206 and 304 responses)
+        # Value: (WARC file path, record offset, record length)
+        self.index: dict[tuple[str, str, str], tuple[str, int, int]] = {}
+        # Keys of the truncated responses
+        self.truncated: set[tuple[str, str, str]] = set()
+
+        if not os.path.isdir(folder):
+            raise ValueError(f"{folder} is not a valid directory.")
+
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(WARC_EXTENSION):
+                self.index_file(os.path.join(folder, filename))
+
+    def index_file(self, path: str) -> None:
+        # Key: request record ID, value: HTTP method and variant headers
+        request_records: dict[str, tuple[str, str]] = {}
+
+        with open(path, "rb") as f:
+            for offset, length, data in iter_gzip_members(f):
+                try:
+                    warc_headers, block = parse_record(data)
+                except ValueError:
+                    continue
+                record_type = warc_headers.get("WARC-Type")
+                url = warc_headers.get("WARC-Target-URI", "")
+
+                if record_type == "request":
+                    start_line, headers = parse_http_headers(block)
+                    request_id = warc_headers.get("WARC-Record-ID", "")
+                    request_records[request_id] = (
+                        start_line.split(" ", 1)[0],
+                        get_request_variant(headers)
+                    )
+                elif record_type == "response":
+                    try:
+                        status_code = parse_http_response(block)[0]
+                    except (ValueError, IndexError):
+                        continue
+                    method, variant = request_records.get(
+                        warc_headers.get("WARC-Concurrent-To", ""),
+                        ("GET", "")
+                        )
+                    if status_code not in VARIANT_STATUS_CODES:
+                        variant = ""
+                    key = (method, url, variant)
+                    truncated = "WARC-Truncated" in warc_headers
+                    if (truncated and key in self.index
+                            and key not in self.truncated):
+                        continue
+                    # Otherwise the last record of a URL wins
+                    self.index[key] = (path, offset, length)
+                    if truncated:
+                        self.truncated.add(key)
+                    else:
+                        self.truncated.discard(key)
+
+    def get(
+            self, method: str, url: str, headers: Any = None
+            ) -> tuple[int, str, list[tuple[str, str]], bytes] | None:
+        """
+        Return
+        ------
+         - the status code, the reason, the headers and the body of the
+         stored response to the request, or None if the URL has not been
+         recorded
+        """
+        variant = get_request_variant(headers) if headers else ""
+        location = self.index.get((method, url, variant)) if variant \
+            else None
+        if not location:
+            location = self.index.get((method, url, ""))
+        # The headers of a GET response can answer a HEAD request
+        if not location and method == "HEAD":
+            location = self.index.get(("GET", url, ""))
+        if not location:
+            return None
+
+        path, offset, length = location
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = gzip.decompress(f.read(length))
+        _, block = parse_record(data)
+        status_code, reason, headers, body = parse_http_response(block)
+        if method == "HEAD":
+            body = b""
+        return status_code, reason, headers, body
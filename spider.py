@@ -1,18 +1,48 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import sys
-import requests
+import hashlib
+import threading
+from contextlib import nullcontext
+from typing import BinaryIO, TYPE_CHECKING
 from argparse import ArgumentParser, Namespace
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 from shared.ascii_format import (
         GREEN, INFO, RESET, WARNING, DONE, ERROR, FOUND
     )
 from shared.open_files import open_folder_in_explorer
-from shared.config import IMAGE_EXTENSIONS, SCRAPTYPE_IMG, HEADER
+from shared.config import (
+        SKIPPED_EXTENSIONS, SCRAPTYPE_IMG, HEADER, EXIF,
+        DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT
+    )
 from shared.humanize_scraping import sleep_for_random_secs
-from shared.scrape import Scraper
+from shared.crawl_state import CrawlState
+from shared.bandwidth import BandwidthThrottle
+from shared.download_pool import DownloadPool
+from shared.byte_budget import ByteBudget, BudgetExceeded
+from shared.image_store import ContentStore
+from shared.download_manifest import DownloadManifest
+from shared.partial_download import (
+    PartialDownload, RangeNotSatisfiable, get_part_path, PARTS_FOLDER
+    )
+from shared.image_probe import (
+        ImageFilter, ImageRejected, probe_image, get_image_name,
+        PROBE_SIZE, PROBE_MAX, SIGNATURE_SIZE
+    )
+from shared.shard_store import ShardWriter
+from shared.metadata_search import MetadataSearch
+from shared.perceptual_hash import (
+        NearDuplicateIndex, ImageVariant, KEEP_FIRST, KEEP_LARGEST
+    )
+
+# requests, BeautifulSoup, Scorpion and the post-download pipeline (Pillow)
+# are only loaded on the code paths that use them, not for the help or the
+# usage errors
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from shared.post_process import PostProcessor
 
 """
 This module implements a web image scraper that recursively searches
@@ -32,6 +62,7 @@ class Spider:
         verbose: bool,
         base_url: str,
         recursive: bool,
+        *,  # The options are passed by keyword
         recurse_depth: int = 5,
         ko_limit: int = 50,  # Accepted consecutive bad links
         image_storage_folder: str = image_storage_folder,
@@ -40,7 +71,25 @@ class Spider:
         open_folder: bool = False,  # Open img folder at the end
         memory_limit: int = 1000,  # In MB
         sleep: bool = False,
-        max_sleep: int = 3
+        max_sleep: int = 3,
+        state_file: str = "",  # Incremental recrawl state file
+        record_dir: str = "",  # Folder where the WARC files are written
+        replay_dir: str = "",  # Folder of the WARC files to replay
+        image_workers: int = 4,  # Concurrent image downloads
+        queue_size: int = 0,  # Max pending downloads (default: 4 per worker)
+        content_addressed: bool = False,  # Store each image content once
+        revalidate: bool = False,  # Check if downloaded images changed
+        retries: int = 2,  # Attempts to resume a failed download
+        domain_memory_limit: int = 0,  # In MB, per domain (0: no limit)
+        page_memory_limit: int = 0,  # In MB, per page (0: no limit)
+        image_filter: ImageFilter | None = None,  # Checked on the headers
+        duplicate_threshold: int = -1,  # Max hash distance (-1: disabled)
+        keep: str = KEEP_FIRST,  # Near-duplicate variant to keep
+        post_process_workers: int = -1,  # Processes (0: all cores, -1: off)
+        exif_search: str = "",  # Only save the images with it in their EXIF
+        shard_size: int = 0,  # In MB, append the images to tar shards
+        rate_limit: int = 0,  # In KB/s, for all the hosts (0: no limit)
+        host_rate_limit: int = 0  # In KB/s, per host (0: no limit)
             ):
 
         self.verbose: bool = verbose
@@ -60,15 +109,34 @@ class Spider:
 
         self.visited_urls: list[str] = []
         self.found_links: list[str] = []
+        self.found_urls: set[str] = set()  # Fast lookup of found_links
         self.found_count: int = 0
         self.ko_count: int = 0
-        self.memory_count: int = 0
+
+        # The pages are crawled by the main thread while the images are
+        # downloaded by a pool of workers, fed through a bounded queue.
+        self.image_workers: int = image_workers
+        self.queue_size: int = queue_size
+        self.download_pool: DownloadPool | None = None
 
         # Dict containing:
         # Key: the link
         # Value: texts surrounding the search strings found inside the link
         self.results: dict[str, list] = {}
 
+        # Bandwidth limits of the received bytes, converted to bytes/s
+        self.throttle = BandwidthThrottle(
+            int(rate_limit * 1000), int(host_rate_limit * 1000)
+            )
+
+        # HTTP session, it records or replays the exchanges if asked
+        from shared.transport import create_session
+        self.session = create_session(record_dir, replay_dir, self.throttle)
+
+        # Incremental recrawl mode
+        self.crawl_state: CrawlState | None = \
+            CrawlState(state_file) if state_file else None
+
         # Check if the folder exists
         if not os.path.exists(image_storage_folder):
             # Create the image folder if it doesn't exist
@@ -79,93 +147,460 @@ class Spider:
                     f"'{image_storage_folder}'"
                     )
 
-    def get_image_size(self, img_url: str) -> int | None:
-        """
-        Make a HEAD request to retrieve the 'Content-Length'
-        value that expresses the file size value.
+        # Content-addressed storage mode
+        self.content_store: ContentStore | None = \
+            ContentStore(image_storage_folder) if content_addressed else None
 
-        Return
-        ------
-         - file size (int) or None if not found
-        """
-        try:
-            # A HEAD request retrieves the headers of the resource
-            # without downloading the body.
-            response = requests.head(img_url, headers=HEADER)
-            if response.status_code == 200:
-                file_size = response.headers.get('Content-Length')
-                if file_size:
-                    # Convert string to int, divide to convert bytes to MB
-                    return int(file_size)
-                else:
-                    if self.verbose:
-                        print(
-                            f"{WARNING} Content-Length header not "
-                            f"found for {img_url}."
-                            )
-                    return None
-            else:  # If HEAD request fails
-                print(
-                    f"{ERROR} Failed to retrieve headers "
-                    f"for {img_url}: {response.status_code}"
-                    )
-                return None
-        except Exception as e:
+        # Shard output mode: the images are appended to size-capped tar
+        # files instead of being written as separate files
+        self.shard_writer: ShardWriter | None = \
+            ShardWriter(image_storage_folder, int(shard_size * 1000000)) \
+            if shard_size else None
+
+        # Key: the path of an image, value: the URL saved to it. Two URLs
+        # with the same file name (e.g. '/w_300/photo.jpg' and
+        # '/w_1200/photo.jpg') are saved to different paths.
+        self.path_owners: dict[str, str] = {}
+        self.path_lock = threading.Lock()
+
+        # The images downloaded during the previous runs are skipped,
+        # or revalidated with conditional requests
+        self.manifest = DownloadManifest(image_storage_folder)
+        self.revalidate: bool = revalidate
+        self.retries: int = retries
+
+        # The images are filtered on their header (format, dimensions,
+        # EXIF), read from the first bytes of the download
+        self.image_filter: ImageFilter = image_filter or ImageFilter()
+
+        # Only one variant of the near-duplicate images is kept
+        self.duplicate_index: NearDuplicateIndex | None = \
+            NearDuplicateIndex(duplicate_threshold, keep) \
+            if duplicate_threshold >= 0 else None
+
+        # The downloaded images are decoded by a pool of processes, which
+        # store their metadata, thumbnails and hashes for Scorpion
+        self.post_process_workers: int = post_process_workers
+        self.post_processor: "PostProcessor | None" = None
+
+        # EXIF search mode: the images are kept in memory until their
+        # metadata have been searched, so the ones that don't match are
+        # never written
+        self.exif_search: str = exif_search
+        self.exif_searcher = MetadataSearch(exif_search, case_insensitive)
+        if exif_search:
+            # The images without EXIF are aborted after their header
+            self.image_filter.require_exif = True
+        # Key: the image URL
+        # Value: the EXIF tags (name -> value) containing the search string
+        self.exif_results: dict[str, dict[str, str]] = {}
+        self.exif_lock = threading.Lock()
+
+        # Bytes reserved by the downloads, shared by the download workers.
+        # The images already in the folder count against the memory limit.
+        self.budget = ByteBudget(
+            self.memory_limit,
+            int(domain_memory_limit * 1000000),
+            int(page_memory_limit * 1000000),
+            self.manifest.get_used_memory()
+            )
+        if self.verbose and self.budget.used:
             print(
-                f"{ERROR} An error occurred while checking "
-                f"size for {img_url}: {e}"
+                f"{INFO} Images already downloaded: "
+                f"{self.budget.used:,} bytes"
                 )
-            return None
 
     def download_image(
-            self, img_url: str, img_path: str, img_name: str) -> None:
-        # Try to get the image size with a HEAD request
-        filesize = self.get_image_size(img_url)
+            self, img_url: str, img_path: str, img_name: str,
+            page_url: str = ""
+            ) -> None:
+        """
+        Download the image with a single streamed GET request.
+
+        The size announced by 'Content-Length' is reserved before anything
+        is written, and every chunk going beyond the reservation has to fit
+        in the byte budget (global, domain and page limits): the download
+        is aborted as soon as it doesn't.
+        The chunks are written straight to a '.part' file named after the
+        URL, which is renamed once complete. If the download fails, the
+        '.part' file is kept and the next attempt only requests the
+        remaining bytes.
+
+        In content-addressed mode, the image is then moved to the store.
+        If the same content is already stored, its bytes are refunded.
+
+        If the image has been downloaded during a previous run, the request
+        is conditional and nothing is downloaded if it didn't change.
+
+        The first chunks are probed before being written: the download is
+        aborted as soon as the header shows that the content is not an
+        image, or that the image doesn't match the filter. The file is
+        named after the real format of the image.
+        """
+        known = self.manifest.get(img_url)
+        headers = dict(HEADER)
+        if known:
+            headers.update(self.manifest.get_conditional_headers(known))
+
+        store = self.content_store
+        budget = self.budget
+        domain = urlparse(img_url).netloc
+        # Where the chunks are written
+        part = PartialDownload(
+            store.get_temp_path(img_url) if store
+            else get_part_path(
+                os.path.join(self.image_storage_folder, PARTS_FOLDER),
+                img_url
+                ),
+            img_url
+            )
+        in_memory = bool(self.exif_search)
+        if in_memory:
+            # Nothing is written before the search, so there is nothing
+            # to resume
+            part.discard()
+        headers.update(part.get_range_headers())
+        digest = hashlib.sha256()
+        # First bytes of the image, kept until its format is known and
+        # the filter decides
+        probing = True
+        head = b""
+        image_format = None
 
         if self.verbose:
             print(f"{INFO} Downloading '{img_name}'...")
 
-        img_response = requests.get(img_url, headers=HEADER)
-        # Check for request errors
-        img_response.raise_for_status()
+        with self.session.get(
+                img_url, headers=headers, stream=True,
+                timeout=DOWNLOAD_TIMEOUT) as img_response:
+            if img_response.status_code == 416:  # Range Not Satisfiable
+                part.discard()
+                raise RangeNotSatisfiable(
+                    f"416 Range Not Satisfiable for url: {img_url}"
+                    )
+            # Check for request errors
+            img_response.raise_for_status()
+
+            if known and img_response.status_code == 304:  # Not Modified
+                self.manifest.touch(img_url)
+                if self.verbose:
+                    print(f"{INFO} '{img_name}' did not change.")
+                return
+            response_headers = img_response.headers
 
-        if not filesize:
-            """
-            Now if file size couldn't be accessed from the earlier
-            HEAD request, we want to check the file size from the
-            file that has been download.
-            """
-            # Get the size of the image in byte then convert to MB
-            filesize = int(len(img_response.content))
+            if part.start(img_response) and self.verbose:
+                print(
+                    f"{INFO} Resuming '{img_name}' "
+                    f"from byte {part.offset:,}"
+                    )
+
+            content_length = img_response.headers.get('Content-Length', '')
+            reserved = int(content_length) if content_length.isdigit() else 0
+            # The bytes already downloaded count too
+            reserved += part.offset
+            try:
+                budget.reserve(reserved, domain, page_url)
+            except BudgetExceeded:
+                part.discard()
+                raise
+
+            filesize = part.offset
+            try:
+                if filesize:
+                    for chunk in part.read_chunks(DOWNLOAD_CHUNK_SIZE):
+                        digest.update(chunk)
+                        if probing and len(head) < PROBE_MAX:
+                            head += chunk
+                # Smaller chunks if the dimensions or metadata are filtered,
+                # to abort early. The format only needs the first bytes.
+                chunk_size = PROBE_SIZE if self.image_filter.is_active() \
+                    else DOWNLOAD_CHUNK_SIZE
+                buffer = io.BytesIO()
+                with (nullcontext(buffer) if in_memory else part.open()) as f:
+                    for chunk in img_response.iter_content(chunk_size):
+                        if probing:
+                            head += chunk
+                            image_format = self.check_header(head)
+                            probing = not image_format
+                        # The body can be longer than announced
+                        # (e.g. compressed transfer, missing header)
+                        extra = filesize + len(chunk) - reserved
+                        if extra > 0:
+                            budget.reserve(extra, domain, page_url)
+                            reserved += extra
+                        f.write(chunk)
+                        filesize += len(chunk)
+                        digest.update(chunk)
+                # The whole image is shorter than the probed size
+                if probing:
+                    image_format = self.check_header(head, complete=True)
+
+                if in_memory:
+                    # Search the metadata, then write the matching image
+                    buffer.seek(0)
+                    self.search_exif(img_url, img_name, buffer)
+                    with part.open() as f:
+                        f.write(buffer.getbuffer())
+            except BaseException as e:
+                budget.refund(reserved, domain, page_url)
+                if isinstance(e, (BudgetExceeded, ImageRejected)):
+                    # The image is not wanted, it won't be resumed
+                    part.discard()
+                # Otherwise the '.part' file is kept to resume the download
+                raise
+
+        # The body can be shorter than announced
+        budget.refund(reserved - filesize, domain, page_url)
+
+        # Name the file after its real format
+        real_name = get_image_name(img_name, image_format)
+        if real_name != img_name:
+            if self.verbose:
+                print(
+                    f"{INFO} '{img_name}' is a {image_format} image, "
+                    f"saved as '{real_name}'"
+                    )
+            img_path = os.path.join(os.path.dirname(img_path), real_name)
+            if not store:
+                img_path = self.claim_image_path(img_url, img_path)
+            img_name = os.path.basename(img_path)
+
+        duplicate = False
+        if store:
+            img_path, duplicate = store.commit(
+                part.part_path, digest.hexdigest(), img_name
+                )
+            part.finish()
+            if duplicate:
+                # The content was already stored: it takes no more space
+                budget.refund(filesize, domain, page_url)
+                if self.verbose:
+                    print(
+                        f"{INFO} '{img_name}' is already stored as "
+                        f"{digest.hexdigest()}"
+                        )
+        elif self.shard_writer:
+            img_path = self.shard_writer.add(
+                part.part_path, img_name, digest.hexdigest()
+                )
+            part.finish()
+        else:
+            part.finish(img_path)
+            if known and known["path"] == img_path:
+                # The previous version of the image has been overwritten
+                budget.refund(known["size"])
+
+        variant = ImageVariant(img_url, img_path, filesize, digest.hexdigest())
+        if self.duplicate_index and not duplicate:
+            variant = self.suppress_near_duplicate(variant, domain, page_url)
+
+        self.manifest.record(
+            img_url, response_headers,
+            variant.size, variant.digest, variant.path
+            )
+
+        # Unless the image has just been deleted as a near-duplicate
+        if self.post_processor and variant.path == img_path:
+            self.post_processor.submit(img_path)
 
         if self.verbose:
             print(f"{INFO} Image file size: {filesize:,} bytes")
+            print(f"{DONE} Downloaded '{img_name}'")
+
+    def suppress_near_duplicate(
+            self, variant: ImageVariant, domain: str, page_url: str
+            ) -> ImageVariant:
+        """
+        Keep a single variant of the near-duplicate images: the first one
+        downloaded, or the one with the most pixels. The other variant is
+        deleted and its bytes are refunded.
 
-        # Quit the program if the memory limit has been reached
-        self.memory_count += filesize  # Update the used memory size.
-        if self.memory_count >= self.memory_limit:
-            print(f"{ERROR} Memory limit has been reached.")
-            print("Exiting...")
-            self.print_result()
-            sys.exit()
+        Return
+        ------
+         - the kept variant, which the URL of the image is recorded to
+        """
+        index = self.duplicate_index
+        cluster, dropped = index.add(variant)
+        if not cluster or not dropped:
+            return variant
+
+        if dropped.path == cluster.kept.path:
+            # The variants were saved to the same file, which is kept
+            freed = False
+        elif self.content_store:
+            freed = self.content_store.remove(dropped.path, dropped.digest)
+        else:
+            os.remove(dropped.path)
+            freed = True
+        if freed:
+            if dropped is variant:
+                self.budget.refund(dropped.size, domain, page_url)
+            else:
+                self.budget.refund(dropped.size)
+
+        if dropped is not variant:
+            # The URLs already recorded to the deleted variant
+            self.manifest.replace_path(
+                dropped.path, variant.path, variant.size, variant.digest
+                )
+        if self.verbose and dropped.path != cluster.kept.path:
+            print(
+                f"{INFO} '{os.path.basename(dropped.path)}' is a "
+                f"near-duplicate of '{os.path.basename(cluster.kept.path)}'"
+                f", deleted"
+                )
+        return cluster.kept
+
+    def print_duplicate_clusters(self) -> None:
+        """Print the URLs of the near-duplicate images, by kept image."""
+        clusters = self.duplicate_index.get_duplicate_clusters()
+        if not clusters:
+            return
+        print(f"\n{INFO} Near-duplicate images:")
+        for cluster in clusters:
+            print(f"{GREEN}{cluster.kept.path}{RESET}")
+            for url in cluster.urls:
+                kept_mark = " (kept)" if url == cluster.kept.url else ""
+                print(f"  > {url}{kept_mark}")
+
+    def search_exif(
+            self, img_url: str, img_name: str, data: BinaryIO
+            ) -> None:
+        """
+        Search the EXIF values of the downloaded image for the EXIF search
+        string, and record the matching tags.
+
+        Raises:
+            ImageRejected: if the string is not found
+        """
+        from scorpion import Scorpion
+        metadata = Scorpion().get_metadata_from_bytes(data, img_name, img_url)
+        matches = {
+            hit.tag: hit.value for hit in
+            self.exif_searcher.search(img_url, {EXIF: metadata[EXIF]})
+        }
+        if not matches:
+            raise ImageRejected(
+                f"'{self.exif_search}' not found in the EXIF metadata"
+                )
 
-        with open(img_path, 'wb') as f:
-            f.write(img_response.content)
+        with self.exif_lock:
+            self.exif_results[img_url] = matches
         if self.verbose:
-            print(f"{DONE} Downloaded '{img_name}'")
+            for tag_name, value in matches.items():
+                print(f"{FOUND} '{img_name}': {tag_name}: {value}")
+
+    def print_exif_results(self) -> None:
+        if self.verbose:
+            print("\n============= Found EXIF search string in the images:")
+        for img_url, matches in self.exif_results.items():
+            for tag_name, value in matches.items():
+                print(f"{GREEN}{img_url}{RESET} - {tag_name} - {value}")
+        if self.verbose:
+            print("============= Occurence:")
+        print(len(self.exif_results))
+
+    def check_header(self, head: bytes, complete: bool = False) -> str:
+        """
+        Check the header of the image being downloaded against the filter.
+
+        Raises:
+            ImageRejected: if the content is not a handled image, or if it
+            doesn't match the filter
+
+        Return
+        ------
+         - an empty string if more bytes are needed to decide, otherwise
+         the format of the image
+        """
+        if not complete and len(head) < SIGNATURE_SIZE:
+            return ""
+        info = probe_image(head)
+        if (not complete and len(head) < PROBE_MAX
+                and not self.image_filter.is_complete(info)):
+            return ""
+        reason = self.image_filter.check(info)
+        if reason:
+            raise ImageRejected(reason)
+        return info["format"]
 
-    def find_images(self, url: str) -> None:
+    def download_image_job(
+            self, img_url: str, img_path: str, img_name: str,
+            page_url: str = ""
+            ) -> None:
+        """
+        Download an image, then wait if the sleep mode is on.
+        Network failures are retried, resuming the partial download.
+        A refused range restarts the whole download once.
+        """
+        import requests
+
+        # The memory limit has been reached, the program is stopping
+        if self.budget.stopping:
+            return
+
+        attempt = 0
+        restarted = False
+        while True:
+            try:
+                self.download_image(img_url, img_path, img_name, page_url)
+                break
+            except RangeNotSatisfiable:
+                # The '.part' file has been discarded
+                if restarted:
+                    raise
+                restarted = True
+                if self.verbose:
+                    print(
+                        f"{INFO} Range of '{img_name}' refused, "
+                        "downloading the whole image..."
+                        )
+            except BudgetExceeded as e:
+                # The global limit is reported once the crawl stops
+                if self.verbose and not self.budget.stopping:
+                    print(f"{WARNING} Skipped '{img_name}': {e}")
+                return
+            except ImageRejected as e:
+                if self.verbose:
+                    print(f"{INFO} Filtered out '{img_name}': {e}")
+                return
+            except (
+                    requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError
+                    ) as e:
+                if attempt == self.retries:
+                    raise
+                attempt += 1
+                print(
+                    f"{WARNING} Download of '{img_name}' failed "
+                    f"({e}), retrying..."
+                    )
+        # Mimic human-like behavior
+        if self.sleep:
+            sleep_for_random_secs(max_sec=self.max_sleep)
+
+    def find_images(
+            self, url: str, soup: "BeautifulSoup | None" = None
+            ) -> list[str]:
         """Get the images in the content of the given URL and save
-        them all"""
+        them all
+
+        Return
+        ------
+         - the URLs of the images of the page that match the search string
+        """
+        page_hits: list[str] = []
 
         try:
-            # Send a GET request to the URL
-            response = requests.get(url, headers=HEADER)
-            # Raise an error for bad responses
-            response.raise_for_status()
+            if soup is None:
+                # Send a GET request to the URL
+                response = self.session.get(url, headers=HEADER)
+                # Raise an error for bad responses
+                response.raise_for_status()
 
-            # Parse the HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
+                # Parse the HTML content
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(response.text, 'html.parser')
 
             # Find all image tags
             img_tags = soup.find_all('img')
@@ -182,10 +617,13 @@ class Spider:
                 # Create a full URL if the img_url is relative
                 img_url = urljoin(url, img_url)
 
-                # Check if the file extension is handled
-                img_name = os.path.basename(img_url)
+                # The format is detected from the content during the
+                # download, so only the extensions of the other file
+                # types are skipped (e.g. '/img?id=123' is accepted)
+                img_name = self.get_image_name(img_url)
                 _, img_extension = os.path.splitext(img_name)
-                if img_extension.lower() not in IMAGE_EXTENSIONS:
+                if (img_extension.lower() in SKIPPED_EXTENSIONS
+                        or img_url.startswith('data:')):
                     continue
 
                 # Get the path where to save the image by joining the target
@@ -208,9 +646,13 @@ class Spider:
                         # ...or search string mode is off
                         or not self.search_string):
 
+                    if img_url not in page_hits:
+                        page_hits.append(img_url)
+
                     # If the image hasn't been downloaded yet
-                    if img_url not in self.found_links:
+                    if img_url not in self.found_urls:
                         self.found_links.append(img_url)
+                        self.found_urls.add(img_url)
                         self.found_count += 1  # Increment counter
 
                         if self.search_string:
@@ -220,13 +662,102 @@ class Spider:
                                     f"'{self.search_string}'."
                                     )
 
-                        # Download the image
-                        self.download_image(img_url, img_path, img_name)
-                        # Mimic human-like behavior
-                        if self.sleep:
-                            sleep_for_random_secs(max_sec=self.max_sleep)
+                        # Downloaded during a previous run
+                        if (not self.revalidate
+                                and self.manifest.get(img_url)):
+                            if self.verbose:
+                                print(
+                                    f"{INFO} Already downloaded: "
+                                    f"'{img_name}'"
+                                    )
+                            continue
+
+                        # Not in the content store, where the names are
+                        # made unique by the links
+                        if not self.content_store:
+                            img_path = self.claim_image_path(
+                                img_url, img_path
+                                )
+                            img_name = os.path.basename(img_path)
+
+                        # The memory limit has been reached: stop the crawl,
+                        # the downloads in progress are finished by run()
+                        if self.budget.stopping:
+                            sys.exit()
+
+                        if not self.download_pool:
+                            self.download_image_job(
+                                img_url, img_path, img_name, url
+                                )
+                            continue
+
+                        # Queue the download, wait if the queue is full
+                        self.download_pool.submit(
+                            img_url, img_path, img_name, url
+                            )
         except Exception as e:
             print(f"{ERROR} {e}")
+        return page_hits
+
+    @staticmethod
+    def get_image_name(img_url: str) -> str:
+        """
+        Return
+        ------
+         - the file name of the image URL. If the URL has a query string,
+         a hash of the URL is added so that '/img?id=1' and '/img?id=2'
+         are saved as different files.
+        """
+        parsed_url = urlparse(img_url)
+        img_name = os.path.basename(parsed_url.path) or "image"
+        if parsed_url.query:
+            img_name = Spider.add_url_hash(img_name, img_url)
+        return img_name
+
+    @staticmethod
+    def add_url_hash(img_name: str, img_url: str) -> str:
+        """
+        Return
+        ------
+         - the file name with a hash of the URL (e.g. 'photo-1a2b3c4d.jpg')
+        """
+        stem, extension = os.path.splitext(img_name)
+        url_hash = hashlib.sha256(img_url.encode()).hexdigest()[:8]
+        return f"{stem}-{url_hash}{extension}"
+
+    def claim_image_path(self, img_url: str, img_path: str) -> str:
+        """
+        Reserve the path of the image for its URL, so that the downloads
+        of two URLs never write to the same file.
+
+        Return
+        ------
+         - the path, or the path with a hash of the URL if the path is
+         used by another URL, in this run or in a previous one
+        """
+        with self.path_lock:
+            owner = self.path_owners.get(img_path)
+            if owner is None:
+                urls = self.manifest.get_urls(img_path)
+                owner = img_url if not urls or img_url in urls else urls[0]
+            if owner != img_url:
+                img_path = os.path.join(
+                    os.path.dirname(img_path),
+                    self.add_url_hash(os.path.basename(img_path), img_url)
+                    )
+            self.path_owners[img_path] = img_url
+        return img_path
+
+    def reuse_hits(self, url: str, hits: list[str]) -> None:
+        """
+        Add the images found on an unchanged page during the previous run.
+        They are already in the image folder so they are not downloaded.
+        """
+        for img_url in hits:
+            if img_url not in self.found_urls:
+                self.found_links.append(img_url)
+                self.found_urls.add(img_url)
+                self.found_count += 1
 
     def print_result(self) -> None:
         if self.verbose:
@@ -241,23 +772,69 @@ class Spider:
         print(self.found_count)
 
     def run(self) -> None:
+        self.download_pool = DownloadPool(
+            self.download_image_job, self.image_workers, self.queue_size
+            )
+        if self.post_process_workers >= 0:
+            from shared.post_process import PostProcessor
+            self.post_processor = PostProcessor(
+                self.image_storage_folder, self.post_process_workers
+                )
+        interrupted = False
+
+        from shared.scrape import Scraper
+
         try:
+            scraper = Scraper(SCRAPTYPE_IMG, self, self.base_url)
             if self.recurse_depth == 1:
-                self.find_images(self.base_url)
+                scraper.visit(self.base_url)
             # Recursively loop only if the depth is > 1
             elif self.recurse_depth > 1:
-                scraper = Scraper(SCRAPTYPE_IMG, self, self.base_url)
                 scraper.scrape()
         except KeyboardInterrupt:
             print("\nExiting...")
+            interrupted = True
         finally:
+            # Wait for the queued downloads, unless the program is stopping.
+            # The downloads in progress are finished in any case.
+            stopping = interrupted or self.budget.stopping
+            self.download_pool.close(wait=not stopping)
+            self.download_pool = None
+            if self.post_processor:
+                self.post_processor.close(wait=not stopping)
+                self.post_processor = None
+            if self.shard_writer:
+                self.shard_writer.close()
+
+            if self.budget.stopping:
+                print(f"{ERROR} Memory limit has been reached.")
+                print("Exiting...")
+
             """
             If the string search mode is on, print the URLs of the
             images containing the search string in its 'alt' value
             """
-            if self.search_string:
+            if self.search_string or self.budget.stopping:
                 self.print_result()
 
+            if self.duplicate_index:
+                self.print_duplicate_clusters()
+
+            if self.exif_search:
+                self.print_exif_results()
+
+            # Actual throughput of the run
+            if (self.verbose or self.throttle.rate
+                    or self.throttle.host_rate):
+                self.throttle.print_metrics(self.verbose)
+
+            # Report the changes since the previous run and save the state
+            if self.crawl_state:
+                self.crawl_state.print_diff(
+                    self.search_string or "", self.verbose
+                    )
+                self.crawl_state.save()
+
             # Open the image folder only if at least one img has been saved
             if self.found_count > 0 and self.open:
                 open_folder_in_explorer(image_storage_folder)
@@ -282,6 +859,12 @@ def parse_args() -> Namespace:
         help="If not empty enables the string search mode: \
             only images which 'alt' attribute contains the \
             search string are saved")
+    parser.add_argument(
+        '-e', '--exif-search', type=str,
+        help="If not empty enables the EXIF search mode: only images which \
+            EXIF metadata contain the search string are saved. The images \
+            are searched in memory, the other ones are never written."
+        )
     parser.add_argument(
         '-p', '--image-path', type=str,
         help='indicates the path where the downloaded files will \
@@ -314,6 +897,16 @@ def parse_args() -> Namespace:
         help="Set a limit to the memory occupied by the dowloaded images \
             (in MB). Default is set to 1000MB."
             )
+    parser.add_argument(
+        '--domain-memory',  type=int,
+        help="Set a limit to the memory occupied by the images downloaded \
+            from each domain (in MB). No limit by default."
+            )
+    parser.add_argument(
+        '--page-memory',  type=int,
+        help="Set a limit to the memory occupied by the images downloaded \
+            from each page (in MB). No limit by default."
+            )
     parser.add_argument(
         '-v', '--verbose', action='store_true', help="Enable verbose mode.")
     parser.add_argument(
@@ -327,6 +920,119 @@ def parse_args() -> Namespace:
             If not indicated, it will be 3. \
             (-s/--search-string has to be activated).'
         )
+    parser.add_argument(
+        '-w', '--workers', type=int,
+        help='Number of images downloaded concurrently, while the pages \
+            keep being crawled one at a time. If not indicated, it will be 4.'
+        )
+    parser.add_argument(
+        '-q', '--queue-size', type=int,
+        help='Maximum number of images waiting to be downloaded. The crawl \
+            pauses when it is reached. If not indicated, it will be 4 per \
+            worker.'
+        )
+    parser.add_argument(
+        '-c', '--content-addressed', action='store_true',
+        help='Store each image content once, under its hash, in the \
+            .objects folder of the image folder. The image names are \
+            hardlinks to the stored contents, and duplicates do not count \
+            against the memory limit.'
+        )
+    parser.add_argument(
+        '-R', '--revalidate', action='store_true',
+        help='Check with conditional requests if the images downloaded \
+            during a previous run changed, instead of skipping them.'
+        )
+    parser.add_argument(
+        '--retries', type=int,
+        help='Number of times a failed image download is resumed. \
+            If not indicated, it will be 2.'
+        )
+    parser.add_argument(
+        '--min-width', type=int,
+        help='Only save the images at least this wide (in pixels).'
+        )
+    parser.add_argument(
+        '--min-height', type=int,
+        help='Only save the images at least this high (in pixels).'
+        )
+    parser.add_argument(
+        '--max-width', type=int,
+        help='Only save the images at most this wide (in pixels).'
+        )
+    parser.add_argument(
+        '--max-height', type=int,
+        help='Only save the images at most this high (in pixels).'
+        )
+    parser.add_argument(
+        '--formats', type=str,
+        help='Only save the images of the given formats, separated by \
+            commas (e.g. jpeg,png). The format is read from the content.'
+        )
+    parser.add_argument(
+        '--require-exif', action='store_true',
+        help='Only save the images containing EXIF metadata.'
+        )
+    parser.add_argument(
+        '--require-gps', action='store_true',
+        help='Only save the images containing GPS metadata.'
+        )
+    parser.add_argument(
+        '-D', '--near-duplicates', metavar='DISTANCE', type=int,
+        help='Keep only one variant of the near-duplicate images (same \
+            picture at other sizes or compressions): the images whose \
+            perceptual hashes differ by at most DISTANCE bits out of 64 \
+            (e.g. 6). The clusters are reported at the end.'
+        )
+    parser.add_argument(
+        '--keep', choices=[KEEP_FIRST, KEEP_LARGEST],
+        help='Near-duplicate variant to keep: the first one downloaded, or \
+            the one with the most pixels. If not indicated, it will be \
+            "first" (-D/--near-duplicates has to be activated).'
+        )
+    parser.add_argument(
+        '-P', '--post-process', metavar='PROCESSES', type=int, nargs='?',
+        const=0,
+        help='Process each downloaded image in a pool of processes: its \
+            metadata, thumbnail and hashes are stored in the .sidecar.db \
+            file of the image folder, where Scorpion and the viewer read \
+            them instead of decoding the image again. If the number of \
+            processes is not indicated, all the cores are used.'
+        )
+    parser.add_argument(
+        '--shards', metavar='MAX_MB', type=int,
+        help='Append the images to uncompressed tar files of at most MAX_MB \
+            MB in the image folder, listed in its shards.index file, instead \
+            of writing one file per image. Scorpion and the viewer read the \
+            images from the shards without extracting them.'
+        )
+    parser.add_argument(
+        '--limit-rate', metavar='KBPS', type=int,
+        help='Limit the bandwidth used by all the HTTP responses to KBPS \
+            KB/s. The bytes are paced as they are received, so the \
+            concurrent requests keep running.'
+        )
+    parser.add_argument(
+        '--host-limit-rate', metavar='KBPS', type=int,
+        help='Limit the bandwidth used by the HTTP responses of each host \
+            to KBPS KB/s.'
+        )
+    parser.add_argument(
+        '--incremental', metavar='STATE_FILE', type=str,
+        help='Enable the incremental recrawl mode: the pages that did not \
+            change since the previous run with the same state file are not \
+            searched again, and the new/changed/removed images are reported.'
+        )
+    parser.add_argument(
+        '--record', metavar='DIR', type=str,
+        help='Record every HTTP request and response into WARC files \
+            written in the given folder.'
+        )
+    parser.add_argument(
+        '--replay', metavar='DIR', type=str,
+        help='Serve the HTTP responses from the WARC files of the given \
+            folder instead of the network.'
+        )
 
     args = parser.parse_args()
 
@@ -344,6 +1050,30 @@ def parse_args() -> Namespace:
             "with -S/--sleep."
             )
 
+    if args.near_duplicates is not None and args.near_duplicates < 0:
+        parser.error("The -D/--near-duplicates distance must be positive.")
+
+    if args.keep and args.near_duplicates is None:
+        parser.error(
+            "The --keep option can only be used "
+            "with -D/--near-duplicates."
+            )
+
+    if args.shards:
+        for option, name in (
+                (args.content_addressed, "-c/--content-addressed"),
+                (args.near_duplicates is not None, "-D/--near-duplicates"),
+                (args.post_process is not None, "-P/--post-process")):
+            if option:
+                parser.error(
+                    f"The --shards option cannot be used with {name}."
+                    )
+
+    if args.record and args.replay:
+        parser.error(
+            "The --record option cannot be used with --replay."
+            )
+
     return args
 
 
@@ -363,15 +1093,55 @@ def main(image_storage_folder: str):
         args.verbose = False
     if not args.max_sleep:
         args.max_sleep = 3
+    if not args.workers:
+        args.workers = 4
+    if not args.queue_size:
+        args.queue_size = 0
+    if args.retries is None:
+        args.retries = 2
+
+    # The filter is checked on the first bytes of each download
+    image_filter = ImageFilter(
+        args.min_width or 0, args.min_height or 0,
+        args.max_width or 0, args.max_height or 0,
+        args.formats.split(',') if args.formats else None,
+        args.require_exif, args.require_gps
+        )
 
     # Create an instance of Spider
     scraper = Spider(
-        args.verbose,
-        args.link, args.recursive, args.recurse_depth,
-        args.ko_limit, image_storage_folder,
-        args.search_string, args.case_insensitive,
-        args.open, args.memory,
-        args.max_sleep
+        verbose=args.verbose,
+        base_url=args.link,
+        recursive=args.recursive,
+        recurse_depth=args.recurse_depth,
+        ko_limit=args.ko_limit,
+        image_storage_folder=image_storage_folder,
+        search_string=args.search_string,
+        case_insensitive=args.case_insensitive,
+        open_folder=args.open,
+        memory_limit=args.memory,
+        sleep=args.sleep,
+        max_sleep=args.max_sleep,
+        state_file=args.incremental,
+        record_dir=args.record,
+        replay_dir=args.replay,
+        image_workers=args.workers,
+        queue_size=args.queue_size,
+        content_addressed=args.content_addressed,
+        revalidate=args.revalidate,
+        retries=args.retries,
+        domain_memory_limit=args.domain_memory or 0,
+        page_memory_limit=args.page_memory or 0,
+        image_filter=image_filter,
+        duplicate_threshold=args.near_duplicates
+        if args.near_duplicates is not None else -1,
+        keep=args.keep or KEEP_FIRST,
+        post_process_workers=args.post_process
+        if args.post_process is not None else -1,
+        exif_search=args.exif_search or "",
+        shard_size=args.shards or 0,
+        rate_limit=args.limit_rate or 0,
+        host_rate_limit=args.host_limit_rate or 0
         )
 
     # Run the scraper
@@ -10,6 +10,8 @@ function print_usage_and_exit {
     echo "Modes:"
     echo "  -h test Harvestmen (strings)"
     echo "  -s test Spider & Scorpion (image file metadata editor)"
+    echo "  -i test the startup time of the programs (import time budget)"
+    echo "  -d test the Spider downloads against a local HTTP server"
     exit 1
 }
 
@@ -37,6 +39,266 @@ function run_spider_scorpion_tests {
 	./scorpion_viewer.py
 }
 
+# Import time budget of each program, in milliseconds: the heavy
+# dependencies are only imported on the code paths that need them
+declare -A IMPORT_BUDGETS=(
+	[harvestmen]=75
+	[spider]=75
+	[scorpion]=75
+	[scorpion_viewer]=120
+)
+# Modules that must not be imported at startup
+HEAVY_MODULES="requests|bs4|PIL|numpy|multiprocessing"
+
+function run_import_time_tests {
+	local status=0
+
+	for program in harvestmen spider scorpion scorpion_viewer; do
+		# Best cumulative import time of 5 runs, in microseconds
+		best=$(for _ in 1 2 3 4 5; do
+			python3 -X importtime -c "import $program" 2>&1 | \
+				awk -F '|' -v program="$program" \
+				'{ gsub(/ /, "", $3) } $3 == program { print $2 + 0 }'
+		done | sort -n | head -n 1)
+		budget=${IMPORT_BUDGETS[$program]}
+
+		if [ -z "$best" ]; then
+			echo -e "${RED}[KO]${RESET} $program: could not be imported"
+			status=1
+		elif [ $((best / 1000)) -gt "$budget" ]; then
+			echo -e "${RED}[KO]${RESET} $program: $((best / 1000)) ms" \
+				"(budget: $budget ms)"
+			status=1
+		else
+			echo -e "${GREEN}[OK]${RESET} $program: $((best / 1000)) ms" \
+				"(budget: $budget ms)"
+		fi
+
+		heavy=$(python3 -X importtime -c "import $program" 2>&1 | \
+			awk -F '|' '{ gsub(/ /, "", $3); print $3 }' | \
+			grep -xE "$HEAVY_MODULES" | tr '\n' ' ')
+		if [ -n "$heavy" ]; then
+			echo -e "${RED}[KO]${RESET} $program imports at startup: $heavy"
+			status=1
+		fi
+	done
+
+	return $status
+}
+
+DOWNLOAD_TEST_PORT=${DOWNLOAD_TEST_PORT:-8799}
+
+# Static server of the test site, with ETag, 304 and Range (206/416)
+# support
+function serve_test_site {
+	exec python3 - "$1" "$DOWNLOAD_TEST_PORT" << 'EOF'
+import hashlib
+import http.server
+import io
+import os
+import sys
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path) or not path.endswith(".jpg"):
+            return super().send_head()
+        with open(path, "rb") as f:
+            data = f.read()
+        etag = '"' + hashlib.sha256(data).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return None
+        start = 0
+        byte_range = self.headers.get("Range", "")
+        if (byte_range.startswith("bytes=")
+                and self.headers.get("If-Range") in (None, etag)):
+            start = int(byte_range[6:].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}"
+                )
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(data) - start))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return io.BytesIO(data[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+os.chdir(sys.argv[1])
+http.server.ThreadingHTTPServer(
+    ("127.0.0.1", int(sys.argv[2])), Handler
+    ).serve_forever()
+EOF
+}
+
+# Test site: three different images named 'photo.jpg', two of them being
+# size variants of the same picture
+function create_test_site {
+	python3 - "$1" << 'EOF'
+import os
+import sys
+from PIL import Image, ImageDraw
+
+site = sys.argv[1]
+for folder in ("w_300", "w_1200", "other"):
+    os.makedirs(os.path.join(site, folder))
+img = Image.new("RGB", (1200, 900), "white")
+draw = ImageDraw.Draw(img)
+for x in range(0, 1200, 60):
+    draw.rectangle([x, 0, x + 30, 900], fill=(x % 255, 80, 160))
+draw.ellipse([300, 200, 900, 700], fill="black")
+img.save(os.path.join(site, "w_1200", "photo.jpg"), quality=90)
+img.resize((300, 225)).save(os.path.join(site, "w_300", "photo.jpg"))
+Image.new("RGB", (400, 300), "green").save(
+    os.path.join(site, "other", "photo.jpg")
+    )
+with open(os.path.join(site, "index.html"), "w") as f:
+    f.write(
+        '<html><body><img src="w_300/photo.jpg">'
+        '<img src="w_1200/photo.jpg"><img src="other/photo.jpg">'
+        '</body></html>'
+        )
+EOF
+}
+
+# Put a complete '.part' file for an image, as left by a crash
+function create_complete_part {
+	python3 - "$1" "$2" "$3" << 'EOF'
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+folder, source, url = sys.argv[1:]
+os.makedirs(os.path.join(folder, ".parts"), exist_ok=True)
+part = os.path.join(
+    folder, ".parts", hashlib.sha256(url.encode()).hexdigest() + ".part"
+    )
+shutil.copyfile(source, part)
+with open(source, "rb") as f:
+    etag = '"' + hashlib.sha256(f.read()).hexdigest() + '"'
+with open(part + ".json", "w") as f:
+    json.dump({"url": url, "etag": etag, "last_modified": None}, f)
+EOF
+}
+
+# Print the sorted SHA-256 hashes of the images of the folders
+function image_hashes {
+	find "$@" -maxdepth 1 -type f -name '*.jpg' -exec sha256sum {} + | \
+		cut -d ' ' -f 1 | sort
+}
+
+# Check that every image recorded in the manifest of a folder exists
+function manifest_paths_exist {
+	python3 - "$1/.manifest.db" << 'EOF'
+import os
+import sqlite3
+import sys
+
+rows = sqlite3.connect(sys.argv[1]).execute("SELECT path FROM images")
+sys.exit(0 if all(os.path.isfile(path) for path, in rows) else 1)
+EOF
+}
+
+function check {
+	if "${@:2}"; then
+		echo -e "${GREEN}[OK]${RESET} $1"
+	else
+		echo -e "${RED}[KO]${RESET} $1"
+		DOWNLOAD_TEST_STATUS=1
+	fi
+}
+
+function run_download_tests {
+	local tmp site base url out server mode name
+	DOWNLOAD_TEST_STATUS=0
+	tmp=$(mktemp -d)
+	site="$tmp/site"
+	base="http://127.0.0.1:$DOWNLOAD_TEST_PORT"
+	url="$base/index.html"
+
+	create_test_site "$site" || return 1
+	serve_test_site "$site" &
+	server=$!
+	trap 'kill $server 2>/dev/null; rm -rf "$tmp"' RETURN
+	for _ in $(seq 50); do
+		(echo > "/dev/tcp/127.0.0.1/$DOWNLOAD_TEST_PORT") 2>/dev/null \
+			&& break
+		sleep 0.1
+	done
+
+	local all small_other large_other
+	all=$(image_hashes "$site"/*)
+	small_other=$(image_hashes "$site/w_300" "$site/other")
+	large_other=$(image_hashes "$site/w_1200" "$site/other")
+
+	for mode in "" "-c"; do
+		name=${mode:-"without -c"}
+
+		# Same file name: the images are downloaded concurrently, and
+		# none overwrites another
+		out="$tmp/all$mode"
+		./spider.py "$url" -p "$out" -w 4 $mode > /dev/null
+		check "same-name images ($name): all saved" \
+			test "$(image_hashes "$out")" = "$all"
+		check "same-name images ($name): manifest" \
+			manifest_paths_exist "$out"
+
+		# Near-duplicates: the size variants share their file name (one
+		# worker, so that the first variant is the first downloaded)
+		out="$tmp/first$mode"
+		./spider.py "$url" -p "$out" -w 1 -D 10 --keep first $mode > /dev/null
+		check "near-duplicates ($name): first kept" \
+			test "$(image_hashes "$out")" = "$small_other"
+		check "near-duplicates ($name): first kept, manifest" \
+			manifest_paths_exist "$out"
+
+		out="$tmp/largest$mode"
+		./spider.py "$url" -p "$out" -w 1 -D 10 --keep largest $mode > /dev/null
+		check "near-duplicates ($name): largest kept" \
+			test "$(image_hashes "$out")" = "$large_other"
+		check "near-duplicates ($name): largest kept, manifest" \
+			manifest_paths_exist "$out"
+	done
+
+	# A complete '.part' file: the range is refused (416), and the
+	# download starts over
+	out="$tmp/restart"
+	create_complete_part "$out" "$site/w_1200/photo.jpg" \
+		"$base/w_1200/photo.jpg"
+	./spider.py "$url" -p "$out" --retries 0 > /dev/null
+	check "refused range: downloaded again" \
+		test "$(image_hashes "$out")" = "$all"
+
+	# Replay: the 304 responses recorded by a revalidation don't replace
+	# the complete responses
+	out="$tmp/record"
+	./spider.py "$url" -p "$out" --record "$tmp/warc" > /dev/null
+	sleep 1  # The WARC files are named after the second
+	./spider.py "$url" -p "$out" -R --record "$tmp/warc" > /dev/null
+	./spider.py "$url" -p "$tmp/replay" --replay "$tmp/warc" > /dev/null
+	check "replay after a revalidation: complete images" \
+		test "$(image_hashes "$tmp/replay")" = "$all"
+
+	return $DOWNLOAD_TEST_STATUS
+}
+
 case $MODE in
 	-h)
 		run_harvestmen_tests
@@ -44,6 +306,12 @@ case $MODE in
 	-s)
 		run_spider_scorpion_tests
 		;;
+	-i)
+		run_import_time_tests
+		;;
+	-d)
+		run_download_tests
+		;;
 	*)
 		echo -e "\033[31mInvalid mode:\033[0m\n"
 		print_usage_and_exit